@@ -1 +1,2 @@
-"""LangGraph-based agents for the chat app will be implemented here.""" 
\ No newline at end of file
+from .graph import build_agent
+from .llm import FakeStreamingChatModel, get_chat_model
@@ -0,0 +1,67 @@
+"""Retrieval-augmented answer graph: retrieve project chunks, pack the best of them into the
+context budget, then generate a grounded reply."""
+from functools import lru_cache
+from typing import Annotated, Optional, TypedDict
+from django.conf import settings
+from langchain_core.messages import SystemMessage
+from langgraph.graph import END, START, StateGraph, add_messages
+from upload.models import Project
+from search.services import search_project
+from chat.utils.context import pack_context
+from .llm import get_chat_model
+
+SYSTEM_PROMPT = (
+    "You are a research assistant. Answer the user's question using the context passages "
+    "from their documents below, citing passages by their [file p.page] label. If the "
+    "context does not contain the answer, say so."
+)
+
+
+class AgentState(TypedDict):
+    messages: Annotated[list, add_messages]
+    project_id: Optional[str]
+    context: list
+    context_report: dict
+
+
+def retrieve(state):
+    if not state.get("project_id"):
+        return {"context": []}
+    project = Project.objects.filter(id=state["project_id"], is_deleted=False).first() #type: ignore
+    if project is None:
+        return {"context": []}
+    results, _ = search_project(project, state["messages"][-1].content, k=settings.CHAT_CONTEXT_CANDIDATES)
+    return {"context": results}
+
+
+def pack(state):
+    context, report = pack_context(state["context"])
+    return {"context": context, "context_report": report}
+
+
+def system_prompt(context):
+    passages = [
+        f"[{chunk['file_name']} p.{chunk['page_number']}]\n{chunk['text']}"
+        for chunk in context
+    ]
+    return "\n\n".join([SYSTEM_PROMPT, *passages])
+
+
+def generate(state):
+    model = get_chat_model()
+    reply = model.invoke([SystemMessage(content=system_prompt(state["context"])), *state["messages"]])
+    return {"messages": [reply]}
+
+
+@lru_cache(maxsize=1)
+def build_agent():
+    """The compiled graph; compiled once per process and shared by every run."""
+    graph = StateGraph(AgentState)
+    graph.add_node("retrieve", retrieve)
+    graph.add_node("pack", pack)
+    graph.add_node("generate", generate)
+    graph.add_edge(START, "retrieve")
+    graph.add_edge("retrieve", "pack")
+    graph.add_edge("pack", "generate")
+    graph.add_edge("generate", END)
+    return graph.compile()
@@ -0,0 +1,57 @@
+"""Chat models the agent can run on."""
+import re
+import time
+from django.conf import settings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+TOKEN_RE = re.compile(r"\S+\s*")
+CONTEXT_WORDS = 60
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Offline chat model that streams a canned answer word by word; meant for local runs and tests.
+
+    The answer quotes the start of the first context passage in the system prompt, so replies
+    still reflect what retrieval found. ``token_delay`` (seconds) simulates generation speed.
+    """
+
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming"
+
+    def _answer(self, messages):
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+        passages = system.split("\n\n[", 1)
+        if len(passages) == 1:
+            return f"I could not find anything in your documents about: {question}"
+        source, _, text = passages[1].partition("\n")
+        words = text.split()
+        excerpt = " ".join(words[:CONTEXT_WORDS]) + (" ..." if len(words) > CONTEXT_WORDS else "")
+        return f"According to [{source} {excerpt}"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in TOKEN_RE.findall(self._answer(messages)):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def get_chat_model():
+    if settings.CHAT_LLM_PROVIDER == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=settings.CHAT_MODEL, streaming=True)
+    if settings.CHAT_LLM_PROVIDER == "fake":
+        return FakeStreamingChatModel(token_delay=settings.CHAT_FAKE_TOKEN_DELAY_MS / 1000)
+    raise ValueError(f"Unknown CHAT_LLM_PROVIDER {settings.CHAT_LLM_PROVIDER!r}")
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from chat.models import ChatMessage, ChatSession
+from chat.services import StreamPublisher
+from chat.services.streaming import DONE, TOKEN
+from core.models import User
+from core.services.auth import AuthService
+
+
+class Command(BaseCommand):
+    help = (
+        "Open N concurrent chat streams against a running server, publish a reply to all of them "
+        "and report how many connected and how fast tokens arrived. Run it once against "
+        "`gunicorn project_root.wsgi:application` and once against "
+        "`gunicorn project_root.asgi:application -k uvicorn.workers.UvicornWorker` to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000")
+        parser.add_argument("--email", required=True, help="Existing user to stream as")
+        parser.add_argument("--concurrency", default="10,100,1000", help="Comma-separated stream counts")
+        parser.add_argument("--tokens", type=int, default=20)
+        parser.add_argument("--interval-ms", type=float, default=50)
+        parser.add_argument("--connect-timeout", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        user = User.objects.get(email=options["email"]) #type: ignore
+        cookies = {"access_token": AuthService.get_tokens_for_user(user)["access"]}
+        session = ChatSession.objects.create(user=user, title="load test") #type: ignore
+        self.stdout.write(f"{'streams':>8} {'connected':>10} {'completed':>10} {'connect p99':>12} {'token p50':>10} {'token p99':>10}")
+        try:
+            for concurrency in map(int, options["concurrency"].split(",")):
+                reply = ChatMessage.objects.create( #type: ignore
+                    session=session, role=ChatMessage.Role.ASSISTANT, status=ChatMessage.Status.STREAMING,
+                )
+                report = asyncio.run(self.run_level(reply.id, concurrency, cookies, options))
+                self.stdout.write(
+                    f"{concurrency:>8} {report['connected']:>10} {report['completed']:>10} "
+                    f"{report['connect_p99_ms']:>10.1f}ms {report['token_p50_ms']:>8.1f}ms {report['token_p99_ms']:>8.1f}ms"
+                )
+        finally:
+            session.delete()
+
+    async def run_level(self, message_id, concurrency, cookies, options):
+        url = f"{options['url'].rstrip('/')}/api/chat/messages/{message_id}/stream/"
+        published = {}
+        connect_ms, token_ms, completed = [], [], 0
+        started = time.perf_counter()
+
+        async def listen(client):
+            nonlocal completed
+            try:
+                async with client.stream("GET", url, headers={"Accept": "text/event-stream"}) as response:
+                    connect_ms.append((time.perf_counter() - started) * 1000)
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: "):
+                            continue
+                        event = json.loads(line[6:])
+                        if event["type"] == TOKEN and event["seq"] in published:
+                            token_ms.append((time.perf_counter() - published[event["seq"]]) * 1000)
+                        if event["type"] == DONE:
+                            completed += 1
+                            return
+            except httpx.HTTPError:
+                return
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+        timeout = httpx.Timeout(None, connect=options["connect_timeout"], pool=options["connect_timeout"])
+        async with httpx.AsyncClient(cookies=cookies, limits=limits, timeout=timeout) as client:
+            listeners = [asyncio.create_task(listen(client)) for _ in range(concurrency)]
+            # Give every stream the chance to connect, then publish a reply they all share
+            deadline = time.perf_counter() + options["connect_timeout"]
+            while len(connect_ms) < concurrency and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            connected = len(connect_ms)
+
+            publisher = StreamPublisher(message_id)
+            publish = sync_to_async(publisher.publish, thread_sensitive=False)
+            for _ in range(options["tokens"]):
+                published[publisher.seq + 1] = time.perf_counter()
+                await publish(TOKEN, token="token ")
+                await asyncio.sleep(options["interval_ms"] / 1000)
+            await publish(DONE, message_id=message_id, metrics={})
+            _, pending = await asyncio.wait(listeners, timeout=options["connect_timeout"])
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return {
+            "connected": connected,
+            "completed": completed,
+            "connect_p99_ms": float(np.percentile(connect_ms, 99)) if connect_ms else float("nan"),
+            "token_p50_ms": float(np.percentile(token_ms, 50)) if token_ms else float("nan"),
+            "token_p99_ms": float(np.percentile(token_ms, 99)) if token_ms else float("nan"),
+        }
@@ -0,0 +1,2 @@
+from .session import ChatSession
+from .message import ChatMessage
@@ -0,0 +1,16 @@
+from django.db import models
+from core.models import TimeStampedModel, User
+from upload.models import Project
+
+
+class ChatSession(TimeStampedModel):
+    """A conversation of one user, optionally grounded in the chunks of one of their projects."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_sessions")
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name="chat_sessions")
+    title = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        ordering = ["-updated_at"]
+
+    def __str__(self):
+        return self.title or f"Chat {self.pk}"
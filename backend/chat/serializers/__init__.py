@@ -0,0 +1 @@
+from .chat import ChatMessageCreateSerializer, ChatMessageSerializer, ChatSessionSerializer
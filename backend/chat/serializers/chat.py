@@ -0,0 +1,31 @@
+from rest_framework import serializers
+from chat.models import ChatMessage, ChatSession
+from upload.models import Project
+
+
+class ChatSessionSerializer(serializers.ModelSerializer):
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.none(), required=False, allow_null=True) #type: ignore
+
+    class Meta:
+        model = ChatSession
+        fields = ["id", "title", "project", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at"]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is not None:
+            # Sessions can only be grounded in the requesting user's own projects
+            fields["project"].queryset = Project.objects.filter(user=request.user, is_deleted=False) #type: ignore
+        return fields
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ["id", "session", "role", "content", "status", "error_msg", "sources", "metrics", "created_at"]
+        read_only_fields = fields
+
+
+class ChatMessageCreateSerializer(serializers.Serializer):
+    content = serializers.CharField(max_length=20000)
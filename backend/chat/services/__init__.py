@@ -1 +1,2 @@
- 
\ No newline at end of file
+from .replies import generate_reply
+from .streaming import StreamPublisher, ahas_backlog, astream_events, format_sse, has_backlog, stream_events
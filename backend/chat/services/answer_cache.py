@@ -0,0 +1,88 @@
+"""Semantic cache of assistant answers to standalone project questions.
+
+Entries are grouped per (project, documents_version, embedding model): attaching,
+detaching or re-indexing a file bumps ``Project.documents_version``, so older entries are
+simply never looked at again and expire on their own. A question is served from the cache
+when its embedding's cosine similarity to a cached question reaches
+SEMANTIC_CACHE_THRESHOLD.
+
+Each group is two Redis keys written together in one transaction: ``...:vectors`` holds
+the concatenated float32 question embeddings (one GET loads the whole matrix) and
+``...:entries`` the matching answers, in the same order.
+"""
+import json
+import numpy as np
+from django.conf import settings
+from search.services.indexing import embedding_provider
+from .streaming import redis_client
+
+VECTOR_DTYPE = np.dtype("<f4")
+
+
+def group_key(project, model):
+    return f"answers:{project.id}:{project.documents_version}:{model}"
+
+
+def stats_key(project):
+    return f"answers:stats:{project.id}"
+
+
+def embed_question(question):
+    provider = embedding_provider()
+    vector = np.asarray(provider.embed([question])[0], dtype=VECTOR_DTYPE)
+    return provider.name, vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def lookup(project, model, vector, client=None):
+    """The best cached entry for ``vector`` and its similarity, or ``(None, best_similarity)``."""
+    client = client or redis_client()
+    key = group_key(project, model)
+    data = client.get(f"{key}:vectors")
+    if not data:
+        return None, None
+    matrix = np.frombuffer(data, dtype=VECTOR_DTYPE).reshape(-1, len(vector))
+    similarities = matrix @ vector
+    best = int(np.argmax(similarities))
+    similarity = float(similarities[best])
+    if similarity < settings.SEMANTIC_CACHE_THRESHOLD:
+        return None, similarity
+    entry = client.lindex(f"{key}:entries", best)
+    return (json.loads(entry) if entry else None), similarity
+
+
+def store(project, model, vector, entry, client=None):
+    """Cache ``entry`` (question, answer, sources, total_ms) unless the group is already full."""
+    client = client or redis_client()
+    key = group_key(project, model)
+    if client.llen(f"{key}:entries") >= settings.SEMANTIC_CACHE_MAX_ENTRIES:
+        return False
+    pipeline = client.pipeline(transaction=True)
+    pipeline.append(f"{key}:vectors", np.asarray(vector, dtype=VECTOR_DTYPE).tobytes())
+    pipeline.rpush(f"{key}:entries", json.dumps(entry))
+    pipeline.expire(f"{key}:vectors", settings.SEMANTIC_CACHE_TTL)
+    pipeline.expire(f"{key}:entries", settings.SEMANTIC_CACHE_TTL)
+    pipeline.execute()
+    return True
+
+
+def record(project, hit, saved_ms=0.0, client=None):
+    pipeline = (client or redis_client()).pipeline(transaction=False)
+    pipeline.hincrby(stats_key(project), "lookups", 1)
+    if hit:
+        pipeline.hincrby(stats_key(project), "hits", 1)
+        pipeline.hincrbyfloat(stats_key(project), "saved_ms", saved_ms)
+    pipeline.execute()
+
+
+def cache_stats(project, client=None):
+    """Lookups, hits, hit rate and total/average generation time saved for ``project``."""
+    raw = (client or redis_client()).hgetall(stats_key(project))
+    lookups, hits = int(raw.get(b"lookups", 0)), int(raw.get(b"hits", 0))
+    saved_ms = float(raw.get(b"saved_ms", 0))
+    return {
+        "lookups": lookups,
+        "hits": hits,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "saved_ms": round(saved_ms, 2),
+        "avg_saved_ms": round(saved_ms / hits, 2) if hits else 0.0,
+    }
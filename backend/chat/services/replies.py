@@ -0,0 +1,130 @@
+"""Generates assistant replies with the agent graph, streaming tokens as they are produced."""
+import time
+from django.conf import settings
+from django.utils import timezone
+from langchain_core.messages import AIMessage, HumanMessage
+from chat.agents import build_agent
+from chat.models import ChatMessage
+from . import answer_cache
+from .streaming import DONE, ERROR, SOURCES, TOKEN, StreamPublisher
+
+SOURCE_FIELDS = ("chunk_id", "file_id", "file_name", "page_number", "score")
+
+
+def history_messages(reply):
+    """The last CHAT_HISTORY_MESSAGES finished messages before ``reply``, oldest first."""
+    messages = (
+        ChatMessage.objects.filter( #type: ignore
+            session_id=reply.session_id,
+            id__lt=reply.id,
+            status=ChatMessage.Status.COMPLETE,
+            role__in=[ChatMessage.Role.USER, ChatMessage.Role.ASSISTANT],
+        )
+        .order_by("-id")
+        .values_list("role", "content")[:settings.CHAT_HISTORY_MESSAGES]
+    )
+    return [
+        HumanMessage(content=content) if role == ChatMessage.Role.USER else AIMessage(content=content)
+        for role, content in reversed(messages)
+    ]
+
+
+def source(result):
+    return {**{field: result[field] for field in SOURCE_FIELDS}, "file_id": str(result["file_id"])}
+
+
+def run_agent_graph(session, reply, messages, publisher):
+    """Stream the agent's answer; returns the tokens, ms until the first one and the context report."""
+    started = time.perf_counter()
+    tokens, first_token_ms, report = [], None, {}
+    state = {
+        "messages": messages,
+        "project_id": str(session.project_id) if session.project_id else None,
+        "context": [],
+    }
+    for mode, chunk in build_agent().stream(state, stream_mode=["updates", "messages"]):
+        if mode == "updates" and "pack" in chunk:
+            reply.sources = [source(result) for result in chunk["pack"]["context"]]
+            report = chunk["pack"]["context_report"]
+            publisher.publish(SOURCES, sources=reply.sources)
+        elif mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") != "generate" or not message.content:
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+            tokens.append(message.content)
+            publisher.publish(TOKEN, token=message.content)
+    return tokens, first_token_ms, report
+
+
+def generate_reply(session, reply, publisher=None):
+    """Answer the conversation up to ``reply`` and stream the answer.
+
+    The opening question of a project session is first looked up in the semantic answer
+    cache; a hit is streamed back as one token without retrieval or an LLM call. Otherwise
+    every token is published the moment the model yields it. The finished text, sources,
+    context packing report and timings (``ttft_ms`` is measured from when the reply was requested) are saved on ``reply``.
+    """
+    publisher = publisher or StreamPublisher(reply.id)
+    started = time.perf_counter()
+    queued_ms = (timezone.now() - reply.created_at).total_seconds() * 1000
+    reply.status = ChatMessage.Status.STREAMING
+    reply.save(update_fields=["status"])
+
+    messages = history_messages(reply)
+    # Only standalone questions are cached: follow-ups depend on the turns before them
+    cacheable = settings.SEMANTIC_CACHE_ENABLED and session.project_id is not None and len(messages) == 1
+    extra_metrics, entry = {}, None
+    tokens, first_token_ms = [], None
+    try:
+        if cacheable:
+            model, vector = answer_cache.embed_question(messages[-1].content)
+            entry, similarity = answer_cache.lookup(session.project, model, vector)
+            extra_metrics["cache"] = "hit" if entry else "miss"
+            extra_metrics["similarity"] = round(similarity, 4) if similarity is not None else None
+            if entry is not None:
+                reply.sources = entry["sources"]
+                publisher.publish(SOURCES, sources=reply.sources)
+                first_token_ms = (time.perf_counter() - started) * 1000
+                tokens = [entry["answer"]]
+                publisher.publish(TOKEN, token=entry["answer"])
+        if entry is None:
+            tokens, first_token_ms, report = run_agent_graph(session, reply, messages, publisher)
+            if report:
+                # Chunks dropped as duplicates or over the token budget, and the tokens that saved
+                extra_metrics["context"] = report
+    except Exception as exc:
+        reply.status = ChatMessage.Status.FAILED
+        reply.error_msg = str(exc)
+        reply.content = "".join(tokens)
+        reply.save(update_fields=["status", "error_msg", "content", "sources"])
+        publisher.publish(ERROR, error=str(exc))
+        raise
+
+    generation_ms = (time.perf_counter() - started) * 1000
+    reply.content = "".join(tokens)
+    reply.status = ChatMessage.Status.COMPLETE
+    reply.metrics = {
+        "queued_ms": round(queued_ms, 2),
+        "ttft_ms": round(queued_ms + first_token_ms, 2) if first_token_ms is not None else None,
+        "total_ms": round(queued_ms + generation_ms, 2),
+        "tokens": len(tokens),
+        **extra_metrics,
+    }
+    reply.save(update_fields=["content", "status", "metrics", "sources"])
+    publisher.publish(DONE, message_id=reply.id, metrics=reply.metrics)
+
+    if cacheable:
+        if entry is not None:
+            answer_cache.record(session.project, hit=True, saved_ms=max(entry["generation_ms"] - generation_ms, 0))
+        else:
+            answer_cache.record(session.project, hit=False)
+        if entry is None and reply.content:
+            answer_cache.store(session.project, model, vector, {
+                "question": messages[-1].content,
+                "answer": reply.content,
+                "sources": reply.sources,
+                "generation_ms": round(generation_ms, 2),
+            })
+    return reply
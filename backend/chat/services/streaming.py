@@ -0,0 +1,206 @@
+"""Relays reply events from the chat worker to web processes over Redis.
+
+Every event of a reply is published on ``chat:stream:<message_id>`` and also appended to a
+short-lived backlog list, so a client that connects (or reconnects) after generation has
+started replays what it missed before following the live channel. Events carry a
+per-reply ``seq`` that doubles as the SSE event id (and as the backlog index + 1).
+
+``stream_events`` serves one stream per thread (WSGI); ``astream_events`` serves any number
+of streams from one event loop (ASGI), all sharing a single pub/sub connection per process.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import defaultdict
+from functools import lru_cache
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN, SOURCES, DONE, ERROR = "token", "sources", "done", "error"
+TERMINAL = (DONE, ERROR)
+
+
+@lru_cache(maxsize=1)
+def redis_client():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+def channel_name(message_id):
+    return f"chat:stream:{message_id}"
+
+
+def backlog_key(message_id):
+    return f"chat:stream:{message_id}:backlog"
+
+
+class StreamPublisher:
+    """Publishes the events of one assistant reply, in order."""
+
+    def __init__(self, message_id, client=None):
+        self.client = client or redis_client()
+        self.channel = channel_name(message_id)
+        self.backlog = backlog_key(message_id)
+        self.seq = 0
+
+    def publish(self, event_type, **data):
+        self.seq += 1
+        payload = json.dumps({"seq": self.seq, "type": event_type, **data})
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.rpush(self.backlog, payload)
+        pipeline.expire(self.backlog, settings.CHAT_STREAM_TTL)
+        pipeline.publish(self.channel, payload)
+        pipeline.execute()
+
+
+class EventCursor:
+    """Position of one client in a reply's events; replayed and live copies go out once."""
+
+    def __init__(self, last_seq=0):
+        self.last_seq = last_seq
+        self.finished = False
+
+    def accept(self, payloads):
+        events = []
+        for payload in payloads:
+            event = json.loads(payload)
+            if self.finished or event["seq"] <= self.last_seq:
+                continue
+            self.last_seq = event["seq"]
+            self.finished = event["type"] in TERMINAL
+            events.append(event)
+        return events
+
+    def timed_out(self):
+        return {"seq": self.last_seq + 1, "type": ERROR, "error": "Timed out waiting for the reply"}
+
+
+def stream_events(message_id, last_seq=0, timeout=None, client=None):
+    """Yield the events of a reply after ``last_seq`` until it finishes, or None as a heartbeat.
+
+    Subscribes before reading the backlog so nothing published in between is lost. Each
+    idle heartbeat re-reads the backlog too, which covers anything missed while the
+    subscription was reconnecting.
+    """
+    client = client or redis_client()
+    deadline = time.monotonic() + (timeout or settings.CHAT_STREAM_TIMEOUT)
+    cursor = EventCursor(last_seq)
+    backlog = backlog_key(message_id)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(channel_name(message_id))
+    try:
+        yield from cursor.accept(client.lrange(backlog, cursor.last_seq, -1))
+        while not cursor.finished and time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=settings.CHAT_STREAM_HEARTBEAT)
+            if message is None:
+                yield from cursor.accept(client.lrange(backlog, cursor.last_seq, -1)) or [None]
+            else:
+                yield from cursor.accept([message["data"]])
+        if not cursor.finished:
+            yield cursor.timed_out()
+    finally:
+        pubsub.close()
+
+
+class StreamHub:
+    """Fans one Redis pub/sub connection out to every stream an event loop is serving.
+
+    A connection per SSE client would cap a process at the Redis client limit long before
+    it ran out of sockets; here each stream only costs an ``asyncio.Queue``, and backlog reads
+    share a small bounded pool.
+    """
+
+    def __init__(self):
+        self.client = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL, max_connections=settings.CHAT_STREAM_REDIS_CONNECTIONS,
+        ))
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.queues = defaultdict(set)
+        self.lock = asyncio.Lock()
+        self.reader = None
+
+    async def subscribe(self, channel):
+        queue = asyncio.Queue()
+        async with self.lock:
+            if not self.queues[channel]:
+                await self.pubsub.subscribe(channel)
+            self.queues[channel].add(queue)
+            if self.reader is None or self.reader.done():
+                self.reader = asyncio.create_task(self.read())
+        return queue
+
+    async def unsubscribe(self, channel, queue):
+        async with self.lock:
+            self.queues[channel].discard(queue)
+            if not self.queues[channel]:
+                del self.queues[channel]
+                await self.pubsub.unsubscribe(channel)
+
+    async def read(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except (redis.ConnectionError, redis.TimeoutError) as exc:
+                # The connection resubscribes on reconnect; streams catch up from the backlog
+                logger.warning("Chat stream subscription lost: %s", exc)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            for queue in list(self.queues.get(message["channel"].decode(), ())):
+                queue.put_nowait(message["data"])
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def stream_hub():
+    """The hub of the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = StreamHub()
+    return _hubs[loop]
+
+
+async def astream_events(message_id, last_seq=0, timeout=None):
+    """Async counterpart of ``stream_events`` for ASGI views."""
+    hub = stream_hub()
+    deadline = time.monotonic() + (timeout or settings.CHAT_STREAM_TIMEOUT)
+    cursor = EventCursor(last_seq)
+    backlog, channel = backlog_key(message_id), channel_name(message_id)
+    queue = await hub.subscribe(channel)
+    try:
+        for event in cursor.accept(await hub.client.lrange(backlog, cursor.last_seq, -1)):
+            yield event
+        while not cursor.finished and time.monotonic() < deadline:
+            try:
+                payloads = [await asyncio.wait_for(queue.get(), settings.CHAT_STREAM_HEARTBEAT)]
+            except asyncio.TimeoutError:
+                payloads = await hub.client.lrange(backlog, cursor.last_seq, -1)
+                if not payloads:
+                    yield None
+            for event in cursor.accept(payloads):
+                yield event
+        if not cursor.finished:
+            yield cursor.timed_out()
+    finally:
+        await hub.unsubscribe(channel, queue)
+
+
+def has_backlog(message_id, client=None):
+    return bool((client or redis_client()).exists(backlog_key(message_id)))
+
+
+async def ahas_backlog(message_id):
+    return bool(await stream_hub().client.exists(backlog_key(message_id)))
+
+
+def format_sse(event):
+    """One event in ``text/event-stream`` framing; None becomes a keep-alive comment."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -1,7 +1,27 @@
 from project_root.celery_app import app
+from chat.models import ChatMessage, ChatSession
+from chat.services import generate_reply
+
+def start_reply(session, user_message):
+    """Store the user's message and an empty assistant reply for the agent to stream into."""
+    ChatMessage.objects.create(session=session, role=ChatMessage.Role.USER, content=user_message) #type: ignore
+    reply = ChatMessage.objects.create( #type: ignore
+        session=session, role=ChatMessage.Role.ASSISTANT, status=ChatMessage.Status.PENDING,
+    )
+    session.save(update_fields=["updated_at"])
+    return reply
 
 @app.task(name="chat.tasks.run_agent")
-def run_agent(chat_session_id: int, user_message: str):
-    """Invoke LangGraph agent to respond to user message (stub)."""
-    # TODO integrate LangGraph agents once implemented in chat/agents
-    return {"session": chat_session_id, "reply": f"Echo: {user_message}"} 
\ No newline at end of file
+def run_agent(chat_session_id: int, user_message: str, assistant_message_id: int | None = None):
+    """Run the LangGraph agent on the session and stream its reply over Redis as it is generated.
+
+    Web requests create the messages up front and pass ``assistant_message_id`` so clients
+    can subscribe to the stream before the worker picks the task up.
+    """
+    session = ChatSession.objects.get(id=chat_session_id) #type: ignore
+    if assistant_message_id is None:
+        reply = start_reply(session, user_message)
+    else:
+        reply = ChatMessage.objects.get(id=assistant_message_id, session=session) #type: ignore
+    reply = generate_reply(session, reply)
+    return {"session": chat_session_id, "message": reply.id, "status": reply.status, "metrics": reply.metrics}
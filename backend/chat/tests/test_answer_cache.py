@@ -0,0 +1,84 @@
+from unittest import mock
+from django.test import TransactionTestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from chat.models import ChatMessage, ChatSession
+from chat.services import answer_cache
+from jobs.services.embedding import embed_file
+from upload.models import Project
+
+
+@override_settings(EMBEDDING_DIMENSIONS=64, SEMANTIC_CACHE_THRESHOLD=0.95)
+class AnswerCacheTests(ServicesTestMixin, TransactionTestCase):
+    # The agent graph retrieves on executor threads with their own connections, so data must be committed
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Oncology") #type: ignore
+
+    def entry(self, answer):
+        return {"question": "q", "answer": answer, "sources": [], "generation_ms": 800.0}
+
+    def test_similar_questions_share_an_answer(self):
+        model, vector = answer_cache.embed_question("What raises breast cancer risk?")
+        answer_cache.store(self.project, model, vector, self.entry("BRCA1 mutations"))
+
+        hit, similarity = answer_cache.lookup(self.project, *answer_cache.embed_question("what raises BREAST cancer risk"))
+        miss, unrelated = answer_cache.lookup(self.project, *answer_cache.embed_question("How do proteins fold?"))
+
+        self.assertEqual((hit["answer"], round(similarity, 4)), ("BRCA1 mutations", 1.0))
+        self.assertIsNone(miss)
+        self.assertLess(unrelated, 0.95)
+
+    def test_changing_the_documents_invalidates_answers(self):
+        model, vector = answer_cache.embed_question("What raises breast cancer risk?")
+        answer_cache.store(self.project, model, vector, self.entry("BRCA1 mutations"))
+
+        self.project.bump_documents_version()
+
+        self.assertEqual(answer_cache.lookup(self.project, model, vector), (None, None))
+
+    @override_settings(SEMANTIC_CACHE_MAX_ENTRIES=1)
+    def test_full_groups_stop_growing(self):
+        model, vector = answer_cache.embed_question("What raises breast cancer risk?")
+
+        self.assertTrue(answer_cache.store(self.project, model, vector, self.entry("first")))
+        self.assertFalse(answer_cache.store(self.project, model, vector, self.entry("second")))
+        self.assertEqual(self.redis.llen(f"{answer_cache.group_key(self.project, model)}:entries"), 1)
+
+    def ask(self, question, session=None):
+        session = session or ChatSession.objects.create(user=self.user, project=self.project) #type: ignore
+        response = self.client.post(f"/api/chat/sessions/{session.id}/messages/", {"content": question}, format="json")
+        self.assertEqual(response.status_code, 202, response.content)
+        return ChatMessage.objects.get(id=response.json()["message"]["id"]) #type: ignore
+
+    def test_repeated_question_skips_retrieval_and_generation(self):
+        first = self.ask("What raises breast cancer risk?")
+
+        with mock.patch("chat.services.replies.run_agent_graph", side_effect=AssertionError("generated again")):
+            second = self.ask("what raises breast cancer risk")
+
+        self.assertEqual((first.metrics["cache"], second.metrics["cache"]), ("miss", "hit"))
+        self.assertEqual(second.content, first.content)
+        stats = self.client.get("/api/chat/sessions/cache-stats/", {"project": str(self.project.id)}).json()
+        self.assertEqual((stats["lookups"], stats["hits"], stats["hit_rate"]), (2, 1, 0.5))
+
+    def test_attaching_a_file_invalidates_cached_answers(self):
+        first = self.ask("What raises breast cancer risk?")
+        file = create_file(self.user, ["BRCA1 mutations raise breast cancer risk"])
+        embed_file(file)
+        self.client.post(f"/api/projects/{self.project.id}/attach-file/", {"file_id": str(file.id)}, format="json")
+
+        second = self.ask("What raises breast cancer risk?")
+
+        self.assertEqual(second.metrics["cache"], "miss")
+        self.assertNotEqual(second.content, first.content)
+        self.assertIn("BRCA1", second.content)
+
+    def test_follow_up_questions_are_not_cached(self):
+        first = self.ask("What raises breast cancer risk?")
+
+        follow_up = self.ask("What raises breast cancer risk?", session=first.session)
+
+        self.assertNotIn("cache", follow_up.metrics)
@@ -0,0 +1,61 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from chat.utils import context
+from chat.utils.context import hamming, pack_context, simhash
+from chat.agents.graph import pack
+
+REPORT = (
+    "Mutations in the BRCA1 gene substantially raise the lifetime risk of breast and ovarian cancer, "
+    "and carriers are usually offered earlier and more frequent screening together with genetic counselling "
+    "for their relatives, while preventive surgery remains an option discussed case by case with each patient."
+)
+REUPLOADED = REPORT.replace("substantially", "considerably")
+FOLDING = "Protein folding kinetics depend on temperature, denaturant concentration and the topology of the native state."
+
+
+def chunk(chunk_id, text):
+    return {"chunk_id": chunk_id, "text": text}
+
+
+@override_settings(CHAT_CONTEXT_DEDUP_DISTANCE=3)
+class PackContextTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        # Without network access tiktoken cannot fetch its BPE file; pin the estimate of 4 chars a token
+        self.enterContext(mock.patch.object(context, "encoding", lambda: None))
+
+    def test_simhash_distance_tracks_text_similarity(self):
+        self.assertEqual(simhash(REPORT), simhash(REPORT.upper() + "  "))
+        self.assertLessEqual(hamming(simhash(REPORT), simhash(REUPLOADED)), 3)
+        self.assertGreater(hamming(simhash(REPORT), simhash(FOLDING)), 20)
+
+    def test_near_duplicates_are_dropped(self):
+        packed, report = pack_context([chunk(1, REPORT), chunk(2, REUPLOADED), chunk(3, FOLDING)], budget=1000)
+
+        self.assertEqual([item["chunk_id"] for item in packed], [1, 3])
+        self.assertEqual((report["duplicates"], report["tokens_saved"]), (1, -(-len(REUPLOADED) // 4)))
+
+    def test_lower_ranked_chunks_fill_the_remaining_budget(self):
+        long, short = "x" * 400, "y" * 40
+        chunks = [chunk(1, "a" * 200), chunk(2, long), chunk(3, short)]
+
+        packed, report = pack_context(chunks, budget=70)
+
+        self.assertEqual([item["chunk_id"] for item in packed], [1, 3])
+        self.assertEqual([item["tokens"] for item in packed], [50, 10])
+        self.assertEqual(report, {
+            "candidates": 3, "packed": 2, "duplicates": 0, "over_budget": 1,
+            "tokens_retrieved": 160, "tokens_packed": 60, "tokens_saved": 100,
+        })
+
+    def test_best_chunk_is_truncated_rather_than_dropped(self):
+        packed, _ = pack_context([chunk(1, "z" * 1000)], budget=10)
+
+        self.assertEqual((packed[0]["text"], packed[0]["tokens"]), ("z" * 40, 10))
+
+    @override_settings(CHAT_CONTEXT_TOKEN_BUDGET=3000)
+    def test_graph_reports_what_packing_dropped(self):
+        state = pack({"context": [chunk(1, REPORT), chunk(2, REUPLOADED)]})
+
+        self.assertEqual(len(state["context"]), 1)
+        self.assertEqual(state["context_report"]["duplicates"], 1)
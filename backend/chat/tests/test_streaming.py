@@ -0,0 +1,145 @@
+import asyncio
+import json
+from unittest import mock
+import fakeredis
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_user
+from chat.models import ChatMessage, ChatSession
+from chat.services import streaming
+from chat.services.streaming import (
+    DONE, SOURCES, TOKEN, EventCursor, StreamPublisher, astream_events, backlog_key, format_sse, stream_events,
+)
+
+
+def parse_sse(body):
+    """``(id, event, data)`` of every event in a ``text/event-stream`` body, keep-alives skipped."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.split("\n") if not line.startswith(":"))
+        if fields:
+            events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+class FramingTests(SimpleTestCase):
+    def test_format_sse(self):
+        event = {"seq": 3, "type": TOKEN, "token": "Hi"}
+
+        self.assertEqual(format_sse(event), f"id: 3\nevent: token\ndata: {json.dumps(event)}\n\n")
+        self.assertEqual(format_sse(None), ": keep-alive\n\n")
+
+    def test_cursor_drops_duplicates_and_anything_after_the_end(self):
+        cursor = EventCursor(last_seq=1)
+        payloads = [json.dumps({"seq": seq, "type": kind}) for seq, kind in [(1, SOURCES), (2, TOKEN), (3, DONE), (4, TOKEN)]]
+
+        events = cursor.accept(payloads + payloads[:2])
+
+        self.assertEqual([event["seq"] for event in events], [2, 3])
+        self.assertTrue(cursor.finished)
+
+
+@override_settings(CHAT_STREAM_HEARTBEAT=0.01)
+class StreamEventsTests(ServicesTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.publisher = StreamPublisher(7)
+
+    def publish_reply(self, *tokens):
+        self.publisher.publish(SOURCES, sources=[])
+        for token in tokens:
+            self.publisher.publish(TOKEN, token=token)
+        self.publisher.publish(DONE, message_id=7)
+
+    def test_late_client_replays_the_backlog(self):
+        self.publish_reply("Hello", " world")
+
+        events = list(stream_events(7))
+
+        self.assertEqual([(event["seq"], event["type"]) for event in events], [(1, SOURCES), (2, TOKEN), (3, TOKEN), (4, DONE)])
+        self.assertGreater(self.redis.ttl(backlog_key(7)), 0)
+
+    def test_reconnect_resumes_after_last_event_id(self):
+        self.publish_reply("Hello", " world")
+
+        self.assertEqual([event["seq"] for event in stream_events(7, last_seq=2)], [3, 4])
+
+    def test_live_events_follow_heartbeats(self):
+        events = stream_events(7)
+
+        self.assertIsNone(next(events))
+        self.publish_reply("Hi")
+
+        self.assertEqual([event["type"] for event in events], [SOURCES, TOKEN, DONE])
+
+    @override_settings(CHAT_STREAM_TIMEOUT=0.05)
+    def test_stalled_reply_times_out(self):
+        self.publisher.publish(SOURCES, sources=[])
+
+        events = [event for event in stream_events(7) if event is not None]
+
+        self.assertEqual(events[-1], {"seq": 2, "type": "error", "error": "Timed out waiting for the reply"})
+
+    async def test_async_streams_share_one_subscription(self):
+        server = self.redis.connection_pool.connection_kwargs["server"]
+        with mock.patch.object(streaming.aioredis, "Redis", lambda **kwargs: fakeredis.FakeAsyncRedis(server=server)):
+            first, second = astream_events(7), astream_events(7, last_seq=1)
+            self.assertIsNone(await anext(first))
+            self.assertIsNone(await anext(second))
+            self.publish_reply("Hi")
+
+            results = await asyncio.gather(collect(first), collect(second))
+
+            self.assertEqual([event["seq"] for event in results[0]], [1, 2, 3])
+            self.assertEqual([event["seq"] for event in results[1]], [2, 3])
+            self.assertEqual(streaming.stream_hub().queues, {})
+
+
+class StreamViewTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.session = ChatSession.objects.create(user=self.user) #type: ignore
+
+    def ask(self, question):
+        response = self.client.post(f"/api/chat/sessions/{self.session.id}/messages/", {"content": question}, format="json")
+        self.assertEqual(response.status_code, 202, response.content)
+        return response.json()
+
+    def stream(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return parse_sse(b"".join(response.streaming_content).decode())
+
+    def test_reply_tokens_stream_then_done(self):
+        started = self.ask("What is known about folding?")
+
+        events = self.stream(started["stream_url"])
+
+        reply = ChatMessage.objects.get(id=started["message"]["id"]) #type: ignore
+        self.assertEqual(reply.status, ChatMessage.Status.COMPLETE)
+        self.assertEqual([event for _, event, _ in events[:1] + events[-1:]], [SOURCES, DONE])
+        self.assertEqual("".join(data["token"] for _, event, data in events if event == TOKEN), reply.content)
+        self.assertEqual([seq for seq, _, _ in events], list(range(1, len(events) + 1)))
+        self.assertEqual(events[-1][2]["metrics"]["tokens"], len(events) - 2)
+
+    def test_finished_reply_is_replayed_from_the_database_once_the_backlog_expires(self):
+        started = self.ask("What is known about folding?")
+        self.redis.delete(backlog_key(started["message"]["id"]))
+
+        events = self.stream(started["stream_url"], last_event_id="1")
+
+        reply = ChatMessage.objects.get(id=started["message"]["id"]) #type: ignore
+        self.assertEqual([(seq, event) for seq, event, _ in events], [(2, TOKEN), (3, DONE)])
+        self.assertEqual(events[0][2]["token"], reply.content)
+
+    def test_other_users_replies_are_not_found(self):
+        started = self.ask("What is known about folding?")
+
+        response = api_client(create_user("someone-else@example.com")).get(started["stream_url"])
+
+        self.assertEqual(response.status_code, 404)
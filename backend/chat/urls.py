@@ -1,5 +1,10 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from .views import stream_message
+from .viewsets import ChatMessageViewSet, ChatSessionViewSet
 
-router = DefaultRouter() 
+router = DefaultRouter()
+router.register(r"chat/sessions", ChatSessionViewSet, basename="chat-session")
+router.register(r"chat/messages", ChatMessageViewSet, basename="chat-message")
 
-urlpatterns = router.urls   
\ No newline at end of file
+urlpatterns = [path("chat/messages/<int:pk>/stream/", stream_message, name="chat-message-stream")] + router.urls
@@ -0,0 +1,99 @@
+"""Context assembly between retrieval and generation.
+
+Retrieved chunks are de-duplicated with 64-bit SimHash fingerprints (near-identical text
+from overlapping or re-uploaded documents differs in only a few bits) and then packed,
+best first, into CHAT_CONTEXT_TOKEN_BUDGET tokens counted with tiktoken.
+"""
+import hashlib
+import logging
+import re
+from functools import lru_cache
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+SHINGLE_WORDS = 3
+BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def encoding():
+    """The tiktoken encoding, or None when it cannot be loaded (its BPE file is fetched once)."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(settings.CHAT_CONTEXT_ENCODING)
+    except Exception as exc:
+        logger.warning("tiktoken encoding %s unavailable, estimating tokens: %s", settings.CHAT_CONTEXT_ENCODING, exc)
+        return None
+
+
+def count_tokens(texts):
+    enc = encoding()
+    if enc is None:
+        return [max(1, -(-len(text) // CHARS_PER_TOKEN)) for text in texts]
+    return [len(tokens) for tokens in enc.encode_ordinary_batch(list(texts))]
+
+
+def truncate(text, tokens):
+    enc = encoding()
+    if enc is None:
+        return text[:tokens * CHARS_PER_TOKEN]
+    return enc.decode(enc.encode_ordinary(text)[:tokens])
+
+
+def simhash(text):
+    """64-bit SimHash over overlapping word shingles."""
+    words = WORD_RE.findall(text.lower())
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little") for shingle in shingles],
+        dtype=np.uint64,
+    )
+    votes = ((hashes[:, None] & BITS) != 0).sum(axis=0) * 2 > len(hashes)
+    return int((BITS * votes).sum())
+
+
+def hamming(first, second):
+    return (first ^ second).bit_count()
+
+
+def pack_context(chunks, budget=None):
+    """Keep the best-ranked chunks that are not near-duplicates of a kept one and fit ``budget`` tokens.
+
+    ``chunks`` are retrieval results, best first. Returns the packed chunks (each with a
+    ``tokens`` count) and a report of what was dropped and the tokens saved.
+    """
+    budget = budget or settings.CHAT_CONTEXT_TOKEN_BUDGET
+    token_counts = count_tokens(chunk["text"] for chunk in chunks)
+    packed, fingerprints = [], []
+    duplicates = over_budget = used = 0
+    for chunk, tokens in zip(chunks, token_counts):
+        fingerprint = simhash(chunk["text"])
+        if any(hamming(fingerprint, kept) <= settings.CHAT_CONTEXT_DEDUP_DISTANCE for kept in fingerprints):
+            duplicates += 1
+            continue
+        if used + tokens > budget and packed:
+            # A smaller, lower-ranked chunk may still fit
+            over_budget += 1
+            continue
+        if tokens > budget:
+            # Never answer without context just because the best chunk alone is too long
+            chunk = {**chunk, "text": truncate(chunk["text"], budget)}
+            tokens = budget
+        fingerprints.append(fingerprint)
+        packed.append({**chunk, "tokens": tokens})
+        used += tokens
+    retrieved = sum(token_counts)
+    return packed, {
+        "candidates": len(chunks),
+        "packed": len(packed),
+        "duplicates": duplicates,
+        "over_budget": over_budget,
+        "tokens_retrieved": retrieved,
+        "tokens_packed": used,
+        "tokens_saved": retrieved - used,
+    }
@@ -0,0 +1,69 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from chat.models import ChatMessage
+from chat.services import ahas_backlog, astream_events, format_sse, has_backlog, stream_events
+from chat.services.streaming import DONE, ERROR, SOURCES, TOKEN
+
+
+def stored_events(reply):
+    """The events of a finished reply rebuilt from what was saved, as a single token."""
+    yield {"seq": 1, "type": SOURCES, "sources": reply.sources}
+    yield {"seq": 2, "type": TOKEN, "token": reply.content}
+    if reply.status == ChatMessage.Status.FAILED:
+        yield {"seq": 3, "type": ERROR, "error": reply.error_msg}
+    else:
+        yield {"seq": 3, "type": DONE, "message_id": reply.id, "metrics": reply.metrics}
+
+
+async def aiter_sse(events):
+    async for event in events:
+        yield format_sse(event)
+
+
+def iter_sse(events, last_seq):
+    for event in events:
+        if event is None or event["seq"] > last_seq:
+            yield format_sse(event)
+
+
+async def astored_events(reply, last_seq):
+    for event in iter_sse(stored_events(reply), last_seq):
+        yield event
+
+
+@require_GET
+async def stream_message(request, pk):
+    """Server-sent events of an assistant reply: ``sources``, one ``token`` per token, then ``done``.
+
+    Reconnecting clients send ``Last-Event-ID`` and resume after it. Replies that finished
+    longer ago than the stream backlog is kept are replayed from the database. Under ASGI
+    the stream is an async iterator, so an open stream costs no thread; under WSGI it
+    occupies its worker thread until the reply ends.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    reply = await ChatMessage.objects.filter(id=pk, session__user=request.user).afirst() #type: ignore
+    if reply is None:
+        return JsonResponse({"detail": "No ChatMessage matches the given query."}, status=404)
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        last_seq = 0
+
+    finished = reply.status in (ChatMessage.Status.COMPLETE, ChatMessage.Status.FAILED)
+    if isinstance(request, ASGIRequest):
+        if finished and not await ahas_backlog(reply.id):
+            content = astored_events(reply, last_seq)
+        else:
+            content = aiter_sse(astream_events(reply.id, last_seq))
+    elif finished and not has_backlog(reply.id):
+        content = iter_sse(stored_events(reply), last_seq)
+    else:
+        content = iter_sse(stream_events(reply.id, last_seq), last_seq)
+
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream, which would hold every token until the end
+    response["X-Accel-Buffering"] = "no"
+    return response
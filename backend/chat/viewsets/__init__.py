@@ -1 +1,3 @@
-# Utility helpers for chat app 
\ No newline at end of file
+from .chat import ChatMessageViewSet, ChatSessionViewSet
+
+__all__ = ['ChatMessageViewSet', 'ChatSessionViewSet']
@@ -0,0 +1,57 @@
+from django.urls import reverse
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from chat.models import ChatMessage, ChatSession
+from chat.serializers import ChatMessageCreateSerializer, ChatMessageSerializer, ChatSessionSerializer
+from chat.services.answer_cache import cache_stats
+from chat.tasks import run_agent, start_reply
+from upload.models import Project
+
+
+class ChatSessionViewSet(viewsets.ModelViewSet):
+    """The user's chat sessions; posting a message starts a streamed assistant reply."""
+    serializer_class = ChatSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ChatSession.objects.filter(user=self.request.user) #type: ignore
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=["get", "post"])
+    def messages(self, request, pk=None):
+        """GET lists the conversation; POST queues a reply and returns where to stream it from."""
+        session = self.get_object()
+        if request.method == "GET":
+            return Response(ChatMessageSerializer(session.messages.all(), many=True).data)
+        payload = ChatMessageCreateSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        reply = start_reply(session, payload.validated_data["content"])
+        run_agent.delay(session.id, payload.validated_data["content"], reply.id)
+        return Response(
+            {
+                "message": ChatMessageSerializer(reply).data,
+                "stream_url": reverse("chat-message-stream", args=[reply.id]),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=False, methods=["get"], url_path="cache-stats")
+    def cache_stats(self, request):
+        """Semantic answer cache hit rate and generation time saved for ``?project=<id>``."""
+        project_id = serializers.UUIDField().run_validation(request.query_params.get("project"))
+        project = Project.objects.filter(id=project_id, user=request.user, is_deleted=False).first() #type: ignore
+        if project is None:
+            raise NotFound("Project not found")
+        return Response(cache_stats(project))
+
+
+class ChatMessageViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ChatMessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ChatMessage.objects.filter(session__user=self.request.user) #type: ignore
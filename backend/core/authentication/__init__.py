@@ -0,0 +1,4 @@
+from .policy import PUBLIC, TOKEN, AuthRouter, auth_policy, public
+from .tokens import CachedJWTAuthentication
+
+__all__ = ['PUBLIC', 'TOKEN', 'AuthRouter', 'auth_policy', 'public', 'CachedJWTAuthentication']
@@ -0,0 +1,74 @@
+"""Per-route authentication policy, declared on views and compiled once from the URL config.
+
+Views are token-protected unless marked ``@public``: a function view, an APIView/ViewSet
+class, or a single viewset action (so e.g. ``POST /api/auth/`` can be public while
+``GET /api/auth/`` is not). ``AuthRouter`` walks the URL patterns, keeps the public
+(route, method) pairs and compiles them into one regex per HTTP method, so classifying a
+request is a single match no matter how many routes exist.
+"""
+import re
+from django.conf import settings
+from django.urls import URLResolver, get_resolver
+
+PUBLIC, TOKEN = "public", "token"
+HTTP_METHODS = ("get", "post", "put", "patch", "delete", "head", "options")
+NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+NEVER = re.compile(r"(?!)")
+
+
+def auth_policy(policy):
+    def decorate(view):
+        view.auth_policy = policy
+        return view
+    return decorate
+
+
+public = auth_policy(PUBLIC)
+
+
+def view_policy(callback, method):
+    """The policy of ``callback`` (a resolved URL callback) for one HTTP method, or None if it does not handle it."""
+    cls = getattr(callback, "cls", None) or getattr(callback, "view_class", None)
+    if cls is None:
+        return getattr(callback, "auth_policy", TOKEN)
+    actions = getattr(callback, "actions", None)
+    handler_name = actions.get(method) if actions is not None else method
+    handler = getattr(cls, handler_name, None) if handler_name else None
+    if handler is None:
+        return None
+    return getattr(handler, "auth_policy", None) or getattr(cls, "auth_policy", TOKEN)
+
+
+def iter_routes(patterns, prefix=""):
+    """``(regex, callback)`` for every endpoint under ``patterns``, regexes joined from their includes."""
+    for pattern in patterns:
+        regex = pattern.pattern.regex.pattern.removeprefix("^")
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, prefix + regex)
+        else:
+            yield prefix + regex.removesuffix(r"\Z").removesuffix("$"), pattern.callback
+
+
+class AuthRouter:
+    """Tells whether a request needs a token, from the URL config's ``@public`` declarations."""
+
+    def __init__(self, urlconf=None, exempt_prefixes=None):
+        exempt_prefixes = settings.AUTH_EXEMPT_PREFIXES if exempt_prefixes is None else exempt_prefixes
+        self.exempt = re.compile("|".join(re.escape(prefix) for prefix in exempt_prefixes)) if exempt_prefixes else NEVER
+        public_routes = {method: [] for method in HTTP_METHODS}
+        for regex, callback in iter_routes(get_resolver(urlconf).url_patterns):
+            for method in HTTP_METHODS:
+                if view_policy(callback, method) == PUBLIC:
+                    # Callers' groups are irrelevant here and would clash once alternated
+                    public_routes[method].append(NAMED_GROUP.sub("(?:", regex))
+        self.public = {
+            method: re.compile("/(?:" + "|".join(f"(?:{regex})" for regex in routes) + r")\Z") if routes else NEVER
+            for method, routes in public_routes.items()
+        }
+
+    def requires_token(self, path, method):
+        if self.exempt.match(path):
+            return False
+        public = self.public.get(method.lower(), NEVER)
+        # Trailing slash does not matter
+        return not (public.match(path) or (not path.endswith('/') and public.match(path + '/')))
@@ -0,0 +1,28 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from core.services.token_cache import authenticate_token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reuses what ``TokenAuthMiddleware`` already established.
+
+    Requests the middleware authenticated from the ``access_token`` cookie are not validated
+    a second time; a bearer token in the Authorization header goes through the same cache.
+    """
+
+    def authenticate(self, request):
+        authenticated = getattr(request._request, 'token_auth', None)
+        if authenticated is not None:
+            return authenticated
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        user, validated_token = authenticate_token(raw_token, self)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user, validated_token
@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
@@ -7,44 +8,64 @@ from rest_framework import status
 from rest_framework.renderers import JSONRenderer
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
+from core.authentication import AuthRouter
+from core.services.token_cache import authenticate_token
 
 User = get_user_model()
 
 class TokenAuthMiddleware:
+    """Authenticates requests from the ``access_token`` cookie.
+
+    Tokens and users come from ``core.services.token_cache``, so steady-state requests make
+    no auth queries, and the result is left on ``request.token_auth`` for DRF's
+    ``CachedJWTAuthentication`` instead of being validated again. Which requests need a token
+    is decided by ``core.authentication.AuthRouter`` from the views' ``@public`` declarations.
+
+    Runs natively under both WSGI and ASGI; in async mode only the user lookup is pushed
+    to a thread, so async views keep the event loop free.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.jwt_authentication = JWTAuthentication()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.authenticate(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.requires_token(request):
+            # On the shared sync thread, where the (rare) user query reuses the request's connection
+            response = await sync_to_async(self.authenticate)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    @cached_property
+    def router(self):
+        # Built on first use rather than in __init__, once the URL config can be imported
+        return AuthRouter()
+
+    def requires_token(self, request):
         # Exempt CSRF for API endpoints
-        
         if request.path.startswith('/api/'):
             setattr(request, '_dont_enforce_csrf_checks', True)
+        return self.router.requires_token(request.path, request.method)
 
-        # Skip authentication for static files, media files, and admin
-        if (request.path.startswith('/static/') or 
-            request.path.startswith('/media/') or 
-            request.path.startswith('/admin/') or
-            request.path.startswith('/__debug__/')):
-            return self.get_response(request)
-
-        public_paths = [
-            '/api/auth/login/',
-            '/api/auth/forgot-password/',
-            '/api/auth/reset-password/',
-            '/api/auth/google-auth-initiate/',
-            '/api/auth/google-auth-callback/',
-            '/api/auth/register/',
-        ]
-        
-        # Allow POST to create user - handle both with and without trailing slash
-        if (request.path == '/api/auth/' or request.path == '/api/auth') and request.method == 'POST':
-            return self.get_response(request)
-        
-        # Normalize path to ensure trailing slash doesn't matter
-        normalized_path = request.path if request.path.endswith('/') else request.path + '/'
-        if normalized_path in public_paths:
-            return self.get_response(request)
+    def authenticate(self, request):
+        """Set ``request.user`` from the cookie; returns a 401 response when that is not possible."""
+        if not self.requires_token(request):
+            return None
 
         # For all other paths, use token authentication.
         access_token = request.COOKIES.get('access_token')
@@ -60,8 +81,7 @@ class TokenAuthMiddleware:
             return response.render()
 
         try:
-            validated_token = self.jwt_authentication.get_validated_token(access_token)
-            user = self.jwt_authentication.get_user(validated_token)
+            user, validated_token = authenticate_token(access_token, self.jwt_authentication)
             
             if not user.is_active:
                 response = Response(
@@ -75,6 +95,7 @@ class TokenAuthMiddleware:
                 
             request.user = user
             request.auth = validated_token
+            request.token_auth = (user, validated_token)
         except (InvalidToken, TokenError) as e:
             response = Response(
                 {'detail': 'Invalid token.'},
@@ -85,4 +106,4 @@ class TokenAuthMiddleware:
             response.renderer_context = {} #type: ignore
             return response.render()
 
-        return self.get_response(request)
\ No newline at end of file
+        return None
@@ -42,6 +42,18 @@ class User(AbstractUser, TimeStampedModel):
     def __str__(self):
         return self.email 
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Authenticated requests read a cached snapshot of the user; deactivation, a new password
+        # or any profile edit must reach them. Imported here: the cache imports the user model.
+        from core.services.token_cache import forget_user_on_commit
+        forget_user_on_commit(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from core.services.token_cache import forget_user_on_commit
+        forget_user_on_commit(self.pk)
+        return super().delete(*args, **kwargs)
+
 class PasswordResetToken(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     token = models.CharField(max_length=255)
@@ -0,0 +1,169 @@
+"""Validated access tokens and the users they belong to, cached so steady-state requests skip the database.
+
+Two tiers:
+
+* in-process: token digest -> (validated token, user snapshot), kept AUTH_CACHE_LOCAL_TTL
+  seconds (never past the token's own expiry), so repeated requests skip both the JWT
+  signature check and Redis;
+* Redis: ``auth:user:<id>`` -> JSON snapshot of the user's columns, kept AUTH_CACHE_TTL
+  seconds and shared by every process.
+
+``User.save()`` and ``User.delete()`` call ``forget_user`` once committed, which drops the
+Redis snapshot and this process's entries; other processes notice within
+AUTH_CACHE_LOCAL_TTL seconds. Snapshots leave out the password hash, which is loaded on
+demand (``check_password``) as a deferred field.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+# Never copied out of the database into a cache
+PRIVATE_FIELDS = ("password",)
+
+
+@lru_cache(maxsize=1)
+def redis_client():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+def user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def snapshot_fields():
+    User = get_user_model()
+    return [field for field in User._meta.concrete_fields if field.attname not in PRIVATE_FIELDS]
+
+
+def snapshot(user):
+    """The user's cacheable columns as a JSON string."""
+    return json.dumps(
+        {field.attname: field.get_prep_value(field.value_from_object(user)) for field in snapshot_fields()},
+        cls=DjangoJSONEncoder,
+    )
+
+
+def restore(data):
+    """A fresh, saved-looking User instance from ``snapshot`` output; every request gets its own."""
+    values = json.loads(data)
+    fields = snapshot_fields()
+    return get_user_model().from_db(
+        "default", [field.attname for field in fields], [field.to_python(values[field.attname]) for field in fields],
+    )
+
+
+class LocalTokenCache:
+    """A bounded LRU of token digest -> (deadline, user id, validated token, user snapshot)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return entry
+
+    def set(self, digest, ttl, user_id, token, data):
+        with self.lock:
+            self.entries[digest] = (time.monotonic() + ttl, user_id, token, data)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def forget_user(self, user_id):
+        with self.lock:
+            for digest in [digest for digest, entry in self.entries.items() if entry[1] == user_id]:
+                del self.entries[digest]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalTokenCache(settings.AUTH_CACHE_LOCAL_MAX_ENTRIES)
+
+
+def load_snapshot(user_id):
+    """The user's snapshot from Redis, falling back to (and repopulating from) the database.
+
+    Raises ``get_user_model().DoesNotExist`` for unknown users.
+    """
+    key = user_key(user_id)
+    try:
+        data = redis_client().get(key)
+    except redis.RedisError as e:
+        logger.warning("Auth cache read failed, using the database: %s", e)
+        data = None
+    if data is not None:
+        return data.decode() if isinstance(data, bytes) else data
+    data = snapshot(get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id}))
+    try:
+        redis_client().set(key, data, ex=settings.AUTH_CACHE_TTL)
+    except redis.RedisError as e:
+        logger.warning("Auth cache write failed: %s", e)
+    return data
+
+
+def authenticate_token(raw_token, jwt_authentication):
+    """``(user, validated_token)`` for an access token, from cache where possible.
+
+    Raises ``InvalidToken``/``TokenError`` like ``JWTAuthentication``. Inactive users are
+    returned as such; callers decide how to reject them.
+    """
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode()
+    digest = hashlib.sha256(raw_token).hexdigest()
+    entry = local_cache.get(digest)
+    if entry is not None:
+        _, _, validated_token, data = entry
+        return restore(data), validated_token
+
+    validated_token = jwt_authentication.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+    try:
+        data = load_snapshot(user_id)
+    except get_user_model().DoesNotExist:
+        raise InvalidToken("User not found")
+
+    # Never serve the token from cache past its own expiry
+    ttl = min(settings.AUTH_CACHE_LOCAL_TTL, validated_token["exp"] - time.time())
+    if ttl > 0:
+        local_cache.set(digest, ttl, str(user_id), validated_token, data)
+    return restore(data), validated_token
+
+
+def forget_user(user_id):
+    """Drop every cached copy of the user this process can reach (their Redis snapshot and local tokens)."""
+    local_cache.forget_user(str(user_id))
+    try:
+        redis_client().delete(user_key(user_id))
+    except redis.RedisError as e:
+        logger.warning("Auth cache invalidation failed for user %s: %s", user_id, e)
+
+
+def forget_user_on_commit(user_id):
+    transaction.on_commit(lambda: forget_user(user_id))
@@ -0,0 +1,90 @@
+"""Shared test scaffolding: an in-process Redis, eager Celery, throwaway storage and API clients."""
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+import fakeredis
+import redis
+from django.core.cache.backends.redis import RedisCacheClient
+from django.test import override_settings
+from rest_framework.test import APIClient
+from chat.services import streaming
+from core.models import User
+from core.services import token_cache
+from core.services.auth import AuthService
+from jobs.services import embedding_cache
+from search.services import indexing
+from upload.models import DocumentChunk, File
+from project_root.celery_app import app
+
+
+class ServicesTestMixin:
+    """Runs each test against its own services instead of the ones in settings.
+
+    * every Redis client (raw ``redis.Redis.from_url`` ones and Django's cache) talks to a
+      fresh fakeredis server, available as ``self.redis``;
+    * Celery tasks run eagerly and their exceptions propagate;
+    * per-process clients and providers cached from settings are rebuilt for every test;
+    * media, chunked uploads, indexes, analytics and the embedding cache live in a
+      temporary directory, ``self.root``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server)
+        self.enterContext(mock.patch.object(
+            redis.Redis, "from_url", lambda *args, **kwargs: fakeredis.FakeRedis(server=server),
+        ))
+        self.enterContext(mock.patch.object(
+            RedisCacheClient, "get_client", lambda client, key=None, *, write=False: fakeredis.FakeRedis(server=server),
+        ))
+        for cached in (token_cache.redis_client, streaming.redis_client, indexing.embedding_provider):
+            cached.cache_clear()
+            self.addCleanup(cached.cache_clear)
+        token_cache.local_cache.clear()
+        self.addCleanup(token_cache.local_cache.clear)
+        self.enterContext(mock.patch.object(embedding_cache, "_cache", None))
+
+        eager = {"task_always_eager": app.conf.task_always_eager, "task_eager_propagates": app.conf.task_eager_propagates}
+        app.conf.update(task_always_eager=True, task_eager_propagates=True)
+        self.addCleanup(app.conf.update, **eager)
+
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=str(self.root / "media"),
+            CHUNKED_UPLOAD_ROOT=str(self.root / "chunks"),
+            VECTOR_INDEX_ROOT=str(self.root / "vectors"),
+            ANALYTICS_ROOT=str(self.root / "analytics"),
+            DUCKDB_FILE=str(self.root / "analytics.duckdb"),
+            EMBEDDING_CACHE_PATH=str(self.root / "embedding_cache.sqlite3"),
+        ))
+
+
+def create_user(email="researcher@example.com", **extra):
+    return User.objects.create_user(email=email, username=email, password="correct-horse-battery", **extra) #type: ignore
+
+
+def api_client(user):
+    """An APIClient carrying ``user``'s access token the way the frontend does, in the cookie."""
+    client = APIClient()
+    client.cookies["access_token"] = AuthService.get_tokens_for_user(user)["access"]
+    return client
+
+
+def create_file(user, chunks=(), name="paper.txt"):
+    """A File parsed into ``chunks`` (one text per page), without any stored content."""
+    file = File.objects.create( #type: ignore
+        user=user, file=f"files/{name}", file_name=name, file_size=0, file_type="text/plain", file_path=f"files/{name}",
+        file_extension=".txt", file_hash="", file_url="", parsed_version=1 if chunks else 0,
+    )
+    DocumentChunk.objects.bulk_create([ #type: ignore
+        DocumentChunk(
+            file=file, page_number=page, position=0, text=text, char_count=len(text),
+            content_hash=hashlib.sha256(text.encode()).hexdigest(),
+        )
+        for page, text in enumerate(chunks, start=1)
+    ])
+    return file
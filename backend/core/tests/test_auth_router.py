@@ -0,0 +1,102 @@
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase
+from django.urls import include, path
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.routers import SimpleRouter
+from rest_framework.views import APIView
+from core.authentication import AuthRouter, public
+from .helpers import ServicesTestMixin
+
+
+@public
+def health(request):
+    return HttpResponse("ok")
+
+
+def private(request):
+    return HttpResponse("secret")
+
+
+@public
+class StatusView(APIView):
+    def get(self, request):
+        return Response()
+
+
+class NotesViewSet(viewsets.ViewSet):
+    def list(self, request):
+        return Response([])
+
+    @public
+    def create(self, request):
+        return Response()
+
+    @public
+    @action(detail=True, methods=["get"], url_path="preview")
+    def preview(self, request, pk=None):
+        return Response()
+
+
+router = SimpleRouter()
+router.register(r"notes", NotesViewSet, basename="notes")
+
+urlpatterns = [
+    path("health/", health),
+    path("private/", private),
+    path("status/<int:code>/", StatusView.as_view()),
+    path("api/", include(router.urls)),
+]
+
+
+class AuthRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = AuthRouter(urlconf=__name__, exempt_prefixes=["/static/"])
+
+    def assertPolicies(self, expected):
+        actual = {(method, path): not self.router.requires_token(path, method) for method, path in expected}
+        self.assertEqual(actual, expected)
+
+    def test_views_are_protected_unless_declared_public(self):
+        self.assertPolicies({
+            ("GET", "/health/"): True,
+            ("GET", "/private/"): False,
+            ("GET", "/status/404/"): True,
+            ("GET", "/status/oops/"): False,
+            ("GET", "/unknown/"): False,
+        })
+
+    def test_viewset_actions_have_their_own_policy(self):
+        self.assertPolicies({
+            ("POST", "/api/notes/"): True,
+            ("GET", "/api/notes/"): False,
+            ("GET", "/api/notes/7/preview/"): True,
+            ("POST", "/api/notes/7/preview/"): False,
+        })
+
+    def test_paths_match_with_or_without_the_trailing_slash_but_not_as_prefixes(self):
+        self.assertPolicies({
+            ("GET", "/health"): True,
+            ("GET", "/health/extra/"): False,
+            ("GET", "/xhealth/"): False,
+        })
+
+    def test_exempt_prefixes_need_no_token(self):
+        self.assertPolicies({("GET", "/static/app.js"): True, ("POST", "/static/"): True})
+
+
+class ProjectRoutesTests(ServicesTestMixin, TestCase):
+    def test_sign_in_routes_are_public(self):
+        router = AuthRouter()
+
+        self.assertFalse(router.requires_token("/api/auth/login/", "POST"))
+        self.assertFalse(router.requires_token("/api/auth/", "POST"))
+        self.assertTrue(router.requires_token("/api/auth/", "GET"))
+        self.assertTrue(router.requires_token("/api/projects/", "GET"))
+
+    def test_middleware_lets_public_requests_through_without_a_cookie(self):
+        login = self.client.post("/api/auth/login/", {}, content_type="application/json")
+        projects = self.client.get("/api/projects/")
+
+        self.assertEqual((login.status_code, projects.status_code), (400, 401))
@@ -0,0 +1,117 @@
+import time
+from datetime import timedelta
+from unittest import mock
+import redis
+from django.test import SimpleTestCase, TestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+from core.services import token_cache
+from core.services.token_cache import LocalTokenCache, authenticate_token
+from .helpers import ServicesTestMixin, api_client, create_user
+
+
+class LocalTokenCacheTests(SimpleTestCase):
+    def test_least_recently_used_tokens_are_evicted(self):
+        cache = LocalTokenCache(2)
+        for digest in ("a", "b"):
+            cache.set(digest, 60, "user", None, "{}")
+        cache.get("a")
+
+        cache.set("c", 60, "user", None, "{}")
+
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_expired_tokens_are_dropped(self):
+        cache = LocalTokenCache(2)
+        cache.set("a", -1, "user", None, "{}")
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.entries, {})
+
+
+class TokenCacheTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.token = str(AccessToken.for_user(self.user))
+        self.jwt = JWTAuthentication()
+
+    def test_steady_state_skips_the_database_and_the_signature_check(self):
+        with self.assertNumQueries(1):
+            user, _ = authenticate_token(self.token, self.jwt)
+        self.assertEqual(user.pk, self.user.pk)
+
+        with self.assertNumQueries(0), mock.patch.object(self.jwt, "get_validated_token") as validate:
+            self.assertEqual(authenticate_token(self.token, self.jwt)[0].email, self.user.email)
+        validate.assert_not_called()
+
+        # Another process: no local entry, but the Redis snapshot
+        token_cache.local_cache.clear()
+        with self.assertNumQueries(0):
+            authenticate_token(self.token, self.jwt)
+
+    def test_password_hashes_are_not_cached_but_still_checkable(self):
+        authenticate_token(self.token, self.jwt)
+
+        self.assertNotIn(b"password", self.redis.get(token_cache.user_key(self.user.pk)))
+        user, _ = authenticate_token(self.token, self.jwt)
+        self.assertTrue(user.check_password("correct-horse-battery"))
+
+    def test_saving_the_user_drops_every_cached_copy(self):
+        authenticate_token(self.token, self.jwt)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertIsNone(self.redis.get(token_cache.user_key(self.user.pk)))
+        self.assertFalse(authenticate_token(self.token, self.jwt)[0].is_active)
+
+    def test_tokens_are_not_cached_past_their_expiry(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=2))
+
+        authenticate_token(str(token), self.jwt)
+
+        (deadline, *_), = token_cache.local_cache.entries.values()
+        self.assertLessEqual(deadline - time.monotonic(), 2)
+
+    def test_unknown_users_are_rejected(self):
+        token = str(AccessToken.for_user(self.user))
+        self.user.delete()
+
+        with self.assertRaises(InvalidToken):
+            authenticate_token(token, self.jwt)
+
+    def test_falls_back_to_the_database_without_redis(self):
+        broken = mock.Mock(**{"get.side_effect": redis.ConnectionError("down"), "set.side_effect": redis.ConnectionError("down")})
+
+        with mock.patch.object(token_cache, "redis_client", return_value=broken), self.assertLogs(token_cache.logger, "WARNING"):
+            user, _ = authenticate_token(self.token, self.jwt)
+
+        self.assertEqual(user.pk, self.user.pk)
+
+
+class MiddlewareAuthTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+
+    def test_token_is_validated_once_per_request(self):
+        with mock.patch.object(JWTAuthentication, "get_validated_token", autospec=True, side_effect=JWTAuthentication.get_validated_token) as validate:
+            response = self.client.get("/api/jobs/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(validate.call_count, 1)
+
+    def test_deactivated_users_are_turned_away(self):
+        self.client.get("/api/jobs/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        response = self.client.get("/api/jobs/")
+
+        self.assertEqual((response.status_code, response.json()["detail"]), (401, "User account is disabled."))
@@ -13,6 +13,7 @@ from django.utils.http import urlencode
 import secrets
 from django.core.exceptions import ValidationError
 from core.services.auth import AuthService
+from core.authentication import public
 
 
 class AuthViewSet(ModelViewSet):
@@ -37,6 +38,7 @@ class AuthViewSet(ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
+    @public
     @action(detail=False, methods=['post'])
     def login(self, request):
         """
@@ -128,6 +130,7 @@ class AuthViewSet(ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @public
     @action(detail=False, methods=['get'], url_path='google-auth-initiate')
     def google_auth_initiate(self, request):
         """
@@ -159,6 +162,7 @@ class AuthViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @public
     @action(detail=False, methods=['get'], url_path='google-auth-callback')
     def google_auth_callback(self, request, *args, **kwargs):
         """
@@ -173,6 +177,7 @@ class AuthViewSet(ModelViewSet):
         except ValidationError as e:
             return AuthService.google_auth_callback(request)
 
+    @public
     def create(self, request, *args, **kwargs):
         """
         Create a new user account
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,3 @@
+from .job import Job, JobShard
+
+__all__ = ["Job", "JobShard"]
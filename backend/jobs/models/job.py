@@ -0,0 +1,98 @@
+import uuid
+from django.db import models
+from django.db.models import Avg, OuterRef, Subquery
+from django.utils import timezone
+from upload.models import File
+
+class Job(models.Model):
+    class Type(models.TextChoices):
+        PARSE = "parse", "Parse"
+        EMBED = "embed", "Embed"
+        STATS = "stats", "Stats"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        ERROR = "error", "Error"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    doc = models.ForeignKey(File, related_name="jobs", null=True, on_delete=models.CASCADE)
+    job_type = models.CharField(max_length=20, choices=Type.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    progress = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    error_msg = models.TextField(blank=True)
+    metrics = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def mark_running(self):
+        self.status = self.Status.RUNNING
+        self.started_at = timezone.now()
+        self.save(update_fields=["status", "started_at"])
+
+    def set_progress(self, progress):
+        self.progress = round(min(max(progress, 0), 100), 2)
+        self.save(update_fields=["progress"])
+
+    def mark_done(self):
+        self.status = self.Status.DONE
+        self.progress = 100
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "progress", "finished_at"])
+
+    def mark_error(self, msg: str):
+        self.status = self.Status.ERROR
+        self.error_msg = msg
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "error_msg", "finished_at"])
+
+    def refresh_progress(self):
+        """Recompute progress as the mean of the shard progresses in a single UPDATE."""
+        shard_average = (
+            JobShard.objects.filter(job=OuterRef("pk")) #type: ignore
+            .values("job")
+            .annotate(average=Avg("progress"))
+            .values("average")
+        )
+        Job.objects.filter(pk=self.pk).update(progress=Subquery(shard_average)) #type: ignore
+
+
+class JobShard(models.Model):
+    """A slice of a Job (e.g. a page range of a document) processed by its own Celery task."""
+    job = models.ForeignKey(Job, related_name="shards", on_delete=models.CASCADE)
+    index = models.IntegerField()
+    start_page = models.IntegerField()
+    end_page = models.IntegerField()
+    status = models.CharField(max_length=20, choices=Job.Status.choices, default=Job.Status.PENDING)
+    progress = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    error_msg = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["index"]
+        unique_together = ("job", "index")
+
+    def mark_running(self):
+        self.status = Job.Status.RUNNING
+        self.started_at = timezone.now()
+        self.save(update_fields=["status", "started_at"])
+
+    def set_progress(self, progress):
+        self.progress = round(min(max(progress, 0), 100), 2)
+        self.save(update_fields=["progress"])
+        self.job.refresh_progress()
+
+    def mark_done(self):
+        self.status = Job.Status.DONE
+        self.finished_at = timezone.now()
+        self.set_progress(100)
+        self.save(update_fields=["status", "finished_at"])
+
+    def mark_error(self, msg: str):
+        self.status = Job.Status.ERROR
+        self.error_msg = msg
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "error_msg", "finished_at"])
@@ -1,7 +0,0 @@
-from rest_framework import serializers
-from .models import Job
-
-class JobSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Job
-        fields = "__all__" 
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .job import JobSerializer
+
+__all__ = ["JobSerializer"]
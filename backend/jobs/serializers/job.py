@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from jobs.models import Job, JobShard
+
+class JobShardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobShard
+        exclude = ["job"]
+
+class JobSerializer(serializers.ModelSerializer):
+    shards = JobShardSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Job
+        fields = "__all__"
\ No newline at end of file
@@ -0,0 +1,378 @@
+"""Usage analytics answered by DuckDB from Parquet exports of the application tables.
+
+A STATS job exports usage facts under ``ANALYTICS_ROOT``; dashboard queries then read
+those files through an in-process DuckDB connection and never touch the OLTP database.
+
+- Files and projects, the big and growing tables, are exported as change logs: each run
+  appends only the rows whose ``updated_at`` passed the last watermark, as Parquet parts
+  under ``<table>/month=YYYY-MM/`` (the month the row was created, so every version of a
+  row lands in the same partition). Views keep the newest version of each row, and
+  compaction folds a partition's parts into one, dropping rows deleted since.
+- Project membership, jobs and per-file chunk totals are small snapshots in
+  ``<table>.parquet``, re-exported only when a cheap aggregate over them has moved.
+"""
+import calendar
+import glob
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, NamedTuple
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from jobs.models import Job
+from search.services.segments import index_lock
+from upload.models import ChunkEmbedding, DocumentChunk, File, Project
+
+EXPORT_BATCH_ROWS = 10_000
+STATE = "STATE"
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+
+class ChangeLog(NamedTuple):
+    model: type  # needs id, created_at and an indexed updated_at
+    schema: pa.Schema
+
+
+class FactTable(NamedTuple):
+    rows: Callable  # -> iterable of tuples in schema order
+    schema: pa.Schema
+    signature: Callable  # -> JSON-able value that changes whenever the rows may have
+
+
+CHANGE_LOGS = {
+    "files": ChangeLog(
+        model=File,
+        schema=pa.schema([
+            ("id", pa.string()), ("user_id", pa.string()), ("blob_id", pa.string()), ("file_size", pa.int64()),
+            ("file_type", pa.string()), ("file_extension", pa.string()), ("file_status", pa.string()),
+            ("created_at", TIMESTAMP), ("updated_at", TIMESTAMP),
+        ]),
+    ),
+    "projects": ChangeLog(
+        model=Project,
+        schema=pa.schema([
+            ("id", pa.string()), ("user_id", pa.string()), ("status", pa.string()), ("is_deleted", pa.bool_()),
+            ("created_at", TIMESTAMP), ("updated_at", TIMESTAMP),
+        ]),
+    ),
+}
+
+FACTS = {
+    "project_files": FactTable(
+        rows=lambda: Project.files.through.objects.values_list("project_id", "file_id"),
+        schema=pa.schema([("project_id", pa.string()), ("file_id", pa.string())]),
+        signature=lambda: Project.files.through.objects.aggregate(rows=Count("id"), last=Max("id")),
+    ),
+    "jobs": FactTable(
+        rows=lambda: Job.objects.values_list( #type: ignore
+            "id", "doc_id", "job_type", "status", "created_at", "started_at", "finished_at",
+        ),
+        schema=pa.schema([
+            ("id", pa.string()), ("doc_id", pa.string()), ("job_type", pa.string()), ("status", pa.string()),
+            ("created_at", TIMESTAMP), ("started_at", TIMESTAMP), ("finished_at", TIMESTAMP),
+        ]),
+        signature=lambda: Job.objects.aggregate( #type: ignore
+            rows=Count("id"), created=Max("created_at"), started=Max("started_at"), finished=Max("finished_at"),
+        ),
+    ),
+    # One row per parsed file rather than per chunk: dashboards only ever need the totals
+    "chunks": FactTable(
+        rows=lambda: DocumentChunk.objects.order_by().values("file_id").annotate( #type: ignore
+            chunks=Count("id", distinct=True), chars=Sum("char_count"), embeddings=Count("embeddings"),
+        ).values_list("file_id", "chunks", "chars", "embeddings"),
+        schema=pa.schema([("file_id", pa.string()), ("chunks", pa.int64()), ("chars", pa.int64()), ("embeddings", pa.int64())]),
+        signature=lambda: {
+            **DocumentChunk.objects.aggregate(rows=Count("id"), last=Max("id")), #type: ignore
+            **ChunkEmbedding.objects.aggregate(embeddings=Count("id"), last_embedding=Max("id")), #type: ignore
+        },
+    ),
+}
+
+
+def fact_path(name):
+    return os.path.join(settings.ANALYTICS_ROOT, f"{name}.parquet")
+
+
+def log_path(name):
+    return os.path.join(settings.ANALYTICS_ROOT, name)
+
+
+def log_parts(directory):
+    return sorted(glob.glob(os.path.join(directory, "*.parquet")))
+
+
+def read_state():
+    try:
+        with open(os.path.join(settings.ANALYTICS_ROOT, STATE)) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def write_state(state):
+    pending = os.path.join(settings.ANALYTICS_ROOT, f"{STATE}.{uuid.uuid4().hex}")
+    with open(pending, "w") as fh:
+        json.dump(state, fh, default=str)
+    os.replace(pending, os.path.join(settings.ANALYTICS_ROOT, STATE))
+
+
+def batches(rows):
+    batch = []
+    for row in rows.iterator(chunk_size=EXPORT_BATCH_ROWS):
+        batch.append(row)
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def record_batch(rows, schema):
+    """Column-wise Arrow batch of ``rows``; ids and other non-native values become strings."""
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array([None if value is None else str(value) for value in column], type=field.type)
+            if field.type == pa.string() else pa.array(column, type=field.type)
+            for column, field in zip(columns, schema)
+        ],
+        schema=schema,
+    )
+
+
+def write_part(directory, table):
+    """Write ``table`` as a new part of ``directory``; it only becomes visible once complete."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{uuid.uuid4().hex}"
+    pending = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, pending)
+    os.replace(pending, os.path.join(directory, f"{name}.parquet"))
+
+
+def export_table(name, table):
+    """Stream ``table``'s rows into a fresh Parquet file that replaces the old one atomically.
+
+    An empty table still gets a (schema-only) file, so every view and join over it works.
+    """
+    pending = f"{fact_path(name)}.{uuid.uuid4().hex}"
+    count = 0
+    with pq.ParquetWriter(pending, table.schema) as writer:
+        for batch in batches(table.rows()):
+            writer.write_batch(record_batch(batch, table.schema))
+            count += len(batch)
+    os.replace(pending, fact_path(name))
+    return count
+
+
+def export_changes(name, log, watermark=None):
+    """Append the rows of ``log`` changed since ``watermark`` to its month partitions.
+
+    Rows are re-read from ``ANALYTICS_WATERMARK_OVERLAP`` seconds before the watermark, so
+    a transaction that committed late with an older ``updated_at`` is still picked up; the
+    duplicates this produces are resolved by the views and by compaction. Returns the row
+    count and the new watermark.
+    """
+    rows = log.model.objects.order_by().values_list(*log.schema.names)
+    if watermark is not None:
+        rows = rows.filter(updated_at__gte=watermark - timedelta(seconds=settings.ANALYTICS_WATERMARK_OVERLAP))
+    count = 0
+    for batch in batches(rows):
+        record = record_batch(batch, log.schema)
+        months = pc.strftime(record.column("created_at"), format="%Y-%m")
+        for month in pc.unique(months).to_pylist():
+            write_part(
+                os.path.join(log_path(name), f"month={month}"),
+                pa.Table.from_batches([record.filter(pc.equal(months, month))]),
+            )
+        newest = pc.max(record.column("updated_at")).as_py()
+        watermark = newest if watermark is None else max(watermark, newest)
+        count += len(batch)
+    return count, watermark
+
+
+def export_facts(force=False):
+    """Append changed files/projects and re-export snapshots whose signature moved.
+
+    ``force`` re-exports every snapshot (change logs are always incremental; delete a
+    log's directory and its watermark to rebuild it). Returns per-table row counts.
+    """
+    started = time.perf_counter()
+    os.makedirs(settings.ANALYTICS_ROOT, exist_ok=True)
+    with index_lock(settings.ANALYTICS_ROOT):
+        state = read_state()
+        watermarks, signatures = state.get("watermarks", {}), state.get("signatures", {})
+        tables = {}
+        for name, log in CHANGE_LOGS.items():
+            watermark = parse_datetime(watermarks[name]) if watermarks.get(name) else None
+            tables[name], watermark = export_changes(name, log, watermark)
+            if watermark is not None:
+                watermarks[name] = watermark.isoformat()
+        for name, table in FACTS.items():
+            signature = json.loads(json.dumps(table.signature(), default=str))
+            if not force and signatures.get(name) == signature and os.path.exists(fact_path(name)):
+                tables[name] = "unchanged"
+                continue
+            tables[name] = export_table(name, table)
+            signatures[name] = signature
+        write_state({"watermarks": watermarks, "signatures": signatures, "exported_at": timezone.now().isoformat()})
+        # The database file only holds views over the Parquet files, for ad hoc SQL sessions
+        with duckdb.connect(settings.DUCKDB_FILE) as connection:
+            register_views(connection)
+    return {"tables": tables, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def month_bounds(month):
+    year, number = map(int, month.split("-"))
+    start = datetime(year, number, 1, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=calendar.monthrange(year, number)[1])
+
+
+def compact_partition(log, directory):
+    """Fold a partition's parts into one holding the newest version of each row still in the database.
+
+    Returns ``(parts_before, rows_after)``, or None if the partition is already compact.
+    """
+    parts = log_parts(directory)
+    start, stop = month_bounds(os.path.basename(directory).split("=", 1)[1])
+    live = pa.table({"id": pa.array(
+        [str(row_id) for row_id in log.model.objects.filter(created_at__gte=start, created_at__lt=stop).values_list("id", flat=True)],
+        type=pa.string(),
+    )})
+    # A single part has one version per row already; it only needs rewriting if rows were deleted
+    if len(parts) == 1 and pq.ParquetFile(parts[0]).metadata.num_rows == live.num_rows:
+        return None
+    with duckdb.connect() as connection:
+        connection.register("live", live)
+        compacted = connection.execute(
+            "SELECT * FROM read_parquet($parts, hive_partitioning = false) WHERE id IN (SELECT id FROM live) "
+            "QUALIFY row_number() OVER (PARTITION BY id ORDER BY updated_at DESC) = 1",
+            {"parts": parts},
+        ).arrow()
+    if compacted.num_rows:
+        write_part(directory, compacted.cast(log.schema))
+    for part in parts:
+        # A dashboard query that globbed the old parts may fail once and be retried
+        os.remove(part)
+    return len(parts), compacted.num_rows
+
+
+def compact_facts():
+    """Compact every change-log partition; returns per table the partitions rewritten and parts merged."""
+    os.makedirs(settings.ANALYTICS_ROOT, exist_ok=True)
+    compacted = {}
+    with index_lock(settings.ANALYTICS_ROOT):
+        for name, log in CHANGE_LOGS.items():
+            results = [
+                compact_partition(log, directory)
+                for directory in sorted(glob.glob(os.path.join(log_path(name), "month=*")))
+            ]
+            results = [result for result in results if result is not None]
+            compacted[name] = {"partitions": len(results), "parts": sum(parts for parts, _ in results)}
+    return compacted
+
+
+def register_views(connection, empty=False):
+    """One view per fact table; change logs resolve to the newest version of each row.
+
+    Tables not exported yet are skipped, or with ``empty`` stood in for by an empty table
+    of the right shape (only possible on an in-memory connection).
+    """
+    for name, log in CHANGE_LOGS.items():
+        if glob.glob(os.path.join(log_path(name), "month=*", "*.parquet")):
+            connection.execute(
+                f"CREATE OR REPLACE VIEW {name} AS SELECT * EXCLUDE (month) "
+                f"FROM read_parquet('{log_path(name)}/month=*/*.parquet', hive_partitioning = true) "
+                "QUALIFY row_number() OVER (PARTITION BY id ORDER BY updated_at DESC) = 1"
+            )
+        elif empty:
+            connection.from_arrow(log.schema.empty_table()).create_view(name)
+    for name in FACTS:
+        if os.path.exists(fact_path(name)):
+            connection.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_parquet('{fact_path(name)}')")
+
+
+def exported_at():
+    return read_state().get("exported_at")
+
+
+def connect():
+    """An in-memory DuckDB connection with one view per fact table; no lock on the database file."""
+    connection = duckdb.connect()
+    register_views(connection, empty=True)
+    return connection
+
+
+def fetch(connection, sql, params=()):
+    cursor = connection.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def storage_per_user(connection, user_id=None):
+    """Files and bytes per user; ``stored_bytes`` counts content shared by several files once."""
+    return fetch(connection, """
+        WITH contents AS (
+            SELECT user_id, coalesce(blob_id, id) AS content, any_value(file_size) AS size, count(*) AS copies
+            FROM files GROUP BY user_id, content
+        )
+        SELECT user_id, sum(copies)::BIGINT AS files, sum(size * copies)::BIGINT AS bytes, sum(size)::BIGINT AS stored_bytes
+        FROM contents WHERE $user_id IS NULL OR user_id = $user_id
+        GROUP BY user_id ORDER BY bytes DESC
+    """, {"user_id": user_id})
+
+
+def documents_per_project(connection, user_id=None):
+    return fetch(connection, """
+        SELECT p.id AS project_id, p.user_id, count(pf.file_id) AS documents,
+               coalesce(sum(f.file_size), 0)::BIGINT AS bytes, coalesce(sum(c.chunks), 0)::BIGINT AS chunks
+        FROM projects p
+        LEFT JOIN project_files pf ON pf.project_id = p.id
+        LEFT JOIN files f ON f.id = pf.file_id
+        LEFT JOIN chunks c ON c.file_id = pf.file_id
+        WHERE NOT p.is_deleted AND ($user_id IS NULL OR p.user_id = $user_id)
+        GROUP BY p.id, p.user_id ORDER BY documents DESC
+    """, {"user_id": user_id})
+
+
+def job_latency(connection, user_id=None):
+    """Run time (started -> finished) and queue wait percentiles of completed parse and embed jobs, in ms."""
+    return fetch(connection, """
+        WITH done AS (
+            SELECT j.job_type,
+                   date_diff('millisecond', j.started_at, j.finished_at) AS run_ms,
+                   date_diff('millisecond', j.created_at, j.started_at) AS wait_ms
+            FROM jobs j JOIN files f ON f.id = j.doc_id
+            WHERE j.status = 'done' AND j.started_at IS NOT NULL AND j.finished_at IS NOT NULL
+              AND ($user_id IS NULL OR f.user_id = $user_id)
+        )
+        SELECT job_type, count(*) AS jobs,
+               round(quantile_cont(run_ms, 0.5), 1) AS p50_ms, round(quantile_cont(run_ms, 0.9), 1) AS p90_ms,
+               round(quantile_cont(run_ms, 0.99), 1) AS p99_ms, round(quantile_cont(wait_ms, 0.5), 1) AS wait_p50_ms
+        FROM done GROUP BY job_type ORDER BY job_type
+    """, {"user_id": user_id})
+
+
+def usage_summary(user_id=None):
+    """Every dashboard aggregate, for one user or (``user_id`` None) everyone."""
+    user_id = str(user_id) if user_id is not None else None
+    for attempt in range(2):
+        try:
+            with connect() as connection:
+                return {
+                    "exported_at": exported_at(),
+                    "storage": storage_per_user(connection, user_id),
+                    "projects": documents_per_project(connection, user_id),
+                    "job_latency": job_latency(connection, user_id),
+                }
+        except duckdb.IOException:
+            # Compaction removed a part between listing and reading it; the next listing is consistent
+            if attempt:
+                raise
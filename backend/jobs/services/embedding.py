@@ -0,0 +1,139 @@
+"""Batched embedding of parsed document chunks."""
+import hashlib
+import re
+import time
+import numpy as np
+from django.conf import settings
+from upload.models import DocumentChunk, ChunkEmbedding
+from .embedding_cache import get_embedding_cache
+
+VECTOR_DTYPE = np.dtype("<f4")
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def pack_vectors(matrix):
+    """Rows of a float matrix as packed little-endian float32 bytes."""
+    matrix = np.ascontiguousarray(matrix, dtype=VECTOR_DTYPE)
+    return [row.tobytes() for row in matrix]
+
+
+def unpack_vector(data):
+    return np.frombuffer(bytes(data), dtype=VECTOR_DTYPE)
+
+
+class HashEmbeddingProvider:
+    """Deterministic feature-hashing embedder: no network or model weights, stable across processes.
+
+    Unigrams and bigrams are hashed into signed buckets and the result is L2-normalized,
+    so texts sharing vocabulary land close together. Meant for offline runs and tests.
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.name = f"hash-{dimensions}"
+
+    def _features(self, text):
+        tokens = TOKEN_RE.findall(text.lower())
+        return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dimensions), dtype=VECTOR_DTYPE)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.array(
+                [int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little") for feature in features],
+                dtype=np.uint64,
+            )
+            signs = np.where(hashes >> np.uint64(63), 1.0, -1.0).astype(VECTOR_DTYPE)
+            np.add.at(matrix[row], (hashes % np.uint64(self.dimensions)).astype(np.intp), signs)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+
+class OpenAIEmbeddingProvider:
+    def __init__(self, model, dimensions):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.name = model
+        self.dimensions = dimensions
+        self.client = OpenAIEmbeddings(model=model, dimensions=dimensions)
+
+    def embed(self, texts):
+        return np.asarray(self.client.embed_documents(list(texts)), dtype=VECTOR_DTYPE)
+
+
+def get_embedding_provider():
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbeddingProvider(settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS)
+    if settings.EMBEDDING_PROVIDER == "hash":
+        return HashEmbeddingProvider(settings.EMBEDDING_DIMENSIONS)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {settings.EMBEDDING_PROVIDER!r}")
+
+
+def embed_texts(provider, content_hashes, texts, cache=None):
+    """Vectors (packed bytes) for ``texts``, computing only those whose content hash is not cached.
+
+    Returns ``(vectors, hits)`` where ``hits`` counts texts served from the cache. Identical
+    texts within the batch are embedded once.
+    """
+    cache = cache or get_embedding_cache()
+    cache_model = f"{provider.name}:{provider.dimensions}"
+    unique = dict(zip(content_hashes, texts))
+    cached = cache.get_many(cache_model, unique.keys())
+    missing = [content_hash for content_hash in unique if content_hash not in cached]
+    if missing:
+        computed = dict(zip(missing, pack_vectors(provider.embed([unique[content_hash] for content_hash in missing]))))
+        cache.set_many(cache_model, computed)
+        cached.update(computed)
+    hits = sum(1 for content_hash in content_hashes if content_hash not in missing)
+    return [cached[content_hash] for content_hash in content_hashes], hits
+
+
+def embed_file(file, provider=None, batch_size=None, on_progress=None, cache=None):
+    """Embed every chunk of ``file`` that has no vector for the provider's model yet.
+
+    Chunks are sent to the provider ``batch_size`` at a time; per-chunk calls are what
+    blow the latency budget, so batching is the whole point. Chunks whose text is already
+    in the embedding cache skip the provider entirely. Returns throughput metrics.
+    """
+    provider = provider or get_embedding_provider()
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    pending = (
+        DocumentChunk.objects.filter(file=file) #type: ignore
+        .exclude(embeddings__model_name=provider.name)
+        .order_by("id")
+    )
+    total = pending.count()
+    started = time.perf_counter()
+    done, hits, last_id = 0, 0, 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id).values_list("id", "text", "content_hash")[:batch_size])
+        if not batch:
+            break
+        ids, texts, content_hashes = zip(*batch)
+        vectors, batch_hits = embed_texts(provider, content_hashes, texts, cache=cache)
+        ChunkEmbedding.objects.bulk_create( #type: ignore
+            [
+                ChunkEmbedding(chunk_id=chunk_id, model_name=provider.name, dimensions=provider.dimensions, vector=vector)
+                for chunk_id, vector in zip(ids, vectors)
+            ],
+            ignore_conflicts=True,
+        )
+        done += len(ids)
+        hits += batch_hits
+        last_id = ids[-1]
+        if on_progress and total:
+            on_progress(done * 100 / total)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "model": provider.name,
+        "batch_size": batch_size,
+        "chunks": done,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(done / elapsed, 1) if elapsed and done else 0.0,
+        "cache_hits": hits,
+        "cache_hit_rate": round(hits / done, 4) if done else 0.0,
+    }
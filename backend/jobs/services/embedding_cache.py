@@ -0,0 +1,168 @@
+"""Persistent LRU cache of embedding vectors keyed by (model, chunk content hash).
+
+Identical chunk text always hashes to the same key, so re-parsed documents and files
+attached to new projects reuse vectors instead of paying for them again.
+"""
+import logging
+import sqlite3
+import threading
+import time
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NullEmbeddingCache:
+    def get_many(self, model, hashes):
+        return {}
+
+    def set_many(self, model, vectors):
+        pass
+
+
+class RedisEmbeddingCache:
+    """Vectors live under ``emb:<model>:<hash>``; a sorted set of last-access times drives eviction."""
+
+    LRU_KEY = "emb:lru"
+
+    def __init__(self, url, max_entries):
+        self.client = redis.Redis.from_url(url)
+        self.max_entries = max_entries
+
+    def _key(self, model, content_hash):
+        return f"emb:{model}:{content_hash}"
+
+    def get_many(self, model, hashes):
+        hashes = list(hashes)
+        if not hashes:
+            return {}
+        keys = [self._key(model, content_hash) for content_hash in hashes]
+        found = {content_hash: value for content_hash, value in zip(hashes, self.client.mget(keys)) if value is not None}
+        if found:
+            now = time.time()
+            self.client.zadd(self.LRU_KEY, {self._key(model, content_hash): now for content_hash in found}, xx=True)
+        return found
+
+    def set_many(self, model, vectors):
+        if not vectors:
+            return
+        now = time.time()
+        entries = {self._key(model, content_hash): vector for content_hash, vector in vectors.items()}
+        pipeline = self.client.pipeline()
+        pipeline.mset(entries)
+        pipeline.zadd(self.LRU_KEY, {key: now for key in entries})
+        pipeline.zcard(self.LRU_KEY)
+        overflow = pipeline.execute()[-1] - self.max_entries
+        if overflow > 0:
+            evicted = [key for key, _ in self.client.zpopmin(self.LRU_KEY, overflow)]
+            self.client.delete(*evicted)
+
+
+class DiskEmbeddingCache:
+    """SQLite file shared by the worker processes on one host."""
+
+    # SQLite caps the number of bound parameters per statement
+    LOOKUP_BATCH = 500
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT, hash TEXT, vector BLOB, last_used REAL, PRIMARY KEY (model, hash))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            # Triggers keep the row count in one row, so writes never count the whole table
+            connection.executescript(
+                "BEGIN IMMEDIATE;"
+                "CREATE TABLE IF NOT EXISTS embedding_count (id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER);"
+                "INSERT OR IGNORE INTO embedding_count SELECT 1, COUNT(*) FROM embeddings;"
+                "CREATE TRIGGER IF NOT EXISTS embeddings_inserted AFTER INSERT ON embeddings "
+                "BEGIN UPDATE embedding_count SET entries = entries + 1; END;"
+                "CREATE TRIGGER IF NOT EXISTS embeddings_deleted AFTER DELETE ON embeddings "
+                "BEGIN UPDATE embedding_count SET entries = entries - 1; END;"
+                "COMMIT;"
+            )
+            self.local.connection = connection
+        return connection
+
+    def get_many(self, model, hashes):
+        hashes = list(hashes)
+        found = {}
+        for start in range(0, len(hashes), self.LOOKUP_BATCH):
+            batch = hashes[start:start + self.LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})", [model, *batch],
+            ).fetchall()
+            found.update(rows)
+        if found:
+            now = time.time()
+            self.connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                [(now, model, content_hash) for content_hash in found],
+            )
+        return found
+
+    def set_many(self, model, vectors):
+        if not vectors:
+            return
+        now = time.time()
+        connection = self.connection
+        # An upsert, not INSERT OR REPLACE: the replace's implicit delete would skip the delete trigger
+        connection.executemany(
+            "INSERT INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (model, hash) DO UPDATE SET vector = excluded.vector, last_used = excluded.last_used",
+            [(model, content_hash, vector, now) for content_hash, vector in vectors.items()],
+        )
+        overflow = connection.execute("SELECT entries FROM embedding_count").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            connection.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                [overflow],
+            )
+
+
+class FailSafeEmbeddingCache:
+    """An unreachable cache degrades to misses instead of failing the embed job."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_many(self, model, hashes):
+        try:
+            return self.backend.get_many(model, hashes)
+        except (redis.RedisError, sqlite3.Error) as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+
+    def set_many(self, model, vectors):
+        try:
+            self.backend.set_many(model, vectors)
+        except (redis.RedisError, sqlite3.Error) as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+
+_cache = None
+
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        if settings.EMBEDDING_CACHE_BACKEND == "redis":
+            backend = RedisEmbeddingCache(settings.REDIS_URL, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        elif settings.EMBEDDING_CACHE_BACKEND == "disk":
+            backend = DiskEmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        else:
+            backend = NullEmbeddingCache()
+        _cache = FailSafeEmbeddingCache(backend)
+    return _cache
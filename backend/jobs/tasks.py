@@ -1,7 +1,67 @@
 from project_root.celery_app import app
+from jobs.models import Job
+from upload.models import File
+from jobs.services.analytics import compact_facts, export_facts
+from jobs.services.embedding import embed_file
+from search.tasks import sync_file_indexes
+
+def run_embed_job(job):
+    # The chunks being embedded are those of this content version; a re-parse that lands
+    # meanwhile moves parsed_version on and leaves the file stale for the next pass
+    version = job.doc.parsed_version
+    job.metrics = embed_file(job.doc, on_progress=job.set_progress)
+    job.save(update_fields=["metrics"])
+    File.objects.filter(id=job.doc_id, parsed_version=version).update(embedded_version=version) #type: ignore
+    sync_file_indexes.delay(str(job.doc_id), ["vector"])
+
+def run_parse_job(job):
+    from upload.tasks import parse_document
+
+    parse_document.delay(str(job.doc_id), str(job.id))
+
+def run_stats_job(job):
+    job.metrics = export_facts()
+    job.save(update_fields=["metrics"])
+
+JOB_HANDLERS = {
+    Job.Type.PARSE: run_parse_job,
+    Job.Type.EMBED: run_embed_job,
+    Job.Type.STATS: run_stats_job,
+}
 
 @app.task(name="jobs.tasks.process_job")
-def process_job(job_id: int):
-    """Process a Job entity: placeholder stub."""
-    # TODO: replace with real pipeline (ingest, embed, etc.)
-    return {"status": "processed", "job_id": job_id} 
\ No newline at end of file
+def process_job(job_id: str):
+    """Run a Job through the pipeline stage matching its type."""
+    job = Job.objects.select_related("doc").get(id=job_id) #type: ignore
+    handler = JOB_HANDLERS.get(job.job_type)
+    if handler is None:
+        job.mark_error(f"No handler for {job.job_type} jobs")
+        return {"status": "error", "job_id": job_id}
+    if job.job_type == Job.Type.PARSE:
+        # Parsing runs (and tracks its own status) on the upload_tasks queue
+        handler(job)
+        return {"status": "queued", "job_id": job_id}
+
+    job.mark_running()
+    try:
+        handler(job)
+    except Exception as e:
+        job.mark_error(str(e))
+        raise
+    job.mark_done()
+    return {"status": "processed", "job_id": job_id, "metrics": job.metrics}
+
+def enqueue_job(file, job_type):
+    job = Job.objects.create(doc=file, job_type=job_type) #type: ignore
+    process_job.delay(str(job.id))
+    return job
+
+@app.task(name="jobs.tasks.export_analytics")
+def export_analytics():
+    """Periodic STATS job appending the usage facts changed since the last export."""
+    return {"job_id": str(enqueue_job(None, Job.Type.STATS).id)}
+
+@app.task(name="jobs.tasks.compact_analytics")
+def compact_analytics():
+    """Fold the analytics change-log parts written since the last run and drop deleted rows."""
+    return {"compacted": compact_facts()}
@@ -0,0 +1,98 @@
+import os
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils import timezone
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from jobs.models import Job
+from jobs.services.analytics import export_facts, usage_summary
+from upload.models import File, Project
+
+
+class AnalyticsTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.admin = api_client(create_user("admin@example.com", is_staff=True))
+        shared = os.urandom(100)
+        self.paper, self.copy = self.upload(shared, "paper.pdf"), self.upload(shared, "copy.pdf")
+        self.notes = self.upload(os.urandom(50), "notes.txt")
+        self.other_user = create_user("someone-else@example.com")
+        api_client(self.other_user).post(
+            "/api/files/", {"file": SimpleUploadedFile("theirs.pdf", os.urandom(70))}, format="multipart",
+        )
+
+    def upload(self, data, name):
+        response = self.client.post("/api/files/", {"file": SimpleUploadedFile(name, data)}, format="multipart")
+        return File.objects.get(id=response.json()["id"]) #type: ignore
+
+    def refresh(self):
+        response = self.admin.post("/api/jobs/analytics/refresh/")
+        self.assertEqual(response.status_code, 202, response.content)
+        return Job.objects.get(id=response.json()["id"]) #type: ignore
+
+    def test_nothing_to_report_before_the_first_export(self):
+        self.assertEqual(self.client.get("/api/jobs/analytics/").status_code, 503)
+
+    def test_only_staff_can_refresh(self):
+        self.assertEqual(self.client.post("/api/jobs/analytics/refresh/").status_code, 403)
+
+    def test_storage_counts_shared_content_once(self):
+        self.refresh()
+
+        storage = self.client.get("/api/jobs/analytics/").json()["storage"]
+
+        self.assertEqual(storage, [{"user_id": str(self.user.id), "files": 3, "bytes": 250, "stored_bytes": 150}])
+
+    def test_documents_per_project(self):
+        project = Project.objects.create(user=self.user, name="Oncology") #type: ignore
+        project.files.add(self.paper, self.notes, create_file(self.user, ["Abstract", "Methods"]))
+        Project.objects.create(user=self.user, name="Empty") #type: ignore
+        Project.objects.create(user=self.user, name="Gone", is_deleted=True) #type: ignore
+        self.refresh()
+
+        projects = self.client.get("/api/jobs/analytics/").json()["projects"]
+
+        self.assertEqual(
+            [(row["project_id"], row["documents"], row["bytes"], row["chunks"]) for row in projects[:1]],
+            [(str(project.id), 3, 150, 2)],
+        )
+        self.assertEqual([row["documents"] for row in projects], [3, 0])
+
+    def test_job_latency_percentiles(self):
+        created = timezone.now() - timedelta(hours=1)
+        started = created + timedelta(milliseconds=10)
+        Job.objects.bulk_create([ #type: ignore
+            Job(doc=self.paper, job_type=Job.Type.PARSE, status=Job.Status.DONE, started_at=started,
+                finished_at=started + timedelta(milliseconds=run_ms))
+            for run_ms in (100, 200, 300, 400, 500)
+        ])
+        Job.objects.update(created_at=created) #type: ignore
+        Job.objects.create(doc=self.paper, job_type=Job.Type.EMBED, status=Job.Status.ERROR) #type: ignore
+        self.refresh()
+
+        latency = self.client.get("/api/jobs/analytics/").json()["job_latency"]
+
+        self.assertEqual(latency, [{
+            "job_type": "parse", "jobs": 5, "p50_ms": 300.0, "p90_ms": 460.0, "p99_ms": 496.0, "wait_p50_ms": 10.0,
+        }])
+
+    def test_stats_job_reports_what_it_exported(self):
+        job = self.refresh()
+
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.metrics["tables"], {"files": 4, "projects": 0, "project_files": 0, "jobs": 1, "chunks": 0})
+
+        # Snapshots are only re-exported once their tables change
+        tables = export_facts()["tables"]
+        self.assertEqual((tables["project_files"], tables["chunks"]), ("unchanged", "unchanged"))
+        self.assertEqual(export_facts(force=True)["tables"]["chunks"], 0)
+
+    def test_dashboards_do_not_query_the_database(self):
+        export_facts()
+
+        with self.assertNumQueries(0):
+            summary = usage_summary()
+
+        self.assertEqual([row["files"] for row in summary["storage"]], [3, 1])
@@ -0,0 +1,140 @@
+import glob
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from jobs.services import analytics
+from jobs.services.analytics import compact_facts, connect, export_facts, log_path, read_state
+from jobs.tasks import compact_analytics
+from upload.models import File, Project, ProjectStatus
+
+JANUARY = datetime(2026, 1, 10, tzinfo=dt_timezone.utc)
+FEBRUARY = datetime(2026, 2, 10, tzinfo=dt_timezone.utc)
+
+
+@override_settings(ANALYTICS_WATERMARK_OVERLAP=0)
+class ChangeLogExportTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user = create_user()
+        self.files = [create_file(user, name=f"paper-{number}.txt") for number in range(4)]
+        # Two files a month, each updated a minute after the previous one
+        for number, file in enumerate(self.files):
+            created = JANUARY if number < 2 else FEBRUARY
+            self.touch(file, created_at=created, updated_at=created + timedelta(minutes=number))
+
+    def touch(self, file, **fields):
+        File.objects.filter(id=file.id).update(**fields) #type: ignore
+
+    def exported(self, table="files"):
+        return export_facts()["tables"][table]
+
+    def parts(self, month=None):
+        return glob.glob(os.path.join(log_path("files"), f"month={month or '*'}", "*.parquet"))
+
+    def rows(self):
+        with connect() as connection:
+            return dict(connection.execute("SELECT id, file_status FROM files").fetchall())
+
+    def test_only_rows_past_the_watermark_are_appended(self):
+        self.assertEqual(self.exported(), 4)
+        self.assertEqual(read_state()["watermarks"]["files"], (FEBRUARY + timedelta(minutes=3)).isoformat())
+
+        # The newest row sits on the watermark and is read again; nothing older is
+        self.assertEqual(self.exported(), 1)
+
+        self.touch(self.files[0], file_status="processed", updated_at=FEBRUARY + timedelta(hours=1))
+        self.assertEqual(self.exported(), 2)
+        self.assertEqual(len(self.rows()), 4)
+        self.assertEqual(self.rows()[str(self.files[0].id)], "processed")
+
+    def test_rows_stay_in_the_partition_of_the_month_they_were_created(self):
+        export_facts()
+        self.touch(self.files[0], updated_at=FEBRUARY + timedelta(hours=1))
+
+        export_facts()
+
+        self.assertEqual(
+            sorted(os.path.basename(os.path.dirname(part)) for part in self.parts()),
+            ["month=2026-01", "month=2026-01", "month=2026-02", "month=2026-02"],
+        )
+
+    def test_changes_are_written_in_record_batches(self):
+        with mock.patch.object(analytics, "EXPORT_BATCH_ROWS", 3):
+            export_facts()
+
+        # Batch one spans both months, batch two holds the last February row
+        self.assertEqual((len(self.parts("2026-01")), len(self.parts("2026-02"))), (1, 2))
+
+    @override_settings(ANALYTICS_WATERMARK_OVERLAP=300)
+    def test_late_commits_inside_the_overlap_are_picked_up(self):
+        export_facts()
+        watermark = FEBRUARY + timedelta(minutes=3)
+        self.touch(self.files[0], file_status="processed", updated_at=watermark - timedelta(minutes=1))
+        self.touch(self.files[1], file_status="processed", updated_at=watermark - timedelta(minutes=10))
+
+        export_facts()
+
+        rows = self.rows()
+        self.assertEqual((rows[str(self.files[0].id)], rows[str(self.files[1].id)]), ("processed", "draft"))
+
+    def test_compaction_keeps_the_newest_version_of_live_rows(self):
+        export_facts()
+        self.touch(self.files[0], file_status="processed", updated_at=FEBRUARY + timedelta(hours=1))
+        export_facts()
+        File.objects.filter(id=self.files[1].id).delete() #type: ignore
+        before = self.rows()
+
+        compacted = compact_facts()
+
+        self.assertEqual(compacted["files"], {"partitions": 2, "parts": 4})
+        self.assertEqual((len(self.parts("2026-01")), len(self.parts("2026-02"))), (1, 1))
+        del before[str(self.files[1].id)]
+        self.assertEqual(self.rows(), before)
+        self.assertEqual(compact_analytics()["compacted"]["files"], {"partitions": 0, "parts": 0})
+
+    def test_exports_and_compaction_are_scheduled(self):
+        tasks = {entry["task"] for entry in settings.CELERY_BEAT_SCHEDULE.values()}
+
+        self.assertLessEqual({"jobs.tasks.export_analytics", "jobs.tasks.compact_analytics"}, tasks)
+
+
+@override_settings(ANALYTICS_WATERMARK_OVERLAP=0)
+class BulkProjectWriteExportTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.projects = [Project.objects.create(user=self.user, name=f"project {number}") for number in range(3)] #type: ignore
+        export_facts()
+
+    def exported(self):
+        with connect() as connection:
+            return {
+                project_id: (status, is_deleted)
+                for project_id, status, is_deleted in connection.execute("SELECT id, status, is_deleted FROM projects").fetchall()
+            }
+
+    def test_bulk_deleted_projects_are_exported_as_deleted(self):
+        response = self.client.post("/api/projects/bulk-delete/", {"project_ids": [str(self.projects[0].id)]}, format="json")
+        self.assertEqual(response.status_code, 204)
+
+        export_facts()
+
+        self.assertEqual(self.exported()[str(self.projects[0].id)], (ProjectStatus.DRAFT, True))
+
+    def test_bulk_status_changes_are_exported(self):
+        response = self.client.post("/api/projects/bulk-update/", {
+            "project_ids": [str(project.id) for project in self.projects[1:]], "status": ProjectStatus.PUBLISHED,
+        }, format="json")
+        self.assertEqual(response.status_code, 204)
+
+        export_facts()
+
+        exported = self.exported()
+        self.assertEqual(
+            [exported[str(project.id)] for project in self.projects],
+            [(ProjectStatus.DRAFT, False), (ProjectStatus.PUBLISHED, False), (ProjectStatus.PUBLISHED, False)],
+        )
@@ -0,0 +1,98 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, create_file, create_user
+from jobs.models import Job
+from jobs.services.embedding import HashEmbeddingProvider, embed_file, get_embedding_provider, pack_vectors, unpack_vector
+from jobs.tasks import enqueue_job
+from upload.models import ChunkEmbedding
+
+
+class RecordingProvider(HashEmbeddingProvider):
+    """Hash embedder remembering the size of every batch it was asked for."""
+
+    def __init__(self, dimensions=16):
+        super().__init__(dimensions)
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(len(texts))
+        return super().embed(texts)
+
+
+class HashEmbeddingTests(SimpleTestCase):
+    def test_vectors_pack_as_float32(self):
+        matrix = np.array([[0.5, -1.25, 3.0]])
+
+        packed = pack_vectors(matrix)
+
+        self.assertEqual(len(packed[0]), 12)
+        np.testing.assert_array_equal(unpack_vector(packed[0]), matrix[0])
+
+    def test_deterministic_and_normalized(self):
+        provider = HashEmbeddingProvider(64)
+
+        first, second, empty = provider.embed(["protein folding rates", "protein folding rates", ""])
+
+        np.testing.assert_array_equal(first, second)
+        self.assertAlmostEqual(float(np.linalg.norm(first)), 1.0, places=5)
+        self.assertFalse(empty.any())
+
+    def test_shared_vocabulary_scores_higher(self):
+        query, related, unrelated = HashEmbeddingProvider(256).embed([
+            "protein folding rates", "folding rates of a protein", "quarterly sales figures",
+        ])
+
+        self.assertGreater(query @ related, query @ unrelated)
+
+    @override_settings(EMBEDDING_PROVIDER="nonsense")
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            get_embedding_provider()
+
+
+@override_settings(EMBEDDING_CACHE_BACKEND="none")
+class EmbedFileTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = create_file(create_user(), [f"finding number {number}" for number in range(5)])
+
+    def test_chunks_are_embedded_in_batches(self):
+        provider = RecordingProvider()
+
+        metrics = embed_file(self.file, provider=provider, batch_size=2)
+
+        self.assertEqual(provider.batches, [2, 2, 1])
+        self.assertEqual((metrics["model"], metrics["batch_size"], metrics["chunks"]), ("hash-16", 2, 5))
+        self.assertGreater(metrics["chunks_per_second"], 0)
+        embeddings = ChunkEmbedding.objects.filter(chunk__file=self.file) #type: ignore
+        self.assertEqual(embeddings.count(), 5)
+        for embedding in embeddings.select_related("chunk"):
+            np.testing.assert_array_equal(unpack_vector(embedding.vector), provider.embed([embedding.chunk.text])[0])
+
+    def test_only_chunks_without_a_vector_are_embedded(self):
+        provider = RecordingProvider()
+        embed_file(self.file, provider=provider, batch_size=10)
+        self.file.chunks.filter(page_number=3).get().embeddings.all().delete()
+
+        metrics = embed_file(self.file, provider=provider, batch_size=10)
+
+        self.assertEqual(provider.batches, [5, 1])
+        self.assertEqual(metrics["chunks"], 1)
+
+    def test_progress_is_reported_per_batch(self):
+        progress = []
+
+        embed_file(self.file, provider=RecordingProvider(), batch_size=2, on_progress=progress.append)
+
+        self.assertEqual(progress, [40, 80, 100])
+
+    @override_settings(EMBEDDING_DIMENSIONS=32, EMBEDDING_BATCH_SIZE=4)
+    def test_embed_job_marks_the_file_embedded(self):
+        job = enqueue_job(self.file, Job.Type.EMBED)
+
+        job.refresh_from_db()
+        self.file.refresh_from_db()
+        self.assertEqual((job.status, job.progress), (Job.Status.DONE, 100))
+        self.assertEqual((job.metrics["chunks"], job.metrics["batch_size"]), (5, 4))
+        self.assertEqual(self.file.embedded_version, self.file.parsed_version)
+        self.assertEqual({len(vector) for vector in ChunkEmbedding.objects.values_list("vector", flat=True)}, {32 * 4}) #type: ignore
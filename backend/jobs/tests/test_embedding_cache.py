@@ -0,0 +1,133 @@
+import itertools
+import sqlite3
+from unittest import mock
+import redis
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, create_file, create_user
+from jobs.services import embedding_cache
+from jobs.services.embedding import embed_file, embed_texts
+from jobs.services.embedding_cache import (
+    DiskEmbeddingCache, FailSafeEmbeddingCache, RedisEmbeddingCache, get_embedding_cache,
+)
+from .test_embedding import RecordingProvider
+
+
+class LruBackendTests:
+    """Behaviour both persistent backends share; ``make_cache`` builds one holding ``max_entries``."""
+
+    def setUp(self):
+        super().setUp()
+        clock = itertools.count(1_000_000)
+        self.enterContext(mock.patch.object(embedding_cache.time, "time", lambda: next(clock)))
+
+    def test_bulk_lookup_returns_only_hits(self):
+        cache = self.make_cache(10)
+        cache.set_many("hash-16", {"a": b"vector-a", "b": b"vector-b"})
+
+        self.assertEqual(cache.get_many("hash-16", ["a", "b", "c"]), {"a": b"vector-a", "b": b"vector-b"})
+        self.assertEqual(cache.get_many("openai", ["a"]), {})
+        self.assertEqual(cache.get_many("hash-16", []), {})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.make_cache(2)
+        cache.set_many("hash-16", {"a": b"1", "b": b"2"})
+        cache.get_many("hash-16", ["a"])
+
+        cache.set_many("hash-16", {"c": b"3"})
+
+        self.assertEqual(cache.get_many("hash-16", ["a", "b", "c"]), {"a": b"1", "c": b"3"})
+
+
+class DiskEmbeddingCacheTests(LruBackendTests, ServicesTestMixin, SimpleTestCase):
+    def make_cache(self, max_entries):
+        return DiskEmbeddingCache(str(self.root / "cache.sqlite3"), max_entries)
+
+    def test_survives_a_new_process(self):
+        self.make_cache(10).set_many("hash-16", {"a": b"1"})
+
+        self.assertEqual(self.make_cache(10).get_many("hash-16", ["a"]), {"a": b"1"})
+
+    def test_writes_keep_the_entry_count_without_counting_the_table(self):
+        cache = self.make_cache(3)
+        statements = []
+        cache.connection.set_trace_callback(statements.append)
+
+        cache.set_many("hash-16", {"a": b"1", "b": b"2"})
+        cache.set_many("hash-16", {"a": b"3", "c": b"4", "d": b"5"})
+
+        self.assertFalse([statement for statement in statements if "COUNT(*)" in statement])
+        self.assertEqual(cache.connection.execute("SELECT entries FROM embedding_count").fetchone()[0], 3)
+        self.assertEqual(cache.get_many("hash-16", ["a", "b", "c", "d"]), {"a": b"3", "c": b"4", "d": b"5"})
+
+    def test_existing_files_start_from_their_row_count(self):
+        cache = self.make_cache(10)
+        cache.set_many("hash-16", {"a": b"1", "b": b"2"})
+        cache.connection.executescript("DROP TABLE embedding_count; DROP TRIGGER embeddings_inserted; DROP TRIGGER embeddings_deleted;")
+
+        reopened = self.make_cache(10)
+
+        self.assertEqual(reopened.connection.execute("SELECT entries FROM embedding_count").fetchone()[0], 2)
+
+    def test_lookups_larger_than_the_parameter_limit(self):
+        cache = self.make_cache(5000)
+        vectors = {str(number): b"v" for number in range(1200)}
+        cache.set_many("hash-16", vectors)
+
+        self.assertEqual(cache.get_many("hash-16", list(vectors)), vectors)
+
+
+class RedisEmbeddingCacheTests(LruBackendTests, ServicesTestMixin, SimpleTestCase):
+    def make_cache(self, max_entries):
+        return RedisEmbeddingCache("redis://localhost:6379/0", max_entries)
+
+
+class FailSafeEmbeddingCacheTests(SimpleTestCase):
+    def test_unreachable_backend_degrades_to_misses(self):
+        backend = mock.Mock()
+        backend.get_many.side_effect = redis.ConnectionError("down")
+        backend.set_many.side_effect = sqlite3.OperationalError("locked")
+        cache = FailSafeEmbeddingCache(backend)
+
+        with self.assertLogs("jobs.services.embedding_cache", "WARNING"):
+            self.assertEqual(cache.get_many("hash-16", ["a"]), {})
+            cache.set_many("hash-16", {"a": b"1"})
+
+
+class EmbedWithCacheTests(ServicesTestMixin, TestCase):
+    def test_backend_follows_settings(self):
+        for backend, expected in (("redis", RedisEmbeddingCache), ("disk", DiskEmbeddingCache)):
+            with self.subTest(backend), override_settings(EMBEDDING_CACHE_BACKEND=backend):
+                embedding_cache._cache = None
+                self.assertIsInstance(get_embedding_cache().backend, expected)
+
+    def test_identical_texts_are_embedded_once(self):
+        provider = RecordingProvider()
+
+        vectors, hits = embed_texts(provider, ["h1", "h2", "h1"], ["alpha", "beta", "alpha"])
+        again, hits_again = embed_texts(provider, ["h2", "h3"], ["beta", "gamma"])
+
+        self.assertEqual(provider.batches, [2, 1])
+        self.assertEqual((hits, hits_again), (0, 1))
+        self.assertEqual(vectors[0], vectors[2])
+        self.assertEqual(again[0], vectors[1])
+
+    def test_reattached_documents_reuse_vectors(self):
+        user = create_user()
+        texts = ["methods", "results", "discussion"]
+        provider = RecordingProvider()
+        embed_file(create_file(user, texts), provider=provider)
+
+        metrics = embed_file(create_file(user, texts + ["appendix"], name="copy.txt"), provider=provider)
+
+        self.assertEqual(provider.batches, [3, 1])
+        self.assertEqual((metrics["cache_hits"], metrics["cache_hit_rate"]), (3, 0.75))
+
+    def test_cache_is_keyed_by_model(self):
+        texts = ["methods"]
+        user = create_user()
+        embed_file(create_file(user, texts), provider=RecordingProvider(16))
+        provider = RecordingProvider(32)
+
+        metrics = embed_file(create_file(user, texts, name="copy.txt"), provider=provider)
+
+        self.assertEqual((provider.batches, metrics["cache_hits"]), ([1], 0))
@@ -1,5 +1,7 @@
 from rest_framework.routers import DefaultRouter
+from .viewsets import JobViewSet
 
 router = DefaultRouter() 
+router.register(r"jobs", JobViewSet, basename="job")
 
-urlpatterns = router.urls 
\ No newline at end of file
+urlpatterns = router.urls
\ No newline at end of file
@@ -1,7 +0,0 @@
-from rest_framework import viewsets
-from .models import Job
-from .serializers import JobSerializer
-
-class JobViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Job.objects.all().order_by("-created_at")
-    serializer_class = JobSerializer 
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .job import JobViewSet
+
+__all__ = ["JobViewSet"]
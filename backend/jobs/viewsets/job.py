@@ -0,0 +1,27 @@
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from jobs.models import Job
+from jobs.serializers import JobSerializer
+from jobs.services.analytics import exported_at, usage_summary
+from jobs.tasks import enqueue_job
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(doc__user=self.request.user).prefetch_related("shards").order_by("-created_at") #type: ignore
+
+    @action(detail=False, methods=["get"], url_path="analytics")
+    def analytics(self, request):
+        """Storage, documents per project and job latency percentiles of the current user, as of the last STATS export"""
+        if exported_at() is None:
+            return Response({"error": "Analytics have not been exported yet"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(usage_summary(request.user.id))
+
+    @action(detail=False, methods=["post"], url_path="analytics/refresh", permission_classes=[permissions.IsAdminUser])
+    def refresh_analytics(self, request):
+        """Queue a STATS job re-exporting the analytics facts"""
+        job = enqueue_job(None, Job.Type.STATS)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,8 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project_root.settings")
+
+# Serve with e.g. ``gunicorn project_root.asgi:application -k uvicorn.workers.UvicornWorker``:
+# chat streams and search then run on the event loop instead of pinning a thread each.
+application = get_asgi_application()
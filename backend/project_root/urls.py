@@ -6,7 +6,6 @@ from drf_yasg import openapi
 from upload.urls import router as upload_router
 from core.urls import router as core_router
 from jobs.urls import router as jobs_router
-from chat.urls import router as chat_router
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -36,4 +35,5 @@ if settings.DEBUG:
 urlpatterns += [path("api/", include(upload_router.urls))]
 urlpatterns += [path("api/", include(core_router.urls))]
 urlpatterns += [path("api/", include(jobs_router.urls))]
-urlpatterns += [path("api/", include(chat_router.urls))]
\ No newline at end of file
+urlpatterns += [path("api/", include("chat.urls"))]
+urlpatterns += [path("api/", include("search.urls"))]
\ No newline at end of file
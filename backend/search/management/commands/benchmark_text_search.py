@@ -0,0 +1,50 @@
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from search.services.text_index import compact_text_index, load_text_index, replace_text_files
+
+
+class Command(BaseCommand):
+    help = "Build a BM25 index over a synthetic Zipf-distributed corpus and report query latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunks", type=int, default=100_000)
+        parser.add_argument("--chunk-tokens", type=int, default=250)
+        parser.add_argument("--vocabulary", type=int, default=200_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--k", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        vocabulary = [f"t{index}" for index in range(options["vocabulary"])]
+        batch = 20_000
+        with tempfile.TemporaryDirectory() as path:
+            started = time.perf_counter()
+            for start in range(0, options["chunks"], batch):
+                size = min(batch, options["chunks"] - start)
+                # Word frequencies in natural text follow Zipf's law; a few terms appear in most chunks
+                words = (rng.zipf(1.1, size=(size, options["chunk_tokens"])) - 1) % options["vocabulary"]
+                texts = [" ".join(vocabulary[word] for word in row) for row in words]
+                replace_text_files(path, [], np.arange(start, start + size), ["benchmark"] * size, texts)
+            compact_text_index(path)
+            self.stdout.write(f"indexed {options['chunks']} chunks in {time.perf_counter() - started:.1f}s")
+
+            index = load_text_index(path)
+            segment = index.segments[0]
+            self.stdout.write(
+                f"{len(segment.terms)} terms, {len(segment.postings) / 1024 / 1024:.1f} MB of postings "
+                f"({len(segment.postings) / max(int(segment.lexicon[:, 2].sum()), 1):.2f} bytes per posting)"
+            )
+            for label, low, high in (("rare", 1000, options["vocabulary"]), ("mixed", 10, options["vocabulary"]), ("common", 0, 50)):
+                latencies = []
+                for _ in range(options["queries"]):
+                    query = " ".join(vocabulary[word] for word in rng.integers(low, high, size=3))
+                    started = time.perf_counter()
+                    index.search(query, options["k"])
+                    latencies.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:>7} terms: p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms"
+                )
@@ -0,0 +1,52 @@
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from search.services.vector_index import load_index, normalize_rows, replace_files
+
+
+class Command(BaseCommand):
+    help = "Build an IVF index over synthetic clustered vectors and report query latency and recall@k"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vectors", type=int, default=1_000_000)
+        parser.add_argument("--dimensions", type=int, default=384)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        count, dimensions, k = options["vectors"], options["dimensions"], options["k"]
+        # Embeddings of real text are clustered, not uniform; mimic that so recall numbers mean something
+        topics = normalize_rows(rng.standard_normal((max(count // 1000, 1), dimensions), dtype=np.float32))
+        vectors = np.empty((count, dimensions), dtype=np.float32)
+        for start in range(0, count, 100_000):
+            size = min(100_000, count - start)
+            noise = rng.standard_normal((size, dimensions), dtype=np.float32) * (1.5 / np.sqrt(dimensions))
+            vectors[start:start + size] = normalize_rows(topics[rng.integers(len(topics), size=size)] + noise)
+        noise = rng.standard_normal((options["queries"], dimensions), dtype=np.float32) * (0.5 / np.sqrt(dimensions))
+        queries = normalize_rows(vectors[rng.integers(count, size=options["queries"])] + noise)
+
+        with tempfile.TemporaryDirectory() as path:
+            started = time.perf_counter()
+            replace_files(path, "benchmark", dimensions, [], np.arange(count), ["benchmark"] * count, vectors)
+            self.stdout.write(f"built {count} x {dimensions} in {time.perf_counter() - started:.1f}s")
+            index = load_index(path)
+            self.stdout.write(f"{len(index.centroids)} inverted lists")
+
+            exact = [set(np.argpartition(vectors @ query, -k)[-k:]) for query in queries]
+            self.stdout.write(f"{'nprobe':>6} {'p50 ms':>8} {'p99 ms':>8} {f'recall@{k}':>10}")
+            for nprobe in options["nprobe"]:
+                index.search(queries[0], k, nprobe)  # warm the page cache
+                latencies, recalls = [], []
+                for query, truth in zip(queries, exact):
+                    started = time.perf_counter()
+                    hits = index.search(query, k, nprobe)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    recalls.append(len(truth & {chunk_id for chunk_id, _ in hits}) / k)
+                self.stdout.write(
+                    f"{nprobe:>6} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} {np.mean(recalls):>10.3f}"
+                )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from upload.models import Project
+from search.services import rebuild_project_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild project vector and keyword indexes from the stored chunks and embeddings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", action="append", help="Project id (repeatable); defaults to all projects")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.filter(is_deleted=False) #type: ignore
+        if options["project"]:
+            projects = projects.filter(id__in=options["project"])
+        for project in projects.iterator():
+            counts = rebuild_project_index(project)
+            self.stdout.write(f"{project.id} {project.name}: {counts['vector']} vectors, {counts['text']} chunks")
@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    MODES = ["hybrid", "vector", "keyword"]
+
+    project = serializers.UUIDField()
+    q = serializers.CharField(max_length=2000)
+    mode = serializers.ChoiceField(choices=MODES, default="hybrid")
+    k = serializers.IntegerField(min_value=1, max_value=settings.SEARCH_MAX_RESULTS, default=10)
+    nprobe = serializers.IntegerField(min_value=1, required=False)
+
+
+class SearchResultSerializer(serializers.Serializer):
+    chunk_id = serializers.IntegerField()
+    file_id = serializers.UUIDField()
+    file_name = serializers.CharField()
+    page_number = serializers.IntegerField()
+    position = serializers.IntegerField()
+    text = serializers.CharField()
+    score = serializers.FloatField()
+    vector_score = serializers.FloatField(allow_null=True)
+    keyword_score = serializers.FloatField(allow_null=True)
@@ -0,0 +1,8 @@
+from .indexing import (
+    sync_project_files, rebuild_project_index, compact_project_indexes, needs_project_compaction, search_project,
+)
+
+__all__ = [
+    "sync_project_files", "rebuild_project_index", "compact_project_indexes", "needs_project_compaction",
+    "search_project",
+]
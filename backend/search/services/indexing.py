@@ -0,0 +1,155 @@
+"""Keeps each project's vector and keyword indexes in step with its attached files."""
+import time
+from collections import defaultdict
+from functools import lru_cache
+import numpy as np
+from django.conf import settings
+from jobs.services.embedding import get_embedding_provider, unpack_vector
+from upload.models import ChunkEmbedding, DocumentChunk
+from .text_index import compact_text_index, load_text_index, replace_text_files, text_index_path, text_needs_compaction
+from .vector_index import compact_index, index_path, load_index, needs_compaction, replace_files
+
+EMBEDDING_FETCH_SIZE = 2000
+REBUILD_FILE_BATCH = 100
+VECTOR, TEXT = "vector", "text"
+INDEXES = (VECTOR, TEXT)
+
+
+@lru_cache(maxsize=1)
+def embedding_provider():
+    """One provider per process; query embedding must use the same model the index was built with."""
+    return get_embedding_provider()
+
+
+def project_index_path(project):
+    return index_path(project.user_id, project.id)
+
+
+def embedded_rows(file_ids, model_name):
+    """``(chunk_ids, file_ids, vectors)`` of every stored embedding of ``file_ids`` for ``model_name``."""
+    rows = (
+        ChunkEmbedding.objects.filter(chunk__file_id__in=file_ids, model_name=model_name) #type: ignore
+        .values_list("chunk_id", "chunk__file_id", "vector")
+        .iterator(chunk_size=EMBEDDING_FETCH_SIZE)
+    )
+    chunk_ids, row_files, vectors = [], [], []
+    for chunk_id, file_id, vector in rows:
+        chunk_ids.append(chunk_id)
+        row_files.append(file_id)
+        vectors.append(unpack_vector(vector))
+    return chunk_ids, row_files, np.vstack(vectors) if vectors else None
+
+
+def text_rows(file_ids):
+    """``(chunk_ids, file_ids, texts)`` of every parsed chunk of ``file_ids``."""
+    rows = list(
+        DocumentChunk.objects.filter(file_id__in=file_ids) #type: ignore
+        .values_list("id", "file_id", "text")
+        .iterator(chunk_size=EMBEDDING_FETCH_SIZE)
+    )
+    return tuple(zip(*rows)) if rows else ((), (), ())
+
+
+def sync_project_files(project, file_ids, indexes=INDEXES):
+    """Re-index ``file_ids`` in ``project``: detached files drop out, attached ones get their current rows.
+
+    Returns the live row count of each index that was touched.
+    """
+    attached = list(project.files.filter(id__in=file_ids).values_list("id", flat=True))
+    path = project_index_path(project)
+    counts = {}
+    if VECTOR in indexes:
+        provider = embedding_provider()
+        chunk_ids, row_files, vectors = embedded_rows(attached, provider.name)
+        counts[VECTOR] = replace_files(path, provider.name, provider.dimensions, file_ids, chunk_ids, row_files, vectors)
+    if TEXT in indexes:
+        counts[TEXT] = replace_text_files(text_index_path(path), file_ids, *text_rows(attached))
+    return counts
+
+
+def rebuild_project_index(project):
+    file_ids = [str(file_id) for file_id in project.files.values_list("id", flat=True)]
+    for start in range(0, len(file_ids), REBUILD_FILE_BATCH):
+        sync_project_files(project, file_ids[start:start + REBUILD_FILE_BATCH])
+    return compact_project_indexes(project, force=True)
+
+
+def compact_project_indexes(project, force=False):
+    """Compact whichever of the project's indexes need it; returns live row counts of those compacted."""
+    path = project_index_path(project)
+    counts = {}
+    if force or needs_compaction(path):
+        counts[VECTOR] = compact_index(path)
+    if force or text_needs_compaction(text_index_path(path)):
+        counts[TEXT] = compact_text_index(text_index_path(path))
+    return counts
+
+
+def needs_project_compaction(project):
+    path = project_index_path(project)
+    return needs_compaction(path) or text_needs_compaction(text_index_path(path))
+
+
+def vector_hits(project, query, k, nprobe=None):
+    provider = embedding_provider()
+    index = load_index(project_index_path(project))
+    if index is None or index.model != provider.name:
+        return []
+    return index.search(provider.embed([query])[0], k, nprobe)
+
+
+def keyword_hits(project, query, k):
+    index = load_text_index(text_index_path(project_index_path(project)))
+    return index.search(query, k) if index is not None else []
+
+
+def reciprocal_rank_fusion(rankings, k):
+    """Fuse ranked ``(chunk_id, score)`` lists by summing ``1 / (SEARCH_RRF_K + rank)``.
+
+    Only ranks matter, so cosine similarities and BM25 scores never need to be calibrated
+    against each other.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, (chunk_id, _) in enumerate(ranking, start=1):
+            fused[chunk_id] += 1 / (settings.SEARCH_RRF_K + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def search_project(project, query, k=10, nprobe=None, mode="hybrid"):
+    """Top ``k`` chunks of ``project`` for ``query``, best first, with the time taken in ms.
+
+    ``mode`` is "vector" (semantic), "keyword" (BM25) or "hybrid" (both, fused by rank).
+    """
+    started = time.perf_counter()
+    candidates = max(k, settings.SEARCH_HYBRID_CANDIDATES) if mode == "hybrid" else k
+    semantic = vector_hits(project, query, candidates, nprobe) if mode in ("vector", "hybrid") else []
+    keyword = keyword_hits(project, query, candidates) if mode in ("keyword", "hybrid") else []
+    if mode == "hybrid":
+        hits = reciprocal_rank_fusion([semantic, keyword], k)
+    else:
+        hits = semantic or keyword
+    vector_scores, keyword_scores = dict(semantic), dict(keyword)
+
+    # The indexes may briefly trail a detach or re-parse; only return chunks that still belong here
+    chunks = {
+        chunk["id"]: chunk
+        for chunk in DocumentChunk.objects.filter(id__in=[chunk_id for chunk_id, _ in hits], file__projects=project) #type: ignore
+        .values("id", "file_id", "file__file_name", "page_number", "position", "text")
+    }
+    results = [
+        {
+            "chunk_id": chunk_id,
+            "file_id": chunks[chunk_id]["file_id"],
+            "file_name": chunks[chunk_id]["file__file_name"],
+            "page_number": chunks[chunk_id]["page_number"],
+            "position": chunks[chunk_id]["position"],
+            "text": chunks[chunk_id]["text"],
+            "score": round(score, 6),
+            "vector_score": round(vector_scores[chunk_id], 6) if chunk_id in vector_scores else None,
+            "keyword_score": round(keyword_scores[chunk_id], 6) if chunk_id in keyword_scores else None,
+        }
+        for chunk_id, score in hits
+        if chunk_id in chunks
+    ]
+    return results, round((time.perf_counter() - started) * 1000, 2)
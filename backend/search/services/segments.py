@@ -0,0 +1,151 @@
+"""Storage primitives shared by the vector and keyword indexes.
+
+An index is a directory of immutable segment files plus a ``MANIFEST`` that names the
+live segments and a file table of ``[file_id, rows]`` slots. Writers hold an exclusive
+lock, write new segments, then swap the manifest atomically; readers never lock and
+simply memory-map whatever the current manifest names. Tombstoning a file sets its
+slot's id to None; compaction drops those rows for good.
+"""
+import fcntl
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+MANIFEST = "MANIFEST"
+
+
+def manifest_version(stat):
+    # Every manifest is a new file swapped in with os.replace, so inode + mtime identify it
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def read_manifest(path):
+    """``(manifest, version)`` for the index at ``path``, or ``(None, None)`` if there is none yet."""
+    try:
+        with open(os.path.join(path, MANIFEST)) as fh:
+            return json.load(fh), manifest_version(os.fstat(fh.fileno()))
+    except FileNotFoundError:
+        return None, None
+
+
+def write_manifest(path, manifest):
+    pending = os.path.join(path, f"{MANIFEST}.{uuid.uuid4().hex}")
+    with open(pending, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(pending, os.path.join(path, MANIFEST))
+
+
+@contextmanager
+def index_lock(path):
+    """Serializes writers of one index across processes; readers never take it."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ".lock"), "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def segment_name():
+    return f"seg-{uuid.uuid4().hex}"
+
+
+def remove_unreferenced(path, manifest, keep=()):
+    """Delete segment files the manifest no longer names (superseded, or left by a crash).
+
+    ``keep`` lists other generated stems (e.g. a centroids file) that are still in use.
+    """
+    live = {entry["name"] for entry in manifest["segments"]} | {name.split(".")[0] for name in keep}
+    for name in os.listdir(path):
+        if name.startswith(("seg-", "centroids-")) and name.split(".")[0] not in live:
+            # Processes still holding the old mmaps keep reading them until they reload
+            os.remove(os.path.join(path, name))
+
+
+def live_rows(manifest):
+    return sum(rows for file_id, rows in manifest["files"] if file_id is not None)
+
+
+def dead_rows(manifest):
+    return sum(rows for file_id, rows in manifest["files"] if file_id is None)
+
+
+def assign_file_slots(files, file_ids, row_files):
+    """Tombstone ``file_ids`` in the file table and give each new row its file's slot.
+
+    A re-added file gets a fresh slot, so its old rows stay dead until compaction.
+    """
+    file_ids = {str(file_id) for file_id in file_ids}
+    for entry in files:
+        if entry[0] in file_ids:
+            entry[0] = None
+    slot_of, slots = {}, []
+    for file_id in map(str, row_files):
+        if file_id not in slot_of:
+            slot_of[file_id] = len(files)
+            files.append([file_id, 0])
+        files[slot_of[file_id]][1] += 1
+        slots.append(slot_of[file_id])
+    return slots
+
+
+def compact_file_table(files):
+    """Drop tombstoned slots; returns the new table and an old-slot -> new-slot list."""
+    remap, compacted = [], []
+    for file_id, rows in files:
+        remap.append(len(compacted) if file_id is not None else -1)
+        if file_id is not None:
+            compacted.append([file_id, rows])
+    return compacted, remap
+
+
+class SnapshotCache:
+    """Per-process cache of index snapshots and of the immutable segments they map.
+
+    ``open_snapshot(path, manifest, version, segment)`` builds a snapshot; it obtains each
+    segment through ``segment(name, opener)`` so a new manifest only opens segments this
+    process has not mapped yet.
+    """
+
+    def __init__(self, open_snapshot):
+        self.open_snapshot = open_snapshot
+        self.snapshots = {}
+        self.segments = {}
+        self.lock = threading.Lock()
+
+    def load(self, path):
+        """The current snapshot of the index at ``path``, or None if it has never been written."""
+        while True:
+            try:
+                version = manifest_version(os.stat(os.path.join(path, MANIFEST)))
+            except FileNotFoundError:
+                return None
+            snapshot = self.snapshots.get(path)
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            manifest, version = read_manifest(path)
+            if manifest is None:
+                return None
+            with self.lock:
+                def segment(name, opener):
+                    if (path, name) not in self.segments:
+                        self.segments[path, name] = opener()
+                    return self.segments[path, name]
+                try:
+                    snapshot = self.snapshots[path] = self.open_snapshot(path, manifest, version, segment)
+                except FileNotFoundError:
+                    # Compaction replaced the manifest and removed its files between the two reads
+                    continue
+                live = {entry["name"] for entry in manifest["segments"]}
+                for key in [key for key in self.segments if key[0] == path and key[1] not in live]:
+                    del self.segments[key]
+                return snapshot
+
+    def forget(self, path):
+        with self.lock:
+            self.snapshots.pop(path, None)
+            for key in [key for key in self.segments if key[0] == path]:
+                del self.segments[key]
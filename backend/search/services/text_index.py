@@ -0,0 +1,320 @@
+"""BM25 keyword index over document chunks, stored like the vector index as immutable segments.
+
+Each segment holds:
+
+- ``.terms``: the sorted vocabulary, one term per line.
+- ``.dict``: per-term ``(byte offset, byte length, document frequency)`` into ``.post``.
+- ``.post``: posting lists as varint-encoded ``(doc gap, term frequency)`` pairs, so a list
+  costs about two bytes per posting instead of sixteen.
+- ``.ids`` / ``.lens`` / ``.slots``: per-document chunk id, token count and file slot.
+
+Queries decode only the postings of their own terms, so cost tracks how common the
+query terms are, never the size of the project.
+"""
+import math
+import os
+import re
+import shutil
+from collections import Counter
+import numpy as np
+from django.conf import settings
+from .segments import (
+    SnapshotCache, assign_file_slots, compact_file_table, dead_rows, index_lock, live_rows, read_manifest,
+    remove_unreferenced, segment_name, write_manifest,
+)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TOKEN_CHARS = 64
+VARINT_BLOCK = 1 << 20
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their "
+    "there these this to was were which with".split()
+)
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if len(token) <= MAX_TOKEN_CHARS and token not in STOP_WORDS
+    ]
+
+
+def encode_varints(values):
+    """LEB128-encode non-negative integers: 7 bits per byte, high bit set on all but the last byte.
+
+    Returns the bytes and the encoded size of each value.
+    """
+    encoded, sizes = [], []
+    for start in range(0, len(values), VARINT_BLOCK):
+        block = np.asarray(values[start:start + VARINT_BLOCK], dtype=np.uint64)
+        block_sizes = np.ones(len(block), dtype=np.uint8)
+        rest = block >> np.uint64(7)
+        while rest.any():
+            block_sizes += rest > 0
+            rest >>= np.uint64(7)
+        out = np.empty(int(block_sizes.sum()), dtype=np.uint8)
+        starts = np.cumsum(block_sizes, dtype=np.int64) - block_sizes
+        for byte in range(int(block_sizes.max(initial=0))):
+            has = block_sizes > byte
+            chunk = (block[has] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+            more = (block_sizes[has] > byte + 1).astype(np.uint64) << np.uint64(7)
+            out[starts[has] + byte] = chunk | more
+        encoded.append(out)
+        sizes.append(block_sizes)
+    if not encoded:
+        return np.empty(0, np.uint8), np.empty(0, np.uint8)
+    return np.concatenate(encoded), np.concatenate(sizes)
+
+
+def decode_varints(data):
+    """Inverse of encode_varints, decoded in blocks so large posting files never balloon in memory."""
+    data = np.asarray(data, dtype=np.uint8)
+    decoded, start = [], 0
+    while start < len(data):
+        stop = min(start + VARINT_BLOCK, len(data))
+        # Extend the block to the end of the value it cuts through
+        while stop < len(data) and data[stop - 1] & 0x80:
+            stop += 1
+        block = data[start:stop]
+        last = (block & 0x80) == 0
+        number = np.concatenate([[0], np.cumsum(last[:-1], dtype=np.int64)])
+        first = np.flatnonzero(np.concatenate([[True], last[:-1]]))
+        shift = (np.arange(len(block)) - first[number]) * 7
+        decoded.append(np.bincount(number, weights=(block & 0x7F).astype(np.int64) << shift).astype(np.int64))
+        start = stop
+    return np.concatenate(decoded) if decoded else np.empty(0, dtype=np.int64)
+
+
+class TextSegment:
+    def __init__(self, path, entry):
+        base = os.path.join(path, entry["name"])
+        docs = entry["docs"]
+        with open(f"{base}.terms", encoding="utf-8") as fh:
+            self.terms = {term: index for index, term in enumerate(fh.read().split("\n")) if term}
+        self.lexicon = np.fromfile(f"{base}.dict", dtype=np.int64).reshape(-1, 3)
+        self.postings = np.memmap(f"{base}.post", dtype=np.uint8, mode="r") if entry["post_bytes"] else np.empty(0, np.uint8)
+        self.ids = np.memmap(f"{base}.ids", dtype=np.int64, mode="r", shape=(docs,))
+        self.lengths = np.memmap(f"{base}.lens", dtype=np.int32, mode="r", shape=(docs,))
+        self.slots = np.memmap(f"{base}.slots", dtype=np.int32, mode="r", shape=(docs,))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def document_frequency(self, term):
+        index = self.terms.get(term)
+        return 0 if index is None else int(self.lexicon[index, 2])
+
+    def postings_for(self, term):
+        """``(docs, term frequencies)`` for ``term`` in this segment."""
+        index = self.terms.get(term)
+        if index is None:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        offset, size, _ = self.lexicon[index]
+        pairs = decode_varints(self.postings[offset:offset + size])
+        return np.cumsum(pairs[0::2]), pairs[1::2]
+
+    def all_postings(self):
+        """Every ``(term index, doc, tf)`` posting of the segment, decoded in one pass."""
+        pairs = decode_varints(self.postings)
+        counts = self.lexicon[:, 2]
+        terms = np.repeat(np.arange(len(self.lexicon), dtype=np.int32), counts)
+        gaps, tfs = pairs[0::2], pairs[1::2].astype(np.int32)
+        del pairs
+        starts = np.cumsum(counts) - counts
+        docs = np.cumsum(gaps)
+        docs -= np.repeat(docs[starts] - gaps[starts], counts)
+        return terms, docs.astype(np.int32), tfs
+
+
+class TextIndex:
+    """A read-only snapshot of a project's keyword index."""
+
+    def __init__(self, path, manifest, version, segments):
+        self.path = path
+        self.manifest = manifest
+        self.version = version
+        self.segments = segments
+        self.alive = np.array([file_id is not None for file_id, _ in manifest["files"]], dtype=bool)
+        # Like most engines, collection statistics include tombstoned documents until compaction
+        self.documents = sum(len(segment) for segment in segments)
+        self.average_length = sum(entry["tokens"] for entry in manifest["segments"]) / max(self.documents, 1)
+
+    def __len__(self):
+        return live_rows(self.manifest)
+
+    def search(self, query, k=10):
+        """Top ``k`` ``(chunk_id, bm25 score)`` pairs for the terms of ``query``."""
+        terms = set(tokenize(query))
+        if not terms or not self.documents:
+            return []
+        k1, b = settings.BM25_K1, settings.BM25_B
+        idf = {}
+        for term in terms:
+            df = sum(segment.document_frequency(term) for segment in self.segments)
+            if df:
+                idf[term] = math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+        all_scores, all_ids = [], []
+        for segment in self.segments:
+            docs, scores = [], []
+            for term, weight in idf.items():
+                term_docs, tfs = segment.postings_for(term)
+                if not len(term_docs):
+                    continue
+                norm = k1 * (1 - b + b * segment.lengths[term_docs] / self.average_length)
+                docs.append(term_docs)
+                scores.append(weight * tfs * (k1 + 1) / (tfs + norm))
+            if not docs:
+                continue
+            docs = np.concatenate(docs)
+            totals = np.bincount(docs, weights=np.concatenate(scores))
+            matched = np.flatnonzero(totals)
+            matched = matched[self.alive[segment.slots[matched]]]
+            all_scores.append(totals[matched])
+            all_ids.append(segment.ids[matched])
+        if not all_scores:
+            return []
+        scores, ids = np.concatenate(all_scores), np.concatenate(all_ids)
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+            scores, ids = scores[top], ids[top]
+        order = np.argsort(-scores)
+        return [(int(chunk_id), float(score)) for chunk_id, score in zip(ids[order], scores[order])]
+
+
+def _open_index(path, manifest, version, segment):
+    segments = [segment(entry["name"], lambda entry=entry: TextSegment(path, entry)) for entry in manifest["segments"]]
+    return TextIndex(path, manifest, version, segments)
+
+
+_snapshots = SnapshotCache(_open_index)
+
+
+def text_index_path(path):
+    """Keyword index directory inside a project's index directory."""
+    return os.path.join(path, "text")
+
+
+def load_text_index(path):
+    return _snapshots.load(path)
+
+
+def write_segment(path, vocabulary, terms, docs, tfs, ids, lengths, slots):
+    """Write postings given as parallel ``(term index into vocabulary, doc, tf)`` arrays."""
+    order = np.argsort(np.asarray(vocabulary, dtype=object), kind="stable")
+    rank = np.empty(len(vocabulary), dtype=np.int64)
+    rank[order] = np.arange(len(vocabulary))
+    terms = rank[np.asarray(terms, dtype=np.int64)].astype(np.int32)
+    docs, tfs = np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.int32)
+    by_term = np.lexsort((docs, terms))
+    terms, docs, tfs = terms[by_term], docs[by_term], tfs[by_term]
+
+    counts = np.bincount(terms, minlength=len(vocabulary))
+    used = counts > 0
+    starts = np.cumsum(counts) - counts
+    gaps = docs.copy()
+    gaps[1:] -= docs[:-1]
+    gaps[starts[used]] = docs[starts[used]]  # each list starts from doc 0
+    pairs = np.empty(len(docs) * 2, dtype=np.int32)
+    pairs[0::2], pairs[1::2] = gaps, tfs
+    del gaps, docs, tfs
+    encoded, sizes = encode_varints(pairs)
+    del pairs
+    sizes = sizes.reshape(-1, 2).sum(axis=1, dtype=np.int64)
+    term_bytes = np.bincount(terms, weights=sizes, minlength=len(vocabulary)).astype(np.int64)
+    offsets = np.cumsum(term_bytes) - term_bytes
+    lexicon = np.stack([offsets, term_bytes, counts], axis=1)[used]
+
+    name = segment_name()
+    base = os.path.join(path, name)
+    with open(f"{base}.terms", "w", encoding="utf-8") as fh:
+        fh.write("\n".join(vocabulary[index] for index in order if counts[rank[index]]))
+    lexicon.astype(np.int64).tofile(f"{base}.dict")
+    encoded.tofile(f"{base}.post")
+    np.asarray(ids, dtype=np.int64).tofile(f"{base}.ids")
+    np.asarray(lengths, dtype=np.int32).tofile(f"{base}.lens")
+    np.asarray(slots, dtype=np.int32).tofile(f"{base}.slots")
+    return {"name": name, "docs": len(ids), "tokens": int(np.sum(lengths)), "post_bytes": len(encoded)}
+
+
+def replace_text_files(path, file_ids, ids=(), row_files=(), texts=()):
+    """Tombstone every document of ``file_ids`` and append the given chunks as a new segment."""
+    vocabulary, term_index = [], {}
+    terms, docs, tfs, lengths = [], [], [], []
+    for doc, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            if term not in term_index:
+                term_index[term] = len(vocabulary)
+                vocabulary.append(term)
+            terms.append(term_index[term])
+            docs.append(doc)
+            tfs.append(tf)
+    with index_lock(path):
+        manifest, _ = read_manifest(path)
+        if manifest is None:
+            manifest = {"files": [], "segments": []}
+        slots = assign_file_slots(manifest["files"], file_ids, row_files)
+        if len(ids):
+            manifest["segments"].append(write_segment(path, vocabulary, terms, docs, tfs, ids, lengths, slots))
+        write_manifest(path, manifest)
+        remove_unreferenced(path, manifest)
+    return live_rows(manifest)
+
+
+def text_needs_compaction(path):
+    manifest, _ = read_manifest(path)
+    if manifest is None:
+        return False
+    live, dead = live_rows(manifest), dead_rows(manifest)
+    return (
+        len(manifest["segments"]) > settings.TEXT_INDEX_MAX_SEGMENTS
+        or dead > (live + dead) * settings.TEXT_INDEX_COMPACT_DEAD_RATIO
+    )
+
+
+def compact_text_index(path):
+    """Merge all segments into one, dropping tombstoned documents; returns the live document count."""
+    with index_lock(path):
+        manifest, _ = read_manifest(path)
+        if manifest is None:
+            return 0
+        manifest["files"], remap = compact_file_table(manifest["files"])
+        remap = np.asarray(remap, dtype=np.int32)
+        vocabulary, term_index = [], {}
+        terms, docs, tfs, ids, lengths, slots = [], [], [], [], [], []
+        base_doc = 0
+        for entry in manifest["segments"]:
+            segment = TextSegment(path, entry)
+            live = remap[segment.slots] >= 0
+            new_doc = np.cumsum(live) - 1 + base_doc
+            global_terms = np.empty(len(segment.terms), dtype=np.int64)
+            for term, index in segment.terms.items():
+                if term not in term_index:
+                    term_index[term] = len(vocabulary)
+                    vocabulary.append(term)
+                global_terms[index] = term_index[term]
+            segment_terms, segment_docs, segment_tfs = segment.all_postings()
+            keep = live[segment_docs]
+            terms.append(global_terms[segment_terms[keep]])
+            docs.append(new_doc[segment_docs[keep]])
+            tfs.append(segment_tfs[keep])
+            ids.append(segment.ids[live])
+            lengths.append(segment.lengths[live])
+            slots.append(remap[segment.slots[live]])
+            base_doc += int(live.sum())
+
+        manifest["segments"] = []
+        if base_doc:
+            manifest["segments"].append(write_segment(
+                path, vocabulary, np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs),
+                np.concatenate(ids), np.concatenate(lengths), np.concatenate(slots),
+            ))
+        write_manifest(path, manifest)
+        remove_unreferenced(path, manifest)
+    return base_doc
+
+
+def drop_text_index(path):
+    _snapshots.forget(path)
+    shutil.rmtree(path, ignore_errors=True)
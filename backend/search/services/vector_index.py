@@ -0,0 +1,334 @@
+"""IVF (inverted file) approximate nearest-neighbour index over chunk embeddings.
+
+Each (user, project) index lives in its own directory:
+
+- ``MANIFEST``: JSON naming the model, the centroids file, the live segments and the
+  file table. It is replaced atomically, so readers always see a consistent snapshot.
+- ``centroids-*.npy``: the coarse quantizer; rows are grouped by their nearest centroid
+  so a query only scans the ``nprobe`` closest inverted lists.
+- ``seg-*.vec`` / ``.ids`` / ``.slots``: append-only segments of fixed-width float32 or
+  float16 vectors with int64 chunk-id and int32 file-slot sidecars, rows sorted by list.
+
+Segments are never modified once written and every process opens them with ``np.memmap``,
+so all web and worker processes share one copy through the page cache. Removing a file
+only tombstones its slot in the file table; compaction later rewrites the live rows into
+a single segment, retraining the centroids if the index has outgrown them.
+"""
+import math
+import os
+import shutil
+import uuid
+import numpy as np
+from django.conf import settings
+from .segments import (
+    SnapshotCache, assign_file_slots, compact_file_table, dead_rows, index_lock, live_rows, read_manifest,
+    remove_unreferenced, segment_name, write_manifest,
+)
+
+VECTOR_DTYPE = np.dtype("<f4")
+STORAGE_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+ASSIGN_BATCH_ROWS = 8192
+
+
+def index_path(user_id, project_id):
+    return os.path.join(settings.VECTOR_INDEX_ROOT, str(user_id), str(project_id))
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=VECTOR_DTYPE)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def target_nlist(count):
+    """Roughly sqrt(n) lists once there is enough data to train on, else one flat list."""
+    if count < settings.VECTOR_INDEX_MIN_TRAIN:
+        return 1
+    return max(1, int(math.sqrt(count)))
+
+
+def assign_lists(vectors, centroids):
+    """Index of the most similar centroid for every row, computed in bounded-memory batches."""
+    if len(centroids) == 1:
+        return np.zeros(len(vectors), dtype=np.int64)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BATCH_ROWS):
+        batch = np.asarray(vectors[start:start + ASSIGN_BATCH_ROWS], dtype=VECTOR_DTYPE)
+        assignments[start:start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors, nlist, iterations=None, seed=0):
+    """Spherical k-means on a sample of ``vectors``; returns ``nlist`` unit-length centroids."""
+    if nlist == 1:
+        return np.zeros((1, vectors.shape[1]), dtype=VECTOR_DTYPE)
+    iterations = iterations or settings.VECTOR_INDEX_TRAIN_ITERATIONS
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * settings.VECTOR_INDEX_TRAIN_POINTS_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=VECTOR_DTYPE)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        # Re-seed lists that lost all their points instead of leaving dead centroids
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class Segment:
+    """One immutable, memory-mapped run of rows sorted by inverted list."""
+
+    def __init__(self, path, entry, dimensions, dtype):
+        base = os.path.join(path, entry["name"])
+        rows = entry["rows"]
+        self.name = entry["name"]
+        self.offsets = np.asarray(entry["offsets"], dtype=np.int64)
+        self.vectors = np.memmap(f"{base}.vec", dtype=dtype, mode="r", shape=(rows, dimensions))
+        self.ids = np.memmap(f"{base}.ids", dtype=np.int64, mode="r", shape=(rows,))
+        self.slots = np.memmap(f"{base}.slots", dtype=np.int32, mode="r", shape=(rows,))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def list_assignments(self):
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+
+class VectorIndex:
+    """A read-only snapshot of a project index as described by one MANIFEST version."""
+
+    def __init__(self, path, manifest, version, segments):
+        self.path = path
+        self.manifest = manifest
+        self.version = version
+        self.segments = segments
+        self.centroids = np.load(os.path.join(path, manifest["centroids"]))
+        self.alive = np.array([file_id is not None for file_id, _ in manifest["files"]], dtype=bool)
+
+    @property
+    def model(self):
+        return self.manifest["model"]
+
+    def __len__(self):
+        return live_rows(self.manifest)
+
+    def search(self, query, k=10, nprobe=None):
+        """Top ``k`` ``(chunk_id, score)`` pairs by cosine similarity to ``query``."""
+        nprobe = min(nprobe or settings.VECTOR_INDEX_NPROBE, len(self.centroids))
+        query = normalize_rows(query)
+        if nprobe < len(self.centroids):
+            probe = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+        else:
+            probe = np.arange(len(self.centroids))
+        all_scores, all_ids = [], []
+        for segment in self.segments:
+            for i in probe:
+                start, stop = segment.offsets[i], segment.offsets[i + 1]
+                if stop == start:
+                    continue
+                # Each list is a contiguous slice of the mmap, read straight from the page cache
+                live = self.alive[segment.slots[start:stop]]
+                scores = np.asarray(segment.vectors[start:stop], dtype=VECTOR_DTYPE) @ query
+                all_scores.append(scores[live])
+                all_ids.append(segment.ids[start:stop][live])
+        if not all_scores:
+            return []
+        scores, ids = np.concatenate(all_scores), np.concatenate(all_ids)
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+            scores, ids = scores[top], ids[top]
+        order = np.argsort(-scores)
+        return [(int(chunk_id), float(score)) for chunk_id, score in zip(ids[order], scores[order])]
+
+
+def _open_index(path, manifest, version, segment):
+    dtype = STORAGE_DTYPES[manifest["dtype"]]
+    segments = [
+        segment(entry["name"], lambda entry=entry: Segment(path, entry, manifest["dimensions"], dtype))
+        for entry in manifest["segments"]
+    ]
+    return VectorIndex(path, manifest, version, segments)
+
+
+_snapshots = SnapshotCache(_open_index)
+
+
+def load_index(path):
+    """The current snapshot of the index at ``path`` (cached per process), or None."""
+    return _snapshots.load(path)
+
+
+def write_centroids(path, centroids):
+    name = f"centroids-{uuid.uuid4().hex}.npy"
+    np.save(os.path.join(path, name), np.asarray(centroids, dtype=VECTOR_DTYPE))
+    return name
+
+
+def write_segment(path, vectors, ids, slots, lists, nlist, dtype):
+    """Write rows sorted by inverted list as a new segment; returns its manifest entry."""
+    order = np.argsort(lists, kind="stable")
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(lists, minlength=nlist), out=offsets[1:])
+    name = segment_name()
+    base = os.path.join(path, name)
+    stored = np.memmap(f"{base}.vec", dtype=dtype, mode="w+", shape=(len(order), vectors.shape[1]))
+    for start in range(0, len(order), ASSIGN_BATCH_ROWS):
+        # Gathered a batch at a time so the sorted copy never has to fit in memory
+        stored[start:start + ASSIGN_BATCH_ROWS] = vectors[order[start:start + ASSIGN_BATCH_ROWS]]
+    stored.flush()
+    del stored
+    np.asarray(ids, dtype=np.int64)[order].tofile(f"{base}.ids")
+    np.asarray(slots, dtype=np.int32)[order].tofile(f"{base}.slots")
+    return {"name": name, "rows": len(order), "offsets": offsets.tolist()}
+
+
+def replace_files(path, model, dimensions, file_ids, ids=(), row_files=(), vectors=None):
+    """Tombstone every row belonging to ``file_ids`` and append the given rows as a new segment.
+
+    ``row_files`` holds the file id of each new row. New rows are routed to the current
+    inverted lists; retraining is left to compaction. Returns the number of live rows.
+    """
+    vectors = normalize_rows(vectors) if len(ids) else np.empty((0, dimensions), VECTOR_DTYPE)
+    with index_lock(path):
+        manifest, _ = read_manifest(path)
+        if manifest is None or manifest["model"] != model or manifest["dimensions"] != dimensions:
+            centroids = train_centroids(vectors, target_nlist(len(vectors)))
+            manifest = {
+                "model": model,
+                "dimensions": dimensions,
+                "dtype": settings.VECTOR_INDEX_DTYPE,
+                "centroids": write_centroids(path, centroids),
+                "nlist": len(centroids),
+                "files": [],
+                "segments": [],
+            }
+        else:
+            centroids = np.load(os.path.join(path, manifest["centroids"]))
+
+        slots = assign_file_slots(manifest["files"], file_ids, row_files)
+        if len(ids):
+            manifest["segments"].append(write_segment(
+                path, vectors, ids, slots, assign_lists(vectors, centroids), len(centroids),
+                STORAGE_DTYPES[manifest["dtype"]],
+            ))
+        write_manifest(path, manifest)
+        remove_unreferenced(path, manifest, keep=[manifest["centroids"]])
+    return live_rows(manifest)
+
+
+def needs_compaction(path):
+    """Too many segments, too many tombstoned rows, or a list count far from what the size calls for."""
+    manifest, _ = read_manifest(path)
+    if manifest is None:
+        return False
+    live, dead = live_rows(manifest), dead_rows(manifest)
+    return (
+        len(manifest["segments"]) > settings.VECTOR_INDEX_MAX_SEGMENTS
+        or dead > (live + dead) * settings.VECTOR_INDEX_COMPACT_DEAD_RATIO
+        or not 0.5 <= target_nlist(live) / manifest["nlist"] <= 2
+    )
+
+
+def merge_segments(path, segments, live, remap, nlist, rows, dtype):
+    """Copy the ``live`` rows of ``segments`` into one new segment on the same inverted lists.
+
+    The segment files are sized up front and filled one source list at a time, so no more
+    than one list of one segment is ever held in memory. Returns the manifest entry.
+    """
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    for segment, keep in zip(segments, live):
+        offsets[1:] += np.bincount(segment.list_assignments()[keep], minlength=nlist)
+    np.cumsum(offsets, out=offsets)
+    name = segment_name()
+    base = os.path.join(path, name)
+    stored = np.memmap(f"{base}.vec", dtype=dtype, mode="w+", shape=(rows, segments[0].vectors.shape[1]))
+    ids = np.memmap(f"{base}.ids", dtype=np.int64, mode="w+", shape=(rows,))
+    slots = np.memmap(f"{base}.slots", dtype=np.int32, mode="w+", shape=(rows,))
+    cursor = offsets[:-1].copy()
+    for segment, keep in zip(segments, live):
+        for i in range(nlist):
+            start, stop = segment.offsets[i], segment.offsets[i + 1]
+            kept = keep[start:stop]
+            count = int(kept.sum())
+            if not count:
+                continue
+            target = slice(cursor[i], cursor[i] + count)
+            stored[target] = segment.vectors[start:stop][kept]
+            ids[target] = segment.ids[start:stop][kept]
+            slots[target] = remap[segment.slots[start:stop][kept]]
+            cursor[i] += count
+    for array in (stored, ids, slots):
+        array.flush()
+    return {"name": name, "rows": rows, "offsets": offsets.tolist()}
+
+
+def stage_live_rows(path, segments, live, remap, rows):
+    """The ``live`` rows of ``segments``, vectors in a pre-sized scratch memmap; returns (vectors, ids, slots)."""
+    name = segment_name()
+    vectors = np.memmap(
+        os.path.join(path, f"{name}.vec"), dtype=VECTOR_DTYPE, mode="w+", shape=(rows, segments[0].vectors.shape[1]),
+    )
+    ids, slots = np.empty(rows, dtype=np.int64), np.empty(rows, dtype=np.int32)
+    filled = 0
+    for segment, keep in zip(segments, live):
+        for start in range(0, len(segment), ASSIGN_BATCH_ROWS):
+            kept = keep[start:start + ASSIGN_BATCH_ROWS]
+            target = slice(filled, filled + int(kept.sum()))
+            vectors[target] = segment.vectors[start:start + ASSIGN_BATCH_ROWS][kept]
+            ids[target] = segment.ids[start:start + ASSIGN_BATCH_ROWS][kept]
+            slots[target] = remap[segment.slots[start:start + ASSIGN_BATCH_ROWS][kept]]
+            filled = target.stop
+    vectors.flush()
+    return vectors, ids, slots
+
+
+def compact_index(path):
+    """Rewrite the live rows of every segment into one, dropping tombstoned files.
+
+    The centroids are retrained when the live row count calls for a list count more than
+    2x away from the current one. Rows are streamed through memory-mapped files, never
+    gathered into one array. Returns the number of live rows.
+    """
+    with index_lock(path):
+        manifest, _ = read_manifest(path)
+        if manifest is None:
+            return 0
+        dimensions = manifest["dimensions"]
+        manifest["files"], remap = compact_file_table(manifest["files"])
+        remap = np.asarray(remap, dtype=np.int32)
+        centroids = np.load(os.path.join(path, manifest["centroids"]))
+        segments = [
+            Segment(path, entry, dimensions, STORAGE_DTYPES[manifest["dtype"]]) for entry in manifest["segments"]
+        ]
+        live = [remap[segment.slots] >= 0 for segment in segments]
+        rows = sum(int(keep.sum()) for keep in live)
+
+        dtype = STORAGE_DTYPES[settings.VECTOR_INDEX_DTYPE]
+        manifest["dtype"] = settings.VECTOR_INDEX_DTYPE
+        manifest["segments"] = []
+        nlist = target_nlist(rows)
+        if not 0.5 <= nlist / len(centroids) <= 2:
+            # Training samples the rows and assignment reads them all again, so they are staged
+            # in a scratch file first; it is not in the manifest, so remove_unreferenced drops it
+            staged = stage_live_rows(path, segments, live, remap, rows) if rows else None
+            centroids = train_centroids(staged[0] if staged else np.empty((0, dimensions), VECTOR_DTYPE), nlist)
+            manifest["centroids"] = write_centroids(path, centroids)
+            manifest["nlist"] = len(centroids)
+            if staged:
+                vectors, ids, slots = staged
+                manifest["segments"].append(write_segment(
+                    path, vectors, ids, slots, assign_lists(vectors, centroids), len(centroids), dtype,
+                ))
+        elif rows:
+            manifest["segments"].append(merge_segments(path, segments, live, remap, len(centroids), rows, dtype))
+        write_manifest(path, manifest)
+        remove_unreferenced(path, manifest, keep=[manifest["centroids"]])
+    return rows
+
+
+def drop_index(path):
+    _snapshots.forget(path)
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,50 @@
+from project_root.celery_app import app
+from upload.models import File, Project
+from search.services import (
+    sync_project_files, rebuild_project_index, compact_project_indexes, needs_project_compaction,
+)
+from search.services.indexing import INDEXES
+
+def _sync(project, file_ids, indexes=INDEXES):
+    counts = sync_project_files(project, file_ids, indexes)
+    # Answers cached while the indexes were catching up were built from the old documents
+    project.bump_documents_version()
+    if needs_project_compaction(project):
+        compact_project_index.delay(str(project.id))
+    return counts
+
+@app.task(name="search.tasks.sync_project_index")
+def sync_project_index(project_id: str, file_ids: list[str]):
+    """Apply attach/detach of ``file_ids`` to the project's vector and keyword indexes."""
+    project = Project.objects.get(id=project_id) #type: ignore
+    return {"project_id": project_id, "rows": _sync(project, file_ids)}
+
+@app.task(name="search.tasks.sync_file_indexes")
+def sync_file_indexes(file_id: str, indexes: list[str] | None = None):
+    """Refresh a file's rows in every project it is attached to, e.g. after it is re-parsed ("text")
+    or re-embedded ("vector")."""
+    file = File.objects.get(id=file_id) #type: ignore
+    for project in file.projects.filter(is_deleted=False):
+        _sync(project, [file_id], indexes or INDEXES)
+    return {"file_id": file_id}
+
+@app.task(name="search.tasks.rebuild_project_index")
+def rebuild_project_index_task(project_id: str):
+    project = Project.objects.get(id=project_id) #type: ignore
+    return {"project_id": project_id, "rows": rebuild_project_index(project)}
+
+@app.task(name="search.tasks.compact_project_index")
+def compact_project_index(project_id: str):
+    """Merge a project's index segments and drop tombstoned rows."""
+    project = Project.objects.get(id=project_id) #type: ignore
+    return {"project_id": project_id, "rows": compact_project_indexes(project)}
+
+@app.task(name="search.tasks.compact_vector_indexes")
+def compact_vector_indexes():
+    """Periodic sweep compacting every project index that has accumulated segments or tombstones."""
+    compacted = 0
+    for project in Project.objects.filter(is_deleted=False).only("id", "user_id").iterator(): #type: ignore
+        if needs_project_compaction(project):
+            compact_project_indexes(project)
+            compacted += 1
+    return {"compacted": compacted}
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from jobs.services.embedding import embed_file
+from search import views
+from search.services import sync_project_files
+from upload.models import Project
+
+
+@override_settings(EMBEDDING_DIMENSIONS=64)
+class SearchViewTests(ServicesTestMixin, TransactionTestCase):
+    # The search runs on an executor thread with its own connection, so the data must be committed
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Oncology") #type: ignore
+        file = create_file(self.user, ["BRCA1 mutations raise breast cancer risk", "protein folding kinetics"])
+        embed_file(file)
+        self.project.files.add(file)
+        sync_project_files(self.project, [str(file.id)])
+
+    def search(self, client=None, **params):
+        return (client or self.client).get("/api/search/", {"project": str(self.project.id), **params})
+
+    def test_results(self):
+        response = self.search(q="BRCA1", k=1)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([result["text"] for result in body["results"]], ["BRCA1 mutations raise breast cancer risk"])
+        self.assertIn("took_ms", body)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.search(client=APIClient(), q="BRCA1").status_code, 401)
+        self.assertEqual(self.search(q="BRCA1", mode="fuzzy").status_code, 400)
+        self.assertEqual(self.search(client=api_client(create_user("someone-else@example.com")), q="BRCA1").status_code, 404)
+
+    def test_worker_thread_closes_its_connections(self):
+        closed_on = []
+        with mock.patch.object(views.connections, "close_all", side_effect=lambda: closed_on.append(threading.get_ident())):
+            self.assertEqual(self.search(q="BRCA1").status_code, 200)
+
+        self.assertEqual(len(closed_on), 1)
+        self.assertNotEqual(closed_on[0], threading.get_ident())
+
+    async def test_concurrent_searches_run_in_parallel(self):
+        client = AsyncClient()
+        client.cookies["access_token"] = self.client.cookies["access_token"].value
+        search_project = views.search_project
+
+        def slow_search(*args):
+            time.sleep(0.3)
+            return search_project(*args)
+
+        started = time.perf_counter()
+        with mock.patch.object(views, "search_project", slow_search):
+            responses = await asyncio.gather(*(
+                client.get("/api/search/", {"project": str(self.project.id), "q": "folding"}) for _ in range(3)
+            ))
+
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+        self.assertLess(time.perf_counter() - started, 0.8)
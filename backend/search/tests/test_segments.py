@@ -0,0 +1,132 @@
+import os
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from core.tests.helpers import ServicesTestMixin
+from search.services.segments import assign_file_slots, compact_file_table, read_manifest
+from search.services.vector_index import compact_index, load_index, needs_compaction, replace_files
+from .test_vector_index import DIMENSIONS, clustered_vectors
+
+
+class FileTableTests(SimpleTestCase):
+    def test_slots_tombstone_replaced_files(self):
+        files = [["f1", 2], ["f2", 1]]
+
+        slots = assign_file_slots(files, ["f1"], ["f1", "f3", "f1"])
+
+        self.assertEqual(slots, [2, 3, 2])
+        self.assertEqual(files, [[None, 2], ["f2", 1], ["f1", 2], ["f3", 1]])
+
+    def test_compaction_remaps_live_slots(self):
+        self.assertEqual(
+            compact_file_table([[None, 2], ["f2", 1], ["f1", 2]]),
+            ([["f2", 1], ["f1", 2]], [-1, 0, 1]),
+        )
+
+
+class SegmentTests(ServicesTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = str(self.root / "index")
+        self.vectors = clustered_vectors(300)
+
+    def add(self, file_id, start, stop):
+        ids = list(range(start, stop))
+        return replace_files(self.path, "hash-16", DIMENSIONS, [file_id], ids, [file_id] * len(ids), self.vectors[start:stop])
+
+    def segment_files(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith("seg-"))
+
+    def test_segments_are_memory_mapped_and_shared_between_snapshots(self):
+        self.add("f1", 0, 100)
+        first = load_index(self.path)
+
+        self.add("f2", 100, 200)
+        second = load_index(self.path)
+
+        self.assertIsInstance(first.segments[0].vectors, np.memmap)
+        self.assertEqual(len(second.segments), 2)
+        self.assertIs(second.segments[0], first.segments[0])
+
+    @override_settings(VECTOR_INDEX_DTYPE="float16")
+    def test_half_precision_segments(self):
+        self.add("f1", 0, 100)
+
+        index = load_index(self.path)
+        name = index.segments[0].name
+
+        self.assertEqual(os.path.getsize(os.path.join(self.path, f"{name}.vec")), 100 * DIMENSIONS * 2)
+        self.assertEqual(os.path.getsize(os.path.join(self.path, f"{name}.ids")), 100 * 8)
+        self.assertEqual(index.search(self.vectors[5], k=1)[0][0], 5)
+
+    @override_settings(VECTOR_INDEX_MAX_SEGMENTS=2)
+    def test_too_many_segments_need_compaction(self):
+        for number in range(3):
+            self.add(f"f{number}", number * 10, number * 10 + 10)
+
+        self.assertTrue(needs_compaction(self.path))
+
+    def test_compaction_drops_tombstoned_rows(self):
+        self.add("f1", 0, 100)
+        self.add("f2", 100, 200)
+        replace_files(self.path, "hash-16", DIMENSIONS, ["f1"])
+        self.assertTrue(needs_compaction(self.path))
+        before = load_index(self.path).search(self.vectors[150], k=20)
+
+        live = compact_index(self.path)
+
+        manifest, _ = read_manifest(self.path)
+        self.assertEqual(live, 100)
+        self.assertEqual(manifest["files"], [["f2", 100]])
+        self.assertEqual(len(manifest["segments"]), 1)
+        # The .vec, .ids and .slots of the one remaining segment
+        self.assertEqual(len(self.segment_files()), 3)
+        self.assertFalse(needs_compaction(self.path))
+        self.assertEqual(load_index(self.path).search(self.vectors[150], k=20), before)
+
+    @override_settings(VECTOR_INDEX_MIN_TRAIN=100)
+    def test_compaction_retrains_an_outgrown_index(self):
+        self.add("f1", 0, 50)
+        for number, start in enumerate(range(50, 300, 50)):
+            self.add(f"g{number}", start, start + 50)
+        self.assertEqual(read_manifest(self.path)[0]["nlist"], 1)
+        self.assertTrue(needs_compaction(self.path))
+
+        compact_index(self.path)
+
+        index = load_index(self.path)
+        self.assertEqual(len(index.centroids), 17)
+        # The scratch copy the centroids were trained on is gone
+        self.assertEqual(len(self.segment_files()), 3)
+        self.assertEqual(index.search(self.vectors[42], k=1, nprobe=17)[0][0], 42)
+
+    @override_settings(VECTOR_INDEX_MIN_TRAIN=100)
+    def test_compaction_keeps_rows_on_their_lists(self):
+        self.add("f1", 0, 200)
+        for number, start in enumerate(range(200, 300, 25)):
+            self.add(f"g{number}", start, start + 25)
+        replace_files(self.path, "hash-16", DIMENSIONS, ["g1"])
+        before = load_index(self.path)
+        expected = [[chunk_id for chunk_id, _ in before.search(self.vectors[row], k=5, nprobe=3)] for row in (7, 160, 290)]
+
+        self.assertEqual(compact_index(self.path), 275)
+
+        index = load_index(self.path)
+        segment = index.segments[0]
+        self.assertEqual((len(index.segments), len(index.centroids)), (1, len(before.centroids)))
+        self.assertEqual(sorted(segment.ids), [*range(225), *range(250, 300)])
+        for i in range(len(index.centroids)):
+            rows = np.asarray(self.vectors[segment.ids[segment.offsets[i]:segment.offsets[i + 1]]])
+            self.assertTrue((np.argmax(rows @ index.centroids.T, axis=1) == i).all())
+        found = [[chunk_id for chunk_id, _ in index.search(self.vectors[row], k=5, nprobe=3)] for row in (7, 160, 290)]
+        self.assertEqual(found, expected)
+
+    def test_old_snapshots_keep_reading_after_compaction(self):
+        self.add("f1", 0, 100)
+        self.add("f2", 100, 200)
+        old = load_index(self.path)
+
+        replace_files(self.path, "hash-16", DIMENSIONS, ["f1"])
+        compact_index(self.path)
+
+        self.assertEqual(old.search(self.vectors[5], k=1)[0][0], 5)
+        self.assertGreaterEqual(load_index(self.path).search(self.vectors[5], k=1)[0][0], 100)
@@ -0,0 +1,174 @@
+import math
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, create_file, create_user
+from jobs.services.embedding import embed_file
+from search.services import indexing, search_project, sync_project_files, text_index
+from search.services.indexing import reciprocal_rank_fusion
+from search.services.segments import read_manifest
+from search.services.text_index import (
+    compact_text_index, decode_varints, encode_varints, load_text_index, replace_text_files, tokenize,
+)
+from upload.models import Project
+
+DOCUMENTS = {
+    1: "BRCA1 mutations raise breast cancer risk",
+    2: "breast cancer screening guidelines for breast tissue",
+    3: "protein folding and misfolding",
+    4: "the cancer genome atlas",
+}
+
+
+class VarintTests(SimpleTestCase):
+    VALUES = [0, 1, 127, 128, 300, 16383, 16384, 2**32, 2**40]
+
+    def test_round_trip(self):
+        encoded, sizes = encode_varints(self.VALUES)
+
+        self.assertEqual(sizes.tolist(), [1, 1, 1, 2, 2, 2, 3, 5, 6])
+        self.assertEqual(decode_varints(encoded).tolist(), self.VALUES)
+
+    def test_leb128_layout(self):
+        self.assertEqual(encode_varints([300])[0].tobytes(), b"\xac\x02")
+
+    def test_values_straddling_a_block_boundary(self):
+        with mock.patch.object(text_index, "VARINT_BLOCK", 3):
+            encoded, _ = encode_varints(self.VALUES)
+            decoded = decode_varints(encoded)
+
+        self.assertEqual(decoded.tolist(), self.VALUES)
+
+    def test_empty(self):
+        encoded, sizes = encode_varints([])
+
+        self.assertEqual((len(encoded), len(sizes), len(decode_varints(encoded))), (0, 0, 0))
+
+
+class TextIndexTests(ServicesTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = str(self.root / "text")
+
+    def add(self, file_id, documents):
+        return replace_text_files(self.path, [file_id], list(documents), [file_id] * len(documents), list(documents.values()))
+
+    def bm25(self, documents, query):
+        """Reference BM25 over ``documents`` computed the textbook way."""
+        tokens = {chunk_id: tokenize(text) for chunk_id, text in documents.items()}
+        average = sum(map(len, tokens.values())) / len(tokens)
+        scores = {}
+        for chunk_id, doc in tokens.items():
+            score = 0.0
+            for term in set(tokenize(query)):
+                df = sum(term in other for other in tokens.values())
+                if not df or term not in doc:
+                    continue
+                tf = doc.count(term)
+                idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+                score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(doc) / average))
+            if score:
+                scores[chunk_id] = score
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def assertHits(self, hits, expected):
+        self.assertEqual([chunk_id for chunk_id, _ in hits], [chunk_id for chunk_id, _ in expected])
+        np.testing.assert_allclose([score for _, score in hits], [score for _, score in expected], rtol=1e-6)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("The BRCA1 gene, and its p53-pathway"), ["brca1", "gene", "p53", "pathway"])
+
+    def test_scores_match_bm25(self):
+        self.add("f1", DOCUMENTS)
+
+        index = load_text_index(self.path)
+
+        for query in ("breast cancer", "BRCA1", "cancer", "folding of proteins"):
+            with self.subTest(query):
+                self.assertHits(index.search(query), self.bm25(DOCUMENTS, query))
+
+    def test_stop_words_and_unknown_terms_match_nothing(self):
+        self.add("f1", DOCUMENTS)
+
+        self.assertEqual(load_text_index(self.path).search("the and of"), [])
+        self.assertEqual(load_text_index(self.path).search("zebrafish"), [])
+
+    def test_postings_are_compressed(self):
+        self.add("f1", DOCUMENTS)
+
+        manifest, _ = read_manifest(self.path)
+        postings = sum(len(set(tokenize(text))) for text in DOCUMENTS.values())
+
+        # One byte each for the doc gap and term frequency of every posting
+        self.assertEqual(manifest["segments"][0]["post_bytes"], 2 * postings)
+
+    def test_results_span_segments_and_skip_tombstones(self):
+        self.add("f1", {1: DOCUMENTS[1], 2: DOCUMENTS[2]})
+        self.add("f2", {3: DOCUMENTS[3], 4: DOCUMENTS[4]})
+        self.assertEqual({chunk_id for chunk_id, _ in load_text_index(self.path).search("cancer")}, {1, 2, 4})
+
+        replace_text_files(self.path, ["f1"])
+
+        self.assertEqual([chunk_id for chunk_id, _ in load_text_index(self.path).search("cancer")], [4])
+
+    def test_compaction_matches_a_fresh_index(self):
+        self.add("f1", {1: DOCUMENTS[1], 2: DOCUMENTS[2]})
+        self.add("f2", {3: DOCUMENTS[3], 4: DOCUMENTS[4]})
+        self.add("f3", {5: "cancer cancer cancer"})
+        replace_text_files(self.path, ["f2"])
+
+        self.assertEqual(compact_text_index(self.path), 3)
+
+        live = {chunk_id: DOCUMENTS.get(chunk_id, "cancer cancer cancer") for chunk_id in (1, 2, 5)}
+        self.assertEqual(len(read_manifest(self.path)[0]["segments"]), 1)
+        self.assertHits(load_text_index(self.path).search("breast cancer"), self.bm25(live, "breast cancer"))
+
+
+class FusionTests(SimpleTestCase):
+    @override_settings(SEARCH_RRF_K=60)
+    def test_reciprocal_rank_fusion(self):
+        vector = [(1, 0.9), (3, 0.1)]
+        keyword = [(3, 12.0), (4, 7.5)]
+
+        fused = reciprocal_rank_fusion([vector, keyword], k=3)
+
+        self.assertEqual([chunk_id for chunk_id, _ in fused], [3, 1, 4])
+        self.assertAlmostEqual(fused[0][1], 1 / 62 + 1 / 61)
+        self.assertAlmostEqual(fused[1][1], 1 / 61)
+
+
+@override_settings(EMBEDDING_DIMENSIONS=64)
+class HybridSearchTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user = create_user()
+        self.project = Project.objects.create(user=user, name="Oncology") #type: ignore
+        self.file = create_file(user, list(DOCUMENTS.values()))
+        embed_file(self.file)
+        self.project.files.add(self.file)
+        sync_project_files(self.project, [str(self.file.id)])
+
+    def test_exact_terms_are_found_by_keyword_and_hybrid_search(self):
+        for mode in ("keyword", "hybrid"):
+            with self.subTest(mode):
+                results, took_ms = search_project(self.project, "BRCA1", k=1, mode=mode)
+
+                self.assertEqual(results[0]["text"], DOCUMENTS[1])
+                self.assertGreater(results[0]["keyword_score"], 0)
+                self.assertGreaterEqual(took_ms, 0)
+
+    def test_hybrid_results_carry_both_scores(self):
+        results, _ = search_project(self.project, "breast cancer", k=4)
+
+        top = results[0]
+        self.assertEqual({result["page_number"] for result in results[:2]}, {1, 2})
+        self.assertIsNotNone(top["vector_score"])
+        self.assertIsNotNone(top["keyword_score"])
+        self.assertEqual([result["score"] for result in results], sorted((result["score"] for result in results), reverse=True))
+
+    def test_chunks_of_detached_files_are_filtered_out(self):
+        # The index still has the rows until the sync task runs after the detach commits
+        self.project.files.remove(self.file)
+
+        self.assertEqual(search_project(self.project, "cancer")[0], [])
+        self.assertTrue(indexing.keyword_hits(self.project, "cancer", 10))
@@ -0,0 +1,132 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from jobs.services.embedding import embed_file
+from search.services import search_project
+from search.services.indexing import project_index_path
+from search.services.vector_index import load_index, normalize_rows, replace_files
+from upload.models import Project
+
+DIMENSIONS = 16
+
+
+def clustered_vectors(count, clusters=8, seed=0):
+    """Unit vectors scattered around ``clusters`` random directions."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, DIMENSIONS))
+    return normalize_rows(centres[rng.integers(clusters, size=count)] + rng.normal(scale=0.1, size=(count, DIMENSIONS)))
+
+
+class VectorIndexTests(ServicesTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = str(self.root / "index")
+
+    def add(self, file_id, ids, vectors, model="hash-16"):
+        return replace_files(self.path, model, DIMENSIONS, [file_id], ids, [file_id] * len(ids), vectors)
+
+    def brute_force(self, vectors, query, k):
+        scores = vectors @ normalize_rows(query)
+        return [int(i) for i in np.argsort(-scores)[:k]]
+
+    def test_small_index_is_an_exact_flat_scan(self):
+        vectors = clustered_vectors(200)
+        self.add("f1", list(range(200)), vectors)
+
+        index = load_index(self.path)
+        hits = index.search(vectors[7], k=5)
+
+        self.assertEqual(len(index.centroids), 1)
+        self.assertEqual([chunk_id for chunk_id, _ in hits], self.brute_force(vectors, vectors[7], 5))
+        self.assertAlmostEqual(hits[0][1], 1.0, places=5)
+
+    @override_settings(VECTOR_INDEX_MIN_TRAIN=100, VECTOR_INDEX_NPROBE=4)
+    def test_inverted_lists_find_the_nearest_neighbours(self):
+        vectors = clustered_vectors(900)
+        self.add("f1", list(range(900)), vectors)
+        index = load_index(self.path)
+        self.assertEqual(len(index.centroids), 30)
+
+        queries = clustered_vectors(20, seed=1)
+        recall = np.mean([
+            len({chunk_id for chunk_id, _ in index.search(query, k=10)} & set(self.brute_force(vectors, query, 10))) / 10
+            for query in queries
+        ])
+        exhaustive = [chunk_id for chunk_id, _ in index.search(queries[0], k=10, nprobe=30)]
+
+        self.assertGreaterEqual(recall, 0.9)
+        self.assertEqual(exhaustive, self.brute_force(vectors, queries[0], 10))
+
+    def test_detached_files_disappear_from_results(self):
+        vectors = clustered_vectors(40)
+        self.add("f1", list(range(20)), vectors[:20])
+        self.add("f2", list(range(20, 40)), vectors[20:])
+
+        live = replace_files(self.path, "hash-16", DIMENSIONS, ["f1"])
+
+        self.assertEqual(live, 20)
+        self.assertTrue(all(chunk_id >= 20 for chunk_id, _ in load_index(self.path).search(vectors[3], k=40)))
+
+    def test_reindexed_file_replaces_its_rows(self):
+        vectors = clustered_vectors(10)
+        self.add("f1", list(range(10)), vectors)
+
+        self.add("f1", [100, 101], vectors[:2])
+
+        index = load_index(self.path)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(sorted(chunk_id for chunk_id, _ in index.search(vectors[0], k=10)), [100, 101])
+
+    def test_changing_model_starts_a_new_index(self):
+        vectors = clustered_vectors(10)
+        self.add("f1", list(range(10)), vectors)
+
+        self.add("f2", [50], vectors[:1], model="other-16")
+
+        index = load_index(self.path)
+        self.assertEqual((index.model, len(index)), ("other-16", 1))
+
+    def test_snapshot_is_reused_until_the_manifest_changes(self):
+        vectors = clustered_vectors(10)
+        self.add("f1", list(range(10)), vectors)
+        first = load_index(self.path)
+
+        self.assertIs(load_index(self.path), first)
+        self.add("f2", [10], vectors[:1])
+        self.assertIsNot(load_index(self.path), first)
+        self.assertIsNone(load_index(str(self.root / "missing")))
+
+
+@override_settings(EMBEDDING_DIMENSIONS=64)
+class ProjectVectorSearchTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Folding") #type: ignore
+        self.file = create_file(self.user, ["protein folding kinetics", "quarterly sales figures"])
+        embed_file(self.file)
+
+    def post(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/projects/{self.project.id}/{action}/", {"file_id": str(self.file.id)}, format="json")
+        self.assertIn(response.status_code, (200, 204), response.content)
+
+    def test_attach_and_detach_update_the_project_index(self):
+        self.post("attach-file")
+
+        results, _ = search_project(self.project, "protein folding", k=1, mode="vector")
+        self.assertEqual([result["text"] for result in results], ["protein folding kinetics"])
+        self.assertEqual(len(load_index(project_index_path(self.project))), 2)
+
+        self.post("detach-file")
+
+        self.assertEqual(len(load_index(project_index_path(self.project))), 0)
+        self.assertEqual(search_project(self.project, "protein folding", mode="vector")[0], [])
+
+    def test_indexes_are_scoped_per_project(self):
+        self.post("attach-file")
+        other = Project.objects.create(user=self.user, name="Sales") #type: ignore
+
+        self.assertNotEqual(project_index_path(other), project_index_path(self.project))
+        self.assertEqual(search_project(other, "protein folding", mode="vector")[0], [])
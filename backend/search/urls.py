@@ -0,0 +1,7 @@
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+from .views import search
+
+router = DefaultRouter()
+
+urlpatterns = [path("search/", search, name="search")] + router.urls
@@ -0,0 +1,47 @@
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from upload.models import Project
+from search.serializers import SearchQuerySerializer, SearchResultSerializer
+from search.services import search_project
+
+
+def search_in_worker(*args):
+    """``search_project`` for an executor thread, closing the connection it opened there.
+
+    Executor threads outlive the request and Django only closes connections of the thread
+    that handles the request, so each search would otherwise leave one open.
+    """
+    try:
+        return search_project(*args)
+    finally:
+        connections.close_all()
+
+
+@require_GET
+async def search(request):
+    """Hybrid (semantic + BM25 keyword) search over the chunks of one of the user's projects.
+
+    Async so that under ASGI a slow query only holds a worker thread while the index is
+    scanned, not while the request is parsed or the response is written.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    params = SearchQuerySerializer(data=request.GET)
+    if not params.is_valid():
+        return JsonResponse(params.errors, status=400)
+    project = await Project.objects.filter( #type: ignore
+        id=params.validated_data["project"], user=request.user, is_deleted=False,
+    ).afirst()
+    if project is None:
+        return JsonResponse({"detail": "Project not found"}, status=404)
+    # Off the shared sync thread so concurrent searches scan in parallel
+    results, took_ms = await sync_to_async(search_in_worker, thread_sensitive=False)(
+        project,
+        params.validated_data["q"],
+        params.validated_data["k"],
+        params.validated_data.get("nprobe"),
+        params.validated_data["mode"],
+    )
+    return JsonResponse({"results": SearchResultSerializer(results, many=True).data, "took_ms": took_ms})
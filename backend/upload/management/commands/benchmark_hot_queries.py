@@ -0,0 +1,139 @@
+import re
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import User
+from upload.filters import ProjectFilterSet
+from upload.models import File, Project, ProjectStatus
+from upload.viewsets.project import ProjectViewSet
+
+# (name, ProjectFilterSet params) for the filters the project list is called with
+PROJECT_QUERIES = [
+    ("projects", {}),
+    ("projects ?is_pinned", {"is_pinned": "true"}),
+    ("projects ?is_favorite", {"is_favorite": "true"}),
+    ("projects ?status", {"status": ProjectStatus.PUBLISHED}),
+    ("projects ?created_after", {"created_after": "{week_ago}"}),
+    ("projects ?updated_after", {"updated_after": "{week_ago}"}),
+    ("projects ?name", {"name": "report 4242"}),
+]
+# Plans that read the whole table; every hot query must avoid them
+FULL_SCANS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (\w+)(?!\w| USING)"),
+}
+INDEX_USED = re.compile(r"(?:Index(?: Only)? Scan(?: Backward)? using|Bitmap Index Scan on|USING (?:COVERING )?INDEX) (\w+)")
+LIMIT = 100
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot project and file list queries against a seeded table (1M rows by default) and "
+        "fail if any reads the whole table instead of an index. Fixtures are created in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Projects (and files) to seed")
+        parser.add_argument("--users", type=int, default=1000, help="Owners the rows are spread over")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan in full")
+
+    def seed(self, rows, users, batch_size):
+        owners = User.objects.bulk_create([ #type: ignore
+            User(email=f"explain-{uuid.uuid4().hex}@example.com", username=uuid.uuid4().hex) for _ in range(users)
+        ], batch_size=batch_size)
+        statuses = list(ProjectStatus.values)
+        now = timezone.now()
+        for start in range(0, rows, batch_size):
+            stop = min(start + batch_size, rows)
+            Project.objects.bulk_create([ #type: ignore
+                Project(
+                    user=owners[i % users], name=f"report {i}", description=f"cohort {i}", slug=f"explain-{uuid.uuid4().hex}",
+                    status=statuses[i % len(statuses)], is_deleted=i % 10 == 0,
+                    is_pinned=i % 50 == 0, is_favorite=i % 20 == 0,
+                )
+                for i in range(start, stop)
+            ])
+            File.objects.bulk_create([ #type: ignore
+                File(
+                    user=owners[i % users], file=f"files/{i}.txt", slug=f"explain-{uuid.uuid4().hex}",
+                    file_type="text/plain", file_size=i, file_name=f"{i}.txt", file_path=f"files/{i}.txt",
+                    file_extension=".txt", file_hash="", file_url="",
+                )
+                for i in range(start, stop)
+            ])
+        # Spread the timestamps over a year so date-range filters are selective
+        for model in (Project, File):
+            table = model._meta.db_table
+            with connection.cursor() as cursor:
+                for offset in range(0, 365, 7):
+                    ids = list(model.objects.order_by().values_list("pk", flat=True)[offset * rows // 365:(offset + 7) * rows // 365]) #type: ignore
+                    model.objects.filter(pk__in=ids).update( #type: ignore
+                        created_at=now - timedelta(days=365 - offset), updated_at=now - timedelta(days=365 - offset),
+                    ) #type: ignore
+                if connection.vendor == "postgresql":
+                    cursor.execute(f"ANALYZE {table}")
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return owners[0]
+
+    def queries(self, user):
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+        live = Project.objects.filter(user=user, is_deleted=False) #type: ignore
+        for name, params in PROJECT_QUERIES:
+            params = {key: value.format(week_ago=week_ago) for key, value in params.items()}
+            if name == "projects ?name" and connection.vendor != "postgresql":
+                # The trigram indexes only exist on Postgres
+                continue
+            yield name, ProjectFilterSet(params, queryset=live).qs.order_by("-created_at")[:LIMIT]
+        if connection.vendor == "postgresql":
+            # ?search= ORs name and description, each backed by its own trigram index
+            request = Request(APIRequestFactory().get("/", {"search": "cohort 4242"}))
+            yield "projects ?search", SearchFilter().filter_queryset(request, live, ProjectViewSet()).order_by("-created_at")[:LIMIT]
+        yield "files", File.objects.order_by("-created_at")[:LIMIT] #type: ignore
+        yield "user files", File.objects.filter(user=user).order_by("-created_at")[:LIMIT] #type: ignore
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCANS:
+            raise CommandError(f"Don't know how to read {connection.vendor} plans")
+        full_scan = FULL_SCANS[connection.vendor]
+        hot_tables = {Project._meta.db_table, File._meta.db_table}
+        failures = []
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Seeding {options['rows']} projects and files over {options['users']} users...")
+                user = self.seed(options["rows"], options["users"], options["batch_size"])
+                for name, queryset in self.queries(user):
+                    plan = self.explain(queryset)
+                    scanned = hot_tables & set(full_scan.findall(plan))
+                    indexes = sorted(set(INDEX_USED.findall(plan)))
+                    verdict = "FULL SCAN" if scanned else "ok"
+                    self.stdout.write(f"{name:<24} {verdict:<10} {', '.join(indexes) or '-'}")
+                    if scanned:
+                        failures.append(name)
+                    if scanned or options["verbose_plans"]:
+                        self.stdout.write(plan)
+                raise Rollback
+        except Rollback:
+            pass
+        if failures:
+            raise CommandError(f"Hot queries read whole tables: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Every hot query uses an index"))
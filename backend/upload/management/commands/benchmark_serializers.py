@@ -0,0 +1,102 @@
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.models import User
+from upload.models import File, Project
+from upload.serializers import FileSerializer
+from upload.serializers.project import ProjectSerializer
+from upload.serializers.values import values_serializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def request_host():
+    """A host name ALLOWED_HOSTS accepts, so serializers can build absolute URLs."""
+    host = next(iter(settings.ALLOWED_HOSTS), "localhost").lstrip(".")
+    return "localhost" if host in ("", "*") else host
+
+
+class Command(BaseCommand):
+    help = (
+        "Rows/sec of the list endpoints' JSON: DRF serializers + JSONRenderer against values() rows "
+        "rendered by ValuesSerializer, checking both produce the same JSON. "
+        "Fixtures are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Files and projects to render")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the best is reported")
+
+    def seed(self, rows):
+        user = User.objects.create_user( #type: ignore
+            email=f"serializers-{uuid.uuid4().hex}@example.com", username=uuid.uuid4().hex, password=uuid.uuid4().hex,
+        )
+        File.objects.bulk_create([ #type: ignore
+            File(
+                user=user, file=f"files/{i}.pdf", slug=f"serializers-{uuid.uuid4().hex}", file_type="application/pdf",
+                file_size=i * 1024, file_name=f"report {i}.pdf", file_path=f"files/{i}.pdf", file_extension=".pdf",
+                file_hash=uuid.uuid4().hex, file_url=f"https://example.com/files/{i}.pdf",
+                file_metadata={"pages": i % 300, "author": "Ada Lovelace", "source": "upload"}, file_tags=["paper", f"tag-{i % 10}"],
+            )
+            for i in range(rows)
+        ], batch_size=5000)
+        Project.objects.bulk_create([ #type: ignore
+            Project(user=user, name=f"project {i}", description="A project description " * 4, slug=f"serializers-{uuid.uuid4().hex}")
+            for i in range(rows)
+        ], batch_size=5000)
+        return user
+
+    def best(self, func, repeat):
+        timings, output = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = func()
+            timings.append(time.perf_counter() - started)
+        return min(timings), output
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        request = APIRequestFactory(HTTP_HOST=request_host()).get("/")
+        self.stdout.write(f"{'serializer':<20} {'path':<28} {'seconds':>9} {'rows/sec':>12}")
+        try:
+            with transaction.atomic():
+                user = self.seed(rows)
+                for serializer_class, queryset in (
+                    (FileSerializer, File.objects.filter(user=user)), #type: ignore
+                    (ProjectSerializer, Project.objects.filter(user=user)), #type: ignore
+                ):
+                    fast = values_serializer(serializer_class)
+                    render = lambda instances: JSONRenderer().render(
+                        serializer_class(instances, many=True, context={"request": request}).data
+                    )
+                    drf_seconds, drf_json = self.best(lambda: render(list(queryset.all())), repeat)
+                    fast_seconds, fast_json = self.best(
+                        lambda: fast.dumps(queryset.values(*fast.columns()), request=request), repeat,
+                    )
+                    if json.loads(drf_json) != json.loads(fast_json):
+                        raise CommandError(f"{serializer_class.__name__}: values() rendering differs from the serializer's")
+                    # The same again without the query, which neither path can make cheaper
+                    instances, values = list(queryset.all()), list(queryset.values(*fast.columns()))
+                    drf_render_seconds, _ = self.best(lambda: render(instances), repeat)
+                    fast_render_seconds, _ = self.best(lambda: fast.dumps(values, request=request), repeat)
+                    for path, seconds in (
+                        ("ModelSerializer+JSONRenderer", drf_seconds), ("values()+orjson", fast_seconds),
+                        ("  render only, DRF", drf_render_seconds), ("  render only, orjson", fast_render_seconds),
+                    ):
+                        self.stdout.write(f"{serializer_class.__name__:<20} {path:<28} {seconds:>9.3f} {rows / seconds:>12,.0f}")
+                    self.stdout.write(
+                        f"{serializer_class.__name__:<20} {'speed-up (render only)':<28} "
+                        f"{drf_seconds / fast_seconds:>8.1f}x ({drf_render_seconds / fast_render_seconds:.1f}x)"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
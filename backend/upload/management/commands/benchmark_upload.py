@@ -0,0 +1,76 @@
+import hashlib
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from upload.services.storage import upload_to_storage
+
+
+def legacy_upload_to_storage(uploaded_file, user_id, storage):
+    """The previous implementation: hash the whole file in memory, then let the storage read it again."""
+    path = f"uploads/{user_id}/{uploaded_file.name}"
+    file_hash = hashlib.md5(uploaded_file.read()).hexdigest()
+    uploaded_file.seek(0)
+    saved_path = storage.save(path, uploaded_file)
+    return {"path": saved_path, "url": storage.url(saved_path), "hash": file_hash}
+
+
+VARIANTS = {
+    "legacy": legacy_upload_to_storage,
+    "streaming": upload_to_storage,
+}
+
+
+def _run_variant(variant, source_path, storage_root, queue):
+    """Runs in a forked child so ru_maxrss reflects only this variant."""
+    storage = FileSystemStorage(location=storage_root)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(source_path, "rb") as fh:
+        started = time.perf_counter()
+        result = VARIANTS[variant](File(fh, name=os.path.basename(source_path)), "benchmark", storage=storage)
+        elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({"elapsed": elapsed, "rss_growth_kb": max(rss_after - rss_before, 0), "hash": result["hash"]})
+
+
+class Command(BaseCommand):
+    help = "Compare peak RSS and throughput of the legacy and streaming upload_to_storage paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[16, 128, 512], help="File sizes in MB")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        ctx = multiprocessing.get_context("fork")
+        self.stdout.write(f"{'size':>8} {'variant':>10} {'MB/s':>10} {'peak RSS growth':>16}")
+        with tempfile.TemporaryDirectory() as workdir:
+            for size_mb in options["sizes"]:
+                source_path = os.path.join(workdir, f"sample-{size_mb}mb.bin")
+                with open(source_path, "wb") as fh:
+                    for _ in range(size_mb):
+                        fh.write(os.urandom(1024 * 1024))
+
+                hashes = set()
+                for variant in VARIANTS:
+                    runs = []
+                    for attempt in range(options["repeat"]):
+                        queue = ctx.Queue()
+                        storage_root = os.path.join(workdir, f"{variant}-{attempt}")
+                        process = ctx.Process(target=_run_variant, args=(variant, source_path, storage_root, queue))
+                        process.start()
+                        runs.append(queue.get())
+                        process.join()
+                    best = min(run["elapsed"] for run in runs)
+                    peak = max(run["rss_growth_kb"] for run in runs)
+                    hashes.update(run["hash"] for run in runs)
+                    self.stdout.write(
+                        f"{size_mb:>6}MB {variant:>10} {size_mb / best:>10.1f} {peak / 1024:>13.1f} MB"
+                    )
+                if len(hashes) != 1:
+                    self.stderr.write(self.style.ERROR(f"Hash mismatch for {size_mb}MB sample: {hashes}"))
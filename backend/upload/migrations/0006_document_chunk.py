@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-17 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0005_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.IntegerField()),
+                ('position', models.IntegerField()),
+                ('text', models.TextField()),
+                ('char_count', models.IntegerField()),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='upload.file')),
+            ],
+            options={
+                'ordering': ['page_number', 'position'],
+                'unique_together': {('file', 'page_number', 'position')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0007_chunk_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='documents_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
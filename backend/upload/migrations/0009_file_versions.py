@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-17 14:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_files_current(apps, schema_editor):
+    """Files as they were before versions were tracked are current, not stale.
+
+    Parsed files get parsed_version 1 and keep whatever embeddings they have; files never
+    parsed stay at 0, which the reconcile sweep leaves alone.
+    """
+    File = apps.get_model('upload', 'File')
+    File.objects.filter(chunks__isnull=False).update(parsed_version=1)
+    File.objects.update(embedded_version=F('parsed_version'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0008_project_documents_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='embedded_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='metadata_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='parsed_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_existing_files_current, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+INDEX = 'project_name_trgm_idx'
+
+
+def create_trigram_index(apps, schema_editor):
+    """Back ``name__icontains`` (``UPPER(name) LIKE UPPER('%...%')``) with a trigram index on Postgres."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} ON upload_project '
+        f'USING gin (UPPER(name) gin_trgm_ops) WHERE NOT is_deleted'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY keeps the project table writable while the index builds, and cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('upload', '0011_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
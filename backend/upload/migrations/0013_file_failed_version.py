@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-17 14:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def move_parse_failures(apps, schema_editor):
+    """Parse failures used to be recorded as file_status 'failed'; keep them from being retried."""
+    File = apps.get_model('upload', 'File')
+    File.objects.filter(file_status='failed').update(failed_version=F('content_version'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0012_project_name_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='failed_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(move_parse_failures, migrations.RunPython.noop),
+    ]
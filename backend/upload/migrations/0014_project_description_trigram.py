@@ -0,0 +1,33 @@
+from django.db import migrations
+
+INDEX = 'project_description_trgm_idx'
+
+
+def create_trigram_index(apps, schema_editor):
+    """Back ``description__icontains``, which ``?search=`` ORs with the name lookup, with a trigram index on Postgres."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} ON upload_project '
+        f'USING gin (UPPER(description) gin_trgm_ops) WHERE NOT is_deleted'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY keeps the project table writable while the index builds, and cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('upload', '0013_file_failed_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+def name_stored_chunks(apps, schema_editor):
+    """Chunks stored so far were saved under the session's chunk path."""
+    UploadChunk = apps.get_model('upload', 'UploadChunk')
+    for chunk in UploadChunk.objects.filter(name='').iterator():
+        chunk.name = f"{chunk.session_id}/{chunk.index:06d}.part"
+        chunk.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0014_project_description_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadchunk',
+            name='name',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(name_stored_chunks, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,6 @@
+from .blob import Blob
 from .file import File, FileStatus
-from .project import Project, ProjectStatus
\ No newline at end of file
+from .project import Project, ProjectStatus
+from .upload_session import UploadSession, UploadSessionStatus, UploadChunk
+from .chunk import DocumentChunk
+from .embedding import ChunkEmbedding
\ No newline at end of file
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class Blob(models.Model):
+    """Content-addressed object in the storage backend, shared by every File with the same bytes."""
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    md5 = models.CharField(max_length=32)
+    size = models.BigIntegerField()
+    storage_path = models.CharField(max_length=255)
+    url = models.CharField(max_length=255)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
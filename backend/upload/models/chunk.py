@@ -0,0 +1,19 @@
+from django.db import models
+from .file import File
+
+class DocumentChunk(models.Model):
+    """A normalized slice of text extracted from a File, in reading order."""
+    file = models.ForeignKey(File, on_delete=models.CASCADE, related_name="chunks")
+    page_number = models.IntegerField()
+    position = models.IntegerField()
+    text = models.TextField()
+    char_count = models.IntegerField()
+    content_hash = models.CharField(max_length=64, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['page_number', 'position']
+        unique_together = ('file', 'page_number', 'position')
+
+    def __str__(self):
+        return f"{self.file_id}:{self.page_number}:{self.position}"
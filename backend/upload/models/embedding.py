@@ -0,0 +1,16 @@
+from django.db import models
+from .chunk import DocumentChunk
+
+class ChunkEmbedding(models.Model):
+    """Embedding of a DocumentChunk for one model, stored as packed little-endian float32."""
+    chunk = models.ForeignKey(DocumentChunk, on_delete=models.CASCADE, related_name="embeddings")
+    model_name = models.CharField(max_length=255)
+    dimensions = models.IntegerField()
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('chunk', 'model_name')
+
+    def __str__(self):
+        return f"{self.chunk_id}:{self.model_name}"
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.text import slugify
 from core.models import User
+from .blob import Blob
 import uuid
 
 class FileStatus(models.TextChoices):
@@ -10,12 +11,16 @@ class FileStatus(models.TextChoices):
     DRAFT = 'draft'
 
 class File(models.Model):
+    METADATA_FIELDS = ("file_name", "file_metadata", "file_tags")
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="files")
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file = models.FileField(upload_to="files/")
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Indexed for the analytics exporter's updated_at watermark; queryset.update() calls that
+    # change exported columns must set it explicitly, since auto_now only fires on save()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     file_type = models.CharField(max_length=255)
     file_size = models.BigIntegerField()
     file_name = models.CharField(max_length=255)
@@ -26,7 +31,25 @@ class File(models.Model):
     file_status = models.CharField(max_length=255, choices=FileStatus.choices, default=FileStatus.DRAFT)
     file_metadata = models.JSONField(default=dict)
     file_tags = models.JSONField(default=list)
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, related_name="files", null=True, blank=True)
+    # content_version / metadata_version count changes to the stored bytes and to the editable
+    # fields; parsed_version / embedded_version record the content_version the chunks and their
+    # embeddings were derived from, so anything lagging behind is stale and can be redone alone.
+    # failed_version is the last content_version that could not be parsed, which is not retried.
+    # The pipeline keeps its state here and never touches the user-facing file_status.
+    content_version = models.PositiveIntegerField(default=1)
+    metadata_version = models.PositiveIntegerField(default=1)
+    parsed_version = models.PositiveIntegerField(default=0)
+    embedded_version = models.PositiveIntegerField(default=0)
+    failed_version = models.PositiveIntegerField(default=0)
    
+    class Meta:
+        # Backs the newest-first cursor pagination of the file list, overall and per user
+        indexes = [
+            models.Index(fields=['-created_at'], name='file_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='file_user_created_idx'),
+        ]
+
     def __str__(self):
         return self.file.name 
     
@@ -37,4 +60,16 @@ class File(models.Model):
             self.slug = f"{base_slug}-{unique_suffix}"
         
         super().save(*args, **kwargs)
+
+    def apply_metadata(self, changes):
+        """Set the given metadata fields, bumping metadata_version if any value actually differs.
+
+        Returns the names of the fields that changed (empty when the edit was a no-op).
+        """
+        changed = [name for name in self.METADATA_FIELDS if name in changes and getattr(self, name) != changes[name]]
+        for name in changed:
+            setattr(self, name, changes[name])
+        if changed:
+            self.metadata_version += 1
+        return changed
     
\ No newline at end of file
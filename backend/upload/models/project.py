@@ -16,7 +16,7 @@ class Project(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     files = models.ManyToManyField(File, related_name='projects', blank=True)
     status = models.CharField(max_length=255, choices=ProjectStatus.choices, default=ProjectStatus.DRAFT)
@@ -25,6 +25,8 @@ class Project(models.Model):
     is_pinned = models.BooleanField(default=False) #type: ignore
     is_favorite = models.BooleanField(default=False) #type: ignore
     is_shared = models.BooleanField(default=False) #type: ignore
+    # Bumped whenever the project's searchable documents change; keys cached answers
+    documents_version = models.PositiveIntegerField(default=0) #type: ignore
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -33,8 +35,25 @@ class Project(models.Model):
             self.slug = f"{base_slug}-{unique_suffix}"
         super().save(*args, **kwargs)
 
+    def bump_documents_version(self):
+        """Mark the document set as changed so answers cached against it stop matching."""
+        Project.objects.filter(pk=self.pk).update(documents_version=models.F("documents_version") + 1) #type: ignore
+        self.refresh_from_db(fields=["documents_version"])
+
     def __str__(self):
         return self.name
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        # Every API query is scoped to one user's live projects and lists newest first, so the
+        # indexes lead with user and are partial on is_deleted=False; the pinned/favorite ones
+        # only hold the few rows those filters return. The trigram indexes backing name__icontains
+        # and ?search= (name or description) are Postgres-only and live in migrations 0012 and
+        # 0014 rather than here.
+        indexes = [
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_deleted=False), name='project_live_created_idx'),
+            models.Index(fields=['user', '-updated_at'], condition=models.Q(is_deleted=False), name='project_live_updated_idx'),
+            models.Index(fields=['user', 'status', '-created_at'], condition=models.Q(is_deleted=False), name='project_live_status_idx'),
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_deleted=False, is_pinned=True), name='project_pinned_idx'),
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_deleted=False, is_favorite=True), name='project_favorite_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,48 @@
+from django.db import models
+from core.models import User
+from .file import File
+import uuid
+
+class UploadSessionStatus(models.TextChoices):
+    ACTIVE = 'active'
+    ASSEMBLING = 'assembling'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+class UploadSession(models.Model):
+    """A resumable upload whose chunks arrive in independent (possibly parallel) requests."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    total_chunks = models.IntegerField()
+    status = models.CharField(max_length=255, choices=UploadSessionStatus.choices, default=UploadSessionStatus.ACTIVE)
+    error_msg = models.TextField(blank=True)
+    file = models.ForeignKey(File, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload_sessions")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    def expected_chunk_size(self, index):
+        if index == self.total_chunks - 1:
+            return self.file_size - self.chunk_size * (self.total_chunks - 1)
+        return self.chunk_size
+
+    def chunk_path(self, index):
+        return f"{self.id}/{index:06d}.part"
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="chunks")
+    index = models.IntegerField()
+    size = models.IntegerField()
+    md5 = models.CharField(max_length=32)
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('session', 'index')
+        ordering = ['index']
@@ -0,0 +1,3 @@
+from .cursor import CursorLinkPagination
+
+__all__ = ['CursorLinkPagination']
@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class CursorLinkPagination(CursorPagination):
+    """Keyset pagination whose body stays a plain list; the next/previous pages are in a ``Link`` header.
+
+    Every list response is one page: API_PAGE_SIZE rows unless ``?page_size=`` asks for another
+    size, which is capped at API_MAX_PAGE_SIZE. Cursors seek on an indexed column instead of
+    counting an OFFSET, so page 200 of a large project costs the same as page 1.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-created_at'
+
+    def get_link_header(self):
+        links = [
+            f'<{url}>; rel="{rel}"'
+            for rel, url in (('next', self.get_next_link()), ('prev', self.get_previous_link()))
+            if url
+        ]
+        return ', '.join(links) or None
+
+    def get_paginated_response(self, data):
+        link = self.get_link_header()
+        return Response(data, headers={'Link': link} if link else None)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
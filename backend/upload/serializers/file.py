@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from upload.models import File, FileStatus
+from .mixins import ProjectedFieldsMixin
 
-class FileSerializer(serializers.ModelSerializer):
+class FileSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = File
         # Include all fields so that the frontend receives the complete object
@@ -21,6 +22,11 @@ class FileSerializer(serializers.ModelSerializer):
             'file_status',
             'file_metadata',
             'file_tags',
+            'content_version',
+            'metadata_version',
+            'parsed_version',
+            'embedded_version',
+            'failed_version',
         ]
         # All fields except 'file' should be read-only because they are filled in viewset
         read_only_fields = [
@@ -38,6 +44,11 @@ class FileSerializer(serializers.ModelSerializer):
             'file_status',
             'file_metadata',
             'file_tags',
+            'content_version',
+            'metadata_version',
+            'parsed_version',
+            'embedded_version',
+            'failed_version',
         ]
 
 class UpdateFileMetadataSerializer(serializers.Serializer):
@@ -60,6 +71,9 @@ class UpdateFileMetadataSerializer(serializers.Serializer):
             raise serializers.ValidationError("File tags must be a list")
         return value
 
+class ReplaceFileContentSerializer(serializers.Serializer):
+    file = serializers.FileField()
+
 class UpdateFileStatusSerializer(serializers.Serializer):
     file_status = serializers.ChoiceField(choices=FileStatus.choices)
 
@@ -0,0 +1,14 @@
+class ProjectedFieldsMixin:
+    """Serializer mixin rendering only the fields listed in ``context['fields']`` (all of them when unset)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if not requested:
+            return fields
+        return {name: fields[name] for name in requested}
+
+
+def readable_fields(serializer_class):
+    """``{field name: source}`` of every field ``serializer_class`` renders."""
+    return {name: field.source for name, field in serializer_class().fields.items() if not field.write_only}
@@ -1,8 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
 from upload.models import Project, ProjectStatus
 from core.models import User
+from .mixins import ProjectedFieldsMixin
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
     # Accept user_id in the payload; map it to the related user
     user_id = serializers.PrimaryKeyRelatedField(source='user', queryset=User.objects.all(), write_only=True)
 
@@ -31,4 +33,12 @@ class BulkProjectSerializer(serializers.Serializer):
             raise serializers.ValidationError("Cannot create more than 100 projects at once")
         return value
 
-  
\ No newline at end of file
+
+class ProjectFileSerializer(serializers.Serializer):
+    file_id = serializers.UUIDField()
+
+
+class BulkProjectFilesSerializer(serializers.Serializer):
+    file_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=settings.BULK_ATTACH_MAX_FILES,
+    )
@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework import serializers
+from upload.models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'file_name', 'file_type', 'file_size', 'chunk_size', 'total_chunks',
+            'received_chunks', 'status', 'error_msg', 'file', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_received_chunks(self, obj):
+        return list(obj.chunks.values_list('index', flat=True))
+
+
+class StartUploadSessionSerializer(serializers.Serializer):
+    file_name = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+    file_type = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    chunk_size = serializers.IntegerField(required=False)
+
+    def validate_chunk_size(self, value):
+        if not settings.CHUNKED_UPLOAD_MIN_CHUNK_SIZE <= value <= settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f"Chunk size must be between {settings.CHUNKED_UPLOAD_MIN_CHUNK_SIZE} "
+                f"and {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes"
+            )
+        return value
+
+
+class UploadChunkSerializer(serializers.Serializer):
+    chunk = serializers.FileField()
+    md5 = serializers.CharField(max_length=32, required=False)
@@ -0,0 +1,106 @@
+"""Read-only rendering of ``queryset.values()`` rows straight to JSON bytes.
+
+``ValuesSerializer(FileSerializer)`` reads the serializer's fields once and then turns
+plain value dicts into the same JSON that serializer would produce, without building model
+instances or running DRF's per-field machinery for every row. Fields are passed through to
+orjson as they come from the database wherever their DRF representation is the native JSON
+one (strings, numbers, booleans, UUIDs, JSON, UTC ISO-8601 datetimes); only file fields
+need converting. Serializers with fields it cannot reproduce are rejected up front.
+"""
+from functools import lru_cache
+import orjson
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import iri_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Field types whose representation is the database value itself
+PASSTHROUGH = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.UUIDField,
+)
+OPTIONS = orjson.OPT_UTC_Z
+
+
+def file_url(storage, use_url):
+    """Converter factory for a file column: the (absolute) URL DRF's FileField renders."""
+    def for_request(request):
+        # build_absolute_uri() for a path is the request's scheme and host in front of it
+        origin = request.build_absolute_uri('/')[:-1] if request is not None else None
+
+        def convert(name):
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = storage.url(name)
+            if origin is None:
+                return url
+            if url.startswith('/') and not url.startswith('//'):
+                return iri_to_uri(origin + url)
+            return request.build_absolute_uri(url)
+        return convert
+    return for_request
+
+
+def datetime_converter(field):
+    """None when orjson's rendering of the value already matches DRF's, else DRF's own conversion."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    iso = isinstance(output_format, str) and output_format.lower() == ISO_8601
+    # Values come back from the database in UTC, which DRF would render with a Z suffix too
+    if iso and settings.USE_TZ and settings.TIME_ZONE == 'UTC' and not hasattr(field, 'timezone'):
+        return None
+    convert = lambda value: field.to_representation(value) if value is not None else None
+    return lambda request: convert
+
+
+class ValuesSerializer:
+    """Renders ``values()`` rows of ``serializer_class``'s model as that serializer would, read-only."""
+
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        self.fields = {}  # name -> (column, converter factory taking the request, or None)
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: only model columns can be rendered from values()")
+            if isinstance(field, serializers.FileField):
+                model_field = model._meta.get_field(field.source)
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                converter = file_url(model_field.storage, use_url)
+            elif isinstance(field, serializers.DateTimeField):
+                converter = datetime_converter(field)
+            elif isinstance(field, PASSTHROUGH):
+                converter = None
+            else:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: {type(field).__name__} is not supported")
+            self.fields[name] = (field.source, converter)
+
+    def columns(self, names=None):
+        return [self.fields[name][0] for name in names or self.fields]
+
+    def rows(self, rows, names=None, request=None):
+        fields = [
+            (name, column, None if factory is None else factory(request))
+            for name, (column, factory) in ((name, self.fields[name]) for name in names or self.fields)
+        ]
+        for row in rows:
+            yield {
+                name: row[column] if converter is None else converter(row[column])
+                for name, column, converter in fields
+            }
+
+    def dumps(self, rows, names=None, request=None):
+        return orjson.dumps(list(self.rows(rows, names, request)), option=OPTIONS)
+
+
+@lru_cache(maxsize=None)
+def values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
@@ -1,2 +1,3 @@
 # Package for upload-related service classes and business logic 
-from .storage import upload_to_storage, generate_download_url, download_file_locally
\ No newline at end of file
+from .storage import upload_to_storage, generate_download_url, download_file_locally, file_digests
+from .blobs import acquire_blob, blob_reference, release_blob
\ No newline at end of file
@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from upload.models import Blob
+from .storage import file_digests
+
+
+def blob_path(sha256):
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def acquire_blob(uploaded_file, storage=None, digests=None):
+    """Return the Blob holding ``uploaded_file``'s bytes, writing it only if no Blob has them yet.
+
+    The caller owns one reference on the returned Blob and must hand it back with
+    ``release_blob`` when the referencing File goes away. Digests are taken from
+    ``digests`` (e.g. chunked uploads, which hash while assembling), else from the upload
+    handler that received the file, so the content is read at most once, to store it. Call
+    this outside any transaction (see ``blob_reference``): a rollback cannot undo the write.
+    """
+    storage = storage or default_storage
+    digests = digests or file_digests(uploaded_file)
+    sha256 = digests["sha256"]
+
+    # Duplicate content: metadata-only, the storage backend is never touched
+    if Blob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1): #type: ignore
+        return Blob.objects.get(sha256=sha256), False #type: ignore
+
+    saved_path = storage.save(blob_path(sha256), uploaded_file)
+    try:
+        blob, created = Blob.objects.get_or_create( #type: ignore
+            sha256=sha256,
+            defaults={
+                "md5": digests["md5"],
+                "size": uploaded_file.size,
+                "storage_path": saved_path,
+                "url": storage.url(saved_path),
+            },
+        )
+    except BaseException:
+        storage.delete(saved_path)
+        raise
+    if not created and blob.storage_path != saved_path:
+        # A concurrent upload of the same bytes won the race; drop our copy
+        storage.delete(saved_path)
+    Blob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1) #type: ignore
+    blob.refresh_from_db(fields=["ref_count"])
+    return blob, created
+
+
+@contextmanager
+def blob_reference(uploaded_file, storage=None, digests=None):
+    """``acquire_blob`` for a File created in the block, handing the reference back if the block fails.
+
+    Open it before ``transaction.atomic``, so the storage write happens outside the
+    transaction and a rollback of the File rows releases the blob instead of orphaning it.
+    """
+    blob, _ = acquire_blob(uploaded_file, storage, digests)
+    try:
+        yield blob
+    except BaseException:
+        release_blob(blob, storage)
+        raise
+
+
+def release_blob(blob, storage=None):
+    """Drop one reference to ``blob`` and delete the stored object once nothing points at it."""
+    storage = storage or default_storage
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().get(sha256=blob.sha256) #type: ignore
+        if blob.ref_count > 1:
+            blob.ref_count = F("ref_count") - 1
+            blob.save(update_fields=["ref_count"])
+            return False
+        storage_path = blob.storage_path
+        blob.delete()
+        transaction.on_commit(lambda: storage.delete(storage_path))
+    return True
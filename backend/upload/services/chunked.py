@@ -0,0 +1,134 @@
+import hashlib
+import math
+import os
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from upload.models import File, UploadSession, UploadSessionStatus, UploadChunk
+from .blobs import blob_reference
+
+# Sessions that take chunks and can be completed; a failed assembly can be retried as is
+# or after re-sending chunks
+OPEN_STATUSES = (UploadSessionStatus.ACTIVE, UploadSessionStatus.FAILED)
+
+
+def chunk_storage():
+    if settings.CHUNKED_UPLOAD_STORAGE == "default":
+        return default_storage
+    return FileSystemStorage(location=settings.CHUNKED_UPLOAD_ROOT)
+
+
+def start_session(user, file_name, file_size, chunk_size=None, file_type=''):
+    chunk_size = chunk_size or settings.CHUNKED_UPLOAD_DEFAULT_CHUNK_SIZE
+    return UploadSession.objects.create( #type: ignore
+        user=user,
+        file_name=file_name,
+        file_type=file_type or os.path.splitext(file_name)[1].lower().lstrip('.'),
+        file_size=file_size,
+        chunk_size=chunk_size,
+        total_chunks=max(1, math.ceil(file_size / chunk_size)),
+    )
+
+
+def store_chunk(session, index, uploaded_chunk, md5=None):
+    """Persist one chunk. Re-sending an index overwrites it, so clients can simply retry."""
+    if session.status not in OPEN_STATUSES:
+        raise ValidationError({"error": f"Upload session is {session.status}"})
+    if not 0 <= index < session.total_chunks:
+        raise ValidationError({"error": f"Chunk index must be between 0 and {session.total_chunks - 1}"})
+    if uploaded_chunk.size != session.expected_chunk_size(index):
+        raise ValidationError({"error": f"Chunk {index} must be {session.expected_chunk_size(index)} bytes"})
+
+    hasher = hashlib.md5()
+    for data in uploaded_chunk.chunks(settings.FILE_UPLOAD_CHUNK_SIZE):
+        hasher.update(data)
+    digest = hasher.hexdigest()
+    if md5 and md5.lower() != digest:
+        raise ValidationError({"error": f"Checksum mismatch for chunk {index}"})
+    uploaded_chunk.seek(0)
+
+    # The storage picks another name when the path is taken (a re-send, or a concurrent one),
+    # so the chunk records the name it was actually saved under
+    storage = chunk_storage()
+    name = storage.save(session.chunk_path(index), uploaded_chunk)
+    previous = session.chunks.filter(index=index).values_list("name", flat=True).first()
+    chunk, _ = UploadChunk.objects.update_or_create( #type: ignore
+        session=session, index=index, defaults={"size": uploaded_chunk.size, "md5": digest, "name": name},
+    )
+    if previous and previous != name:
+        storage.delete(previous)
+    return chunk
+
+
+def missing_chunks(session):
+    received = set(session.chunks.values_list("index", flat=True))
+    return [index for index in range(session.total_chunks) if index not in received]
+
+
+def assemble_session(session):
+    """Concatenate the chunks in order, hashing as we go, and turn the result into a File."""
+    storage = chunk_storage()
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    names = session.chunks.order_by("index").values_list("name", flat=True)
+    with tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR) as assembled:
+        for name in names:
+            with storage.open(name, 'rb') as part:
+                for data in part.chunks(settings.FILE_UPLOAD_CHUNK_SIZE):
+                    sha256.update(data)
+                    md5.update(data)
+                    assembled.write(data)
+        assembled.seek(0)
+
+        content = DjangoFile(assembled, name=session.file_name)
+        content.size = session.file_size
+        digests = {"sha256": sha256.hexdigest(), "md5": md5.hexdigest()}
+        with blob_reference(content, digests=digests) as blob, transaction.atomic():
+            file = File.objects.create( #type: ignore
+                user=session.user,
+                blob=blob,
+                file=blob.storage_path,
+                file_name=session.file_name,
+                file_size=session.file_size,
+                file_extension=os.path.splitext(session.file_name)[1].lower(),
+                file_path=blob.storage_path,
+                file_url=blob.url,
+                file_type=session.file_type,
+                file_hash=blob.md5,
+            )
+            session.file = file
+            session.status = UploadSessionStatus.COMPLETED
+            session.save(update_fields=["file", "status", "updated_at"])
+    discard_chunks(session)
+    return file
+
+
+def discard_chunks(session):
+    """Delete every file under the session's directory, including copies orphaned by concurrent re-sends."""
+    storage = chunk_storage()
+    try:
+        _, names = storage.listdir(str(session.id))
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        storage.delete(f"{session.id}/{name}")
+    if isinstance(storage, FileSystemStorage) and os.path.isdir(storage.path(str(session.id))):
+        os.rmdir(storage.path(str(session.id)))
+
+
+def expire_sessions():
+    """Drop sessions abandoned by the client, and assemblies whose worker never finished."""
+    cutoff = timezone.now() - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS)
+    stale = UploadSession.objects.filter( #type: ignore
+        updated_at__lt=cutoff, status__in=[*OPEN_STATUSES, UploadSessionStatus.ASSEMBLING],
+    )
+    count = 0
+    for session in stale.iterator():
+        discard_chunks(session)
+        session.delete()
+        count += 1
+    return count
@@ -0,0 +1,63 @@
+"""Streaming NDJSON export of a project, its files and their extracted text.
+
+Every line is one JSON object tagged with ``type``: the ``project`` first, then each
+``file`` (as ``FileSerializer`` renders it) and, when asked for, each ``chunk`` in
+reading order. Rows come from server-side cursors (``QuerySet.iterator``) and are sent in
+blocks of about EXPORT_BUFFER_BYTES, so memory stays flat however large the project is.
+"""
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from upload.models import DocumentChunk, Project
+from upload.serializers import FileSerializer
+from upload.serializers.project import ProjectSerializer
+from upload.serializers.values import OPTIONS, values_serializer
+
+CHUNK_COLUMNS = ("file_id", "page_number", "position", "text", "char_count", "content_hash")
+
+
+def tagged(kind, rows):
+    for row in rows:
+        yield orjson.dumps({"type": kind, **row}, option=OPTIONS)
+
+
+def export_lines(project, include_chunks=False, request=None):
+    """One encoded JSON object per exported row, project first."""
+    projects = values_serializer(ProjectSerializer)
+    files = values_serializer(FileSerializer)
+    project_row = Project.objects.filter(pk=project.pk).values(*projects.columns()) #type: ignore
+    yield from tagged("project", projects.rows(project_row, request=request))
+
+    file_rows = project.files.order_by("created_at", "id").values(*files.columns())
+    yield from tagged("file", files.rows(file_rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), request=request))
+
+    if include_chunks:
+        chunk_rows = (
+            DocumentChunk.objects.filter(file__projects=project) #type: ignore
+            .order_by("file_id", "page_number", "position")
+            .values(*CHUNK_COLUMNS)
+        )
+        yield from tagged("chunk", chunk_rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE))
+
+
+def export_project(project, include_chunks=False, request=None):
+    """``export_lines`` joined into newline-terminated blocks of about EXPORT_BUFFER_BYTES."""
+    block, size = [], 0
+    for line in export_lines(project, include_chunks, request):
+        block.append(line)
+        size += len(line) + 1
+        if size >= settings.EXPORT_BUFFER_BYTES:
+            yield b"\n".join(block) + b"\n"
+            block, size = [], 0
+    if block:
+        yield b"\n".join(block) + b"\n"
+
+
+async def aexport_project(blocks):
+    """``export_project`` blocks for an ASGI response, each fetched on the sync thread.
+
+    Under ASGI a plain iterator would be read into memory in full before the first byte is sent.
+    """
+    next_block = sync_to_async(next)
+    while (block := await next_block(blocks, None)) is not None:
+        yield block
@@ -0,0 +1,94 @@
+"""Set-based attach/detach of files to a project.
+
+Work is done a batch of ids at a time, so 100k ids cost a few dozen statements instead
+of one round trip per file: a single annotated SELECT validates ownership and status and
+tells which files are attached already, one UPDATE resets their status and the M2M
+through rows are written with one ``bulk_create(ignore_conflicts=True)``.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from search.tasks import sync_project_index
+from upload.models import File, FileStatus, Project
+
+ProjectFile = Project.files.through
+# At most this many ids are listed in an error
+ERROR_SAMPLE = 20
+# Files re-indexed per sync_project_index task
+SYNC_BATCH = 1000
+
+
+def batches(ids, size=None):
+    size = size or settings.BULK_ATTACH_BATCH_SIZE
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def mark_changed(project, file_ids):
+    """Touch the project, invalidate answers cached against its documents and re-index ``file_ids``."""
+    if not file_ids:
+        return
+    Project.objects.filter(pk=project.pk).update( #type: ignore
+        updated_at=timezone.now(), documents_version=F("documents_version") + 1,
+    )
+    project_id = str(project.id)
+    for batch in batches([str(file_id) for file_id in file_ids], SYNC_BATCH):
+        transaction.on_commit(lambda batch=batch: sync_project_index.delay(project_id, batch))
+
+
+def attach_files(project, file_ids):
+    """Attach the project owner's ``file_ids`` to ``project``; returns ``(attached, already_attached)`` counts.
+
+    Raises NotFound if any id is not a file of the owner and ValidationError if any file
+    is still pending, in which case nothing is attached.
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    attached, already = [], 0
+    with transaction.atomic():
+        for batch in batches(file_ids):
+            rows = (
+                File.objects.filter(id__in=batch, user_id=project.user_id) #type: ignore
+                .annotate(attached=Exists(ProjectFile.objects.filter(project_id=project.id, file_id=OuterRef("pk"))))
+                .values_list("id", "file_status", "attached")
+            )
+            found, pending, new = set(), [], []
+            for file_id, file_status, is_attached in rows:
+                found.add(file_id)
+                if file_status == FileStatus.PENDING:
+                    pending.append(str(file_id))
+                elif is_attached:
+                    already += 1
+                else:
+                    new.append(file_id)
+            missing = [str(file_id) for file_id in batch if file_id not in found]
+            if missing:
+                raise NotFound({"error": f"{len(missing)} file(s) not found", "file_ids": missing[:ERROR_SAMPLE]})
+            if pending:
+                raise ValidationError({"error": f"{len(pending)} file(s) are pending", "file_ids": pending[:ERROR_SAMPLE]})
+            if new:
+                File.objects.filter(id__in=new).exclude(file_status=FileStatus.DRAFT).update( #type: ignore
+                    file_status=FileStatus.DRAFT, updated_at=timezone.now(),
+                )
+                ProjectFile.objects.bulk_create(
+                    [ProjectFile(project_id=project.id, file_id=file_id) for file_id in new], ignore_conflicts=True,
+                )
+                attached.extend(new)
+        mark_changed(project, attached)
+    return len(attached), already
+
+
+def detach_files(project, file_ids):
+    """Detach ``file_ids`` from ``project``; ids that are not attached are ignored. Returns the count detached."""
+    file_ids = list(dict.fromkeys(file_ids))
+    detached = []
+    with transaction.atomic():
+        for batch in batches(file_ids):
+            links = ProjectFile.objects.filter(project_id=project.id, file_id__in=batch)
+            batch_detached = list(links.values_list("file_id", flat=True))
+            if batch_detached:
+                links.delete()
+                detached.extend(batch_detached)
+        mark_changed(project, detached)
+    return len(detached)
@@ -0,0 +1,356 @@
+"""Streaming text extraction for uploaded documents.
+
+Every parser yields pages lazily so only one page of text is held in memory at a
+time, whatever the size of the document.
+"""
+import codecs
+import hashlib
+import os
+import re
+import unicodedata
+import zipfile
+from html.parser import HTMLParser
+from typing import NamedTuple
+from xml.etree import ElementTree
+from django.conf import settings
+from upload.models import ChunkEmbedding, DocumentChunk
+
+try:
+    from pypdf import PdfReader
+except ModuleNotFoundError:
+    # pypdf not installed – PDFs will raise UnsupportedDocument at runtime
+    PdfReader = None
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UnsupportedDocument(ValueError):
+    pass
+
+
+class Page(NamedTuple):
+    number: int  # 1-based
+    text: str
+    progress: float  # fraction of the document consumed once this page is read
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\u00ad", "")  # soft hyphens
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)  # words hyphenated across line breaks
+    text = re.sub(r"[^\S\n]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def split_into_chunks(text, max_chars):
+    """Pack paragraphs into chunks of at most ``max_chars``, breaking oversized paragraphs on words."""
+    chunks, current = [], ""
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph] if len(paragraph) <= max_chars else _split_words(paragraph, max_chars)
+        for piece in pieces:
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_words(paragraph, max_chars):
+    pieces, current = [], ""
+    for word in paragraph.split(" "):
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class PdfParser:
+    def __init__(self, fileobj, size):
+        if PdfReader is None:
+            raise UnsupportedDocument("PDF support requires the pypdf package")
+        self.reader = PdfReader(fileobj)
+        self.page_count = len(self.reader.pages)
+
+    def pages(self, start=0, stop=None):
+        stop = self.page_count if stop is None else min(stop, self.page_count)
+        for index in range(start, stop):
+            text = self.reader.pages[index].extract_text() or ""
+            yield Page(index + 1, text, (index + 1 - start) / max(stop - start, 1))
+
+
+class TextParser:
+    """Plain text, read in pseudo-pages of PARSE_TEXT_PAGE_CHARS split on line boundaries."""
+
+    page_count = None
+
+    def __init__(self, fileobj, size):
+        self.fileobj = fileobj
+        self.size = size
+
+    def blocks(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = self.fileobj.read(READ_BLOCK_SIZE)
+            text = decoder.decode(data, final=not data)
+            if text:
+                yield text
+            if not data:
+                break
+
+    def pages(self):
+        number, buffer = 0, ""
+        for text in self.blocks():
+            buffer += text
+            while len(buffer) >= settings.PARSE_TEXT_PAGE_CHARS:
+                cut = buffer.rfind("\n", 0, settings.PARSE_TEXT_PAGE_CHARS)
+                cut = cut if cut > 0 else settings.PARSE_TEXT_PAGE_CHARS
+                number += 1
+                yield Page(number, buffer[:cut], self.progress())
+                buffer = buffer[cut:]
+        if buffer.strip():
+            yield Page(number + 1, buffer, 1.0)
+
+    def progress(self):
+        return min(self.fileobj.tell() / self.size, 1.0) if self.size else 0.0
+
+
+class _HTMLTextExtractor(HTMLParser):
+    SKIP_TAGS = {"script", "style", "noscript", "template", "head"}
+    BLOCK_TAGS = {
+        "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article",
+        "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "header", "footer",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def drain(self):
+        text, self.parts = "".join(self.parts), []
+        return text
+
+
+class HtmlParser(TextParser):
+    def pages(self):
+        extractor = _HTMLTextExtractor()
+        number, buffer = 0, ""
+        for text in self.blocks():
+            extractor.feed(text)
+            buffer += extractor.drain()
+            while len(buffer) >= settings.PARSE_TEXT_PAGE_CHARS:
+                cut = buffer.rfind("\n\n", 0, settings.PARSE_TEXT_PAGE_CHARS)
+                cut = cut if cut > 0 else settings.PARSE_TEXT_PAGE_CHARS
+                number += 1
+                yield Page(number, buffer[:cut], self.progress())
+                buffer = buffer[cut:]
+        extractor.close()
+        buffer += extractor.drain()
+        if buffer.strip():
+            yield Page(number + 1, buffer, 1.0)
+
+
+class DocxParser:
+    """Streams word/document.xml; pages follow the explicit and last-rendered page breaks."""
+
+    page_count = None
+    W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+    def __init__(self, fileobj, size):
+        try:
+            self.archive = zipfile.ZipFile(fileobj)
+            self.info = self.archive.getinfo("word/document.xml")
+        except (zipfile.BadZipFile, KeyError):
+            raise UnsupportedDocument("Not a valid DOCX document")
+
+    def pages(self):
+        W = self.W
+        number, paragraphs, runs, stack = 0, [], [], []
+        with self.archive.open(self.info) as stream:
+            progress = lambda: min(stream.tell() / self.info.file_size, 1.0) if self.info.file_size else 0.0
+            for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag == f"{W}t":
+                    runs.append(elem.text or "")
+                elif elem.tag == f"{W}tab":
+                    runs.append("\t")
+                elif elem.tag == f"{W}br" and elem.get(f"{W}type") != "page":
+                    runs.append("\n")
+                elif elem.tag == f"{W}p":
+                    paragraphs.append("".join(runs))
+                    runs = []
+                if elem.tag == f"{W}lastRenderedPageBreak" or (elem.tag == f"{W}br" and elem.get(f"{W}type") == "page"):
+                    if paragraphs or runs:
+                        number += 1
+                        paragraphs.append("".join(runs))
+                        runs = []
+                        yield Page(number, "\n\n".join(paragraphs), progress())
+                        paragraphs = []
+                if len(stack) == 2:
+                    # Direct child of <w:body> is complete; drop it so the tree never grows
+                    stack[-1].remove(elem)
+        if paragraphs or runs:
+            paragraphs.append("".join(runs))
+            yield Page(number + 1, "\n\n".join(paragraphs), 1.0)
+
+
+PARSERS = {
+    ".pdf": PdfParser,
+    ".docx": DocxParser,
+    ".html": HtmlParser,
+    ".htm": HtmlParser,
+    ".txt": TextParser,
+    ".md": TextParser,
+    ".csv": TextParser,
+    ".json": TextParser,
+    ".xml": TextParser,
+}
+
+
+def get_parser(file, fileobj):
+    extension = (file.file_extension or os.path.splitext(file.file_name)[1]).lower()
+    parser_class = PARSERS.get(extension)
+    if parser_class is None and (file.file_type or "").startswith("text/"):
+        parser_class = HtmlParser if file.file_type == "text/html" else TextParser
+    if parser_class is None:
+        raise UnsupportedDocument(f"Cannot extract text from {extension or file.file_type or 'unknown'} files")
+    return parser_class(fileobj, file.file_size)
+
+
+def chunk_page(file, page):
+    texts = split_into_chunks(normalize_text(page.text), settings.PARSE_CHUNK_CHARS)
+    return [
+        DocumentChunk(
+            file=file,
+            page_number=page.number,
+            position=position,
+            text=text,
+            char_count=len(text),
+            content_hash=hashlib.sha256(text.encode()).hexdigest(),
+        )
+        for position, text in enumerate(texts)
+    ]
+
+
+def stored_chunks(file, start=None, stop=None):
+    """``{(page_number, position): (id, content_hash)}`` of ``file``'s chunks, optionally only pages ``start``..``stop``."""
+    chunks = DocumentChunk.objects.filter(file=file) #type: ignore
+    if start is not None:
+        chunks = chunks.filter(page_number__gt=start, page_number__lte=stop)
+    return {
+        (page_number, position): (chunk_id, content_hash)
+        for chunk_id, page_number, position, content_hash in chunks.values_list("id", "page_number", "position", "content_hash")
+    }
+
+
+def write_chunks(added, updated):
+    DocumentChunk.objects.bulk_create(added) #type: ignore
+    if updated:
+        DocumentChunk.objects.bulk_update(updated, ["text", "char_count", "content_hash"]) #type: ignore
+        # The old vectors describe the old text; embed_file picks these chunks up again
+        ChunkEmbedding.objects.filter(chunk_id__in=[chunk.id for chunk in updated]).delete() #type: ignore
+
+
+def store_pages(file, pages, on_progress=None, existing=None):
+    """Chunk pages as they are produced and write only what differs from ``existing``.
+
+    ``existing`` is the ``stored_chunks`` map of the pages being re-parsed. A chunk whose
+    text hash is unchanged is left alone, embedding and all; changed chunks are rewritten
+    in place and lose their embedding; new ones are inserted and leftovers deleted.
+    Returns ``(pages, chunks, changes)`` with ``changes`` counting each outcome.
+    """
+    existing = dict(existing or {})
+    added, updated, page_count, chunk_count, reported = [], [], 0, 0, 0
+    changes = {"unchanged": 0, "added": 0, "updated": 0, "removed": 0}
+    for page in pages:
+        for chunk in chunk_page(file, page):
+            stored = existing.pop((chunk.page_number, chunk.position), None)
+            if stored is None:
+                added.append(chunk)
+            elif stored[1] != chunk.content_hash:
+                chunk.id = stored[0]
+                updated.append(chunk)
+            else:
+                changes["unchanged"] += 1
+            chunk_count += 1
+        page_count += 1
+        if len(added) + len(updated) >= settings.BULK_UPDATE_OR_CREATE_BATCH_SIZE:
+            write_chunks(added, updated)
+            changes["added"] += len(added)
+            changes["updated"] += len(updated)
+            added, updated = [], []
+        percent = int(page.progress * 100)
+        if on_progress and percent > reported:
+            on_progress(percent)
+            reported = percent
+    write_chunks(added, updated)
+    changes["added"] += len(added)
+    changes["updated"] += len(updated)
+    if existing:
+        DocumentChunk.objects.filter(id__in=[chunk_id for chunk_id, _ in existing.values()]).delete() #type: ignore
+        changes["removed"] = len(existing)
+    return page_count, chunk_count, changes
+
+
+def parse_file(file, on_progress=None):
+    """Bring ``file``'s chunks in line with freshly extracted text, reporting progress as a percentage."""
+    existing = stored_chunks(file)
+    with file.file.open('rb') as fileobj:
+        parser = get_parser(file, fileobj)
+        return store_pages(file, parser.pages(), on_progress, existing)
+
+
+def count_pages(file):
+    """Number of real pages for formats that can be split by page range, otherwise None."""
+    with file.file.open('rb') as fileobj:
+        return get_parser(file, fileobj).page_count
+
+
+def plan_page_shards(page_count, shard_pages):
+    """Split ``page_count`` pages into contiguous ``(start, stop)`` ranges of ``shard_pages`` pages."""
+    return [(start, min(start + shard_pages, page_count)) for start in range(0, page_count, shard_pages)]
+
+
+def parse_page_range(file, start, stop, on_progress=None):
+    """Extract pages ``start``..``stop`` (0-based, stop exclusive); safe to retry for the same range."""
+    existing = stored_chunks(file, start, stop)
+    with file.file.open('rb') as fileobj:
+        parser = get_parser(file, fileobj)
+        return store_pages(file, parser.pages(start, stop), on_progress, existing)
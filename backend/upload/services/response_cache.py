@@ -0,0 +1,54 @@
+"""Per-user cache of rendered project read responses, validated by ETag.
+
+Every user has a project version counter in the cache; any successful write through the
+project API bumps it. A cached response's ETag is derived from (user, version, request
+path and query, media type), so it can be recomputed and compared against
+``If-None-Match`` from the counter alone: an unchanged poll costs one cache read and no
+database queries. Rendered bodies are kept under their ETag for RESPONSE_CACHE_TTL seconds.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+
+def version_key(user_id):
+    return f"projects:version:{user_id}"
+
+
+def body_key(digest):
+    return f"projects:response:{digest}"
+
+
+def projects_version(user_id):
+    """The user's current project version, started from the clock so a flushed cache never repeats an old one."""
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_projects_version(user_id):
+    """Invalidate every cached project read of the user."""
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.add(version_key(user_id), time.time_ns(), timeout=None)
+
+
+def response_digest(user_id, version, request, media_type):
+    """Identifies one rendering of one read; used (quoted) as the response's ETag."""
+    return hashlib.sha256(
+        f"{user_id}:{version}:{request.method}:{request.get_full_path()}:{media_type}".encode()
+    ).hexdigest()[:32]
+
+
+def get_body(digest):
+    """``(content, content_type, headers)`` cached for ``digest``, or None."""
+    return cache.get(body_key(digest))
+
+
+def set_body(digest, content, content_type, headers):
+    cache.set(body_key(digest), (content, content_type, headers), timeout=settings.RESPONSE_CACHE_TTL)
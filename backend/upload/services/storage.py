@@ -1,25 +1,123 @@
 import hashlib
+from django.core.files import File
 from django.core.files.storage import default_storage
-from storages.backends.s3boto3 import S3Boto3Storage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
 from django.conf import settings
-from urllib.parse import urljoin
 import os
 from django.http import Http404
-from django.conf import settings
 from django.http import FileResponse
 
-def upload_to_storage(uploaded_file, user_id):
+# Digests kept for every blob: sha256 addresses it, md5 is what File.file_hash has always held
+BLOB_DIGESTS = ("sha256", "md5")
+
+
+class HashingFile(File):
+    """Wrap an uploaded file so its digest is computed while the storage backend reads it.
+
+    Storage backends either iterate ``chunks()`` (FileSystemStorage) or call
+    ``read()`` directly (S3, GCS, Azure); both paths go through ``read`` here, so
+    the content is hashed in the same pass that writes it and memory stays
+    bounded by the chunk size.
+    """
+
+    DEFAULT_CHUNK_SIZE = settings.FILE_UPLOAD_CHUNK_SIZE
+
+    def __init__(self, file, algorithms=("md5",)):
+        super().__init__(file, name=getattr(file, "name", None))
+        self._hashers = {name: hashlib.new(name) for name in algorithms}
+        self._hashed = 0  # bytes fed to the hashers, always a prefix of the file
+        self._position = 0
+
+    def _update(self, data):
+        for hasher in self._hashers.values():
+            hasher.update(data)
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        start = self._position
+        self._position += len(data)
+        # Backends may rewind (retries, multipart uploads); only hash bytes past the prefix
+        if start <= self._hashed < self._position:
+            self._update(data[self._hashed - start:])
+            self._hashed = self._position
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._position = self.file.seek(offset, whence)
+        return self._position
+
+    def hexdigests(self):
+        """Return every digest by algorithm, reading whatever the backend did not consume through us."""
+        if self._hashed < self.size:
+            self.file.seek(self._hashed)
+            while True:
+                data = self.file.read(self.DEFAULT_CHUNK_SIZE)
+                if not data:
+                    break
+                self._update(data)
+                self._hashed += len(data)
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+
+    def hexdigest(self):
+        """Return the digest of the first algorithm."""
+        return next(iter(self.hexdigests().values()))
+
+
+class HashingUploadMixin:
+    """Hashes each uploaded file while the request body is streamed into it.
+
+    The digests end up on the resulting ``UploadedFile`` as ``digests``, so content-addressed
+    storage can look them up before writing anything, without another pass over the bytes.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.hashers = {name: hashlib.new(name) for name in BLOB_DIGESTS}
+        # The memory handler claims small files by raising StopFutureHandlers from here
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # The memory handler passes files it did not claim on to the next handler untouched
+        if getattr(self, "activated", True):
+            for hasher in self.hashers.values():
+                hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.digests = {name: hasher.hexdigest() for name, hasher in self.hashers.items()}
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def file_digests(uploaded_file):
+    """``BLOB_DIGESTS`` of a file: those taken while it was uploaded, else one hashing pass and a rewind."""
+    digests = getattr(uploaded_file, "digests", None)
+    if digests is None:
+        digests = HashingFile(uploaded_file, BLOB_DIGESTS).hexdigests()
+        uploaded_file.seek(0)
+    return digests
+
+
+def upload_to_storage(uploaded_file, user_id, storage=None):
+    storage = storage or default_storage
     path = f"uploads/{user_id}/{uploaded_file.name}"
-    file_hash = hashlib.md5(uploaded_file.read()).hexdigest()
-    uploaded_file.seek(0)  # reset pointer
+    content = HashingFile(uploaded_file)
 
-    saved_path = default_storage.save(path, uploaded_file)
-    file_url = default_storage.url(saved_path)
+    saved_path = storage.save(path, content)
+    file_url = storage.url(saved_path)
 
     return {
         "path": saved_path,
         "url": file_url,
-        "hash": file_hash,
+        "hash": content.hexdigest(),
     }
 
 def download_file_locally(file_instance):
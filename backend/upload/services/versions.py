@@ -0,0 +1,76 @@
+"""Change tracking for files: what a content or metadata edit leaves stale downstream.
+
+Chunks depend only on the stored bytes and embeddings only on chunk text, so a
+metadata edit never needs a re-parse or re-embed. The only derived data that quotes
+metadata is a project's cached answers, which cite file names.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from upload.models import File, Project
+from .blobs import blob_reference, release_blob
+from .storage import file_digests
+
+PARSE, EMBED = "parse", "embed"
+
+
+def record_metadata_change(file, changed):
+    """Persist a metadata edit made with ``File.apply_metadata`` and invalidate what depends on it."""
+    if not changed:
+        return
+    # Only the edited columns: a full save would clobber versions a worker bumped meanwhile
+    file.save(update_fields=[*changed, "metadata_version", "updated_at"])
+    if "file_name" in changed:
+        Project.objects.filter(files=file).update(documents_version=F("documents_version") + 1) #type: ignore
+
+
+def replace_content(file, uploaded_file):
+    """Point ``file`` at new bytes and bump its content_version; returns False if the bytes are unchanged."""
+    digests = file_digests(uploaded_file)
+    if file.blob is not None and file.blob.sha256 == digests["sha256"]:
+        return False
+    previous = file.blob
+    with blob_reference(uploaded_file, digests=digests) as blob, transaction.atomic():
+        file.blob = blob
+        file.file = file.file_path = blob.storage_path
+        file.file_url = blob.url
+        file.file_hash = blob.md5
+        file.file_size = blob.size
+        # A new content_version is past failed_version, so bytes that failed to parse before are retried
+        file.content_version = F("content_version") + 1
+        file.save(update_fields=[
+            "blob", "file", "file_path", "file_url", "file_hash", "file_size", "content_version", "updated_at",
+        ])
+        if previous is not None:
+            release_blob(previous)
+    file.refresh_from_db(fields=["content_version"])
+    return True
+
+
+def embeds_expected(file):
+    """Whether ``file``'s chunks should carry embeddings: it had some before, or new files get them."""
+    return settings.EMBED_AFTER_PARSE or file.embedded_version > 0
+
+
+def stale_stages(file):
+    """The pipeline stages ``file`` has to go through again, in order.
+
+    Only files the pipeline has processed before are re-driven; parsing a new upload is
+    left to whoever asks for it (``POST files/<id>/parse/``).
+    """
+    if not file.parsed_version:
+        return []
+    if file.parsed_version < file.content_version:
+        return [PARSE] if file.failed_version < file.content_version else []
+    if file.embedded_version < file.parsed_version and embeds_expected(file):
+        return [EMBED]
+    return []
+
+
+def stale_files(files=None):
+    """Files whose chunks or embeddings lag behind their content (a superset of what ``stale_stages`` acts on)."""
+    files = File.objects.all() if files is None else files #type: ignore
+    return files.filter(parsed_version__gt=0).filter(
+        Q(parsed_version__lt=F("content_version")) & Q(failed_version__lt=F("content_version"))
+        | Q(embedded_version__lt=F("parsed_version"))
+    )
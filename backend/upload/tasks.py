@@ -1,7 +1,162 @@
+from datetime import timedelta
+from celery import chord
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import Case, F, PositiveIntegerField, Value, When
 from project_root.celery_app import app
+from jobs.models import Job, JobShard
+from jobs.tasks import enqueue_job
+from search.tasks import sync_file_indexes
+from upload.models import File, UploadSession, UploadSessionStatus
+from upload.services.chunked import assemble_session, expire_sessions
+from upload.services.parsing import parse_file, count_pages, plan_page_shards, parse_page_range
+from upload.services.versions import EMBED, PARSE, embeds_expected, stale_files, stale_stages
+
+ACTIVE_JOB_STATUSES = (Job.Status.PENDING, Job.Status.RUNNING)
+# A job still pending or running after this long is assumed lost and no longer blocks a retry
+STALLED_JOB_AFTER = timedelta(hours=1)
+
+def _finish_parse(file_id, job, version, changes):
+    file = File.objects.get(id=file_id) #type: ignore
+    unchanged = not (changes["added"] or changes["updated"] or changes["removed"])
+    File.objects.filter(id=file_id).update( #type: ignore
+        updated_at=timezone.now(),
+        parsed_version=version,
+        # Identical chunks keep their embeddings, so those stay current if they were (the
+        # right-hand sides see the row as it was before this UPDATE)
+        embedded_version=Case(
+            When(embedded_version=F("parsed_version"), then=Value(version)),
+            default=F("embedded_version"),
+            output_field=PositiveIntegerField(),
+        ) if unchanged else F("embedded_version"),
+    )
+    job.metrics = changes
+    job.save(update_fields=["metrics"])
+    job.mark_done()
+    if unchanged:
+        return
+    sync_file_indexes.delay(str(file_id), ["text"])
+    if embeds_expected(file):
+        enqueue_job(file, Job.Type.EMBED)
+
+def _fail_parse(file_id, job, version, error):
+    File.objects.filter(id=file_id).update(failed_version=version) #type: ignore
+    job.mark_error(str(error))
 
 @app.task(name="upload.tasks.parse_document")
-def parse_document(document_id: int):
-    """Parse and index an uploaded document (stub)."""
-    # TODO implement parsing & embedding
-    return {"status": "parsed", "document_id": document_id} 
\ No newline at end of file
+def parse_document(file_id: str, job_id: str | None = None):
+    """Extract normalized text chunks from an uploaded File, reporting progress on a PARSE Job.
+
+    Large paged documents are fanned out as page-range shards to parse_document_shard and
+    finished by finish_parse_document; everything else is parsed inline.
+    """
+    file = File.objects.get(id=file_id) #type: ignore
+    job = Job.objects.get(id=job_id) if job_id else Job.objects.create(doc=file, job_type=Job.Type.PARSE) #type: ignore
+    job.mark_running()
+    try:
+        page_count = count_pages(file) if settings.PARSE_PARALLEL_MIN_PAGES else None
+        if page_count and page_count >= settings.PARSE_PARALLEL_MIN_PAGES:
+            # Shards re-parse their own page ranges; only pages the document no longer has go here
+            dropped = file.chunks.filter(page_number__gt=page_count)
+            removed = dropped.count()
+            dropped.delete()
+            job.shards.all().delete()
+            shards = JobShard.objects.bulk_create([ #type: ignore
+                JobShard(job=job, index=index, start_page=start, end_page=stop)
+                for index, (start, stop) in enumerate(plan_page_shards(page_count, settings.PARSE_SHARD_PAGES))
+            ])
+            chord(
+                parse_document_shard.s(file_id, shard.id) for shard in shards
+            )(finish_parse_document.s(file_id, str(job.id), file.content_version, removed))
+            return {"status": "sharded", "file_id": file_id, "job_id": str(job.id), "shards": len(shards)}
+
+        page_count, chunk_count, changes = parse_file(file, on_progress=job.set_progress)
+    except Exception as e:
+        _fail_parse(file.id, job, file.content_version, e)
+        raise
+    _finish_parse(file.id, job, file.content_version, changes)
+    return {
+        "status": "parsed", "file_id": file_id, "job_id": str(job.id), "pages": page_count, "chunks": chunk_count,
+        "changes": changes,
+    }
+
+@app.task(name="upload.tasks.parse_document_shard")
+def parse_document_shard(file_id: str, shard_id: int):
+    """Parse one page range of a sharded PARSE job."""
+    shard = JobShard.objects.select_related("job").get(id=shard_id) #type: ignore
+    file = File.objects.get(id=file_id) #type: ignore
+    shard.mark_running()
+    try:
+        page_count, chunk_count, changes = parse_page_range(file, shard.start_page, shard.end_page, on_progress=shard.set_progress)
+    except Exception as e:
+        shard.mark_error(str(e))
+        _fail_parse(file.id, shard.job, file.content_version, f"Shard {shard.index} (pages {shard.start_page + 1}-{shard.end_page}) failed: {e}")
+        raise
+    shard.mark_done()
+    return {"shard": shard.index, "pages": page_count, "chunks": chunk_count, "changes": changes}
+
+@app.task(name="upload.tasks.finish_parse_document")
+def finish_parse_document(shard_results, file_id: str, job_id: str, version: int, removed: int = 0):
+    """Chord callback: shard results arrive in shard order, chunks are already ordered by page.
+
+    ``version`` is the content_version the shards parsed and ``removed`` the chunks dropped
+    with pages the document no longer has.
+    """
+    job = Job.objects.select_related("doc").get(id=job_id) #type: ignore
+    changes = {
+        outcome: sum(result["changes"][outcome] for result in shard_results)
+        for outcome in ("unchanged", "added", "updated", "removed")
+    }
+    changes["removed"] += removed
+    _finish_parse(file_id, job, version, changes)
+    return {
+        "status": "parsed",
+        "file_id": file_id,
+        "job_id": job_id,
+        "pages": sum(result["pages"] for result in shard_results),
+        "chunks": sum(result["chunks"] for result in shard_results),
+        "changes": changes,
+    }
+
+@app.task(name="upload.tasks.assemble_upload")
+def assemble_upload(session_id: str):
+    """Stitch the chunks of a completed upload session into a stored File."""
+    session = UploadSession.objects.get(id=session_id) #type: ignore
+    try:
+        file = assemble_session(session)
+    except Exception as e:
+        session.status = UploadSessionStatus.FAILED
+        session.error_msg = str(e)
+        session.save(update_fields=["status", "error_msg", "updated_at"])
+        raise
+    return {"status": "assembled", "session_id": session_id, "file_id": str(file.id)}
+
+@app.task(name="upload.tasks.expire_upload_sessions")
+def expire_upload_sessions():
+    """Drop chunked upload sessions that were abandoned before completion."""
+    return {"status": "expired", "count": expire_sessions()}
+
+@app.task(name="upload.tasks.reconcile_file")
+def reconcile_file(file_id: str):
+    """Queue the next stale pipeline stage of one file (re-parse or re-embed), unless one is already queued."""
+    file = File.objects.get(id=file_id) #type: ignore
+    stages = stale_stages(file)
+    active = file.jobs.filter(status__in=ACTIVE_JOB_STATUSES, created_at__gte=timezone.now() - STALLED_JOB_AFTER)
+    if not stages or active.exists():
+        return {"file_id": file_id, "queued": None}
+    if stages[0] == PARSE:
+        job = Job.objects.create(doc=file, job_type=Job.Type.PARSE) #type: ignore
+        parse_document.delay(file_id, str(job.id))
+    else:
+        job = enqueue_job(file, Job.Type.EMBED)
+    return {"file_id": file_id, "queued": stages[0], "job_id": str(job.id)}
+
+@app.task(name="upload.tasks.reconcile_files")
+def reconcile_files():
+    """Periodic sweep re-driving files whose chunks or embeddings fell behind, e.g. after a lost task."""
+    queued = {PARSE: 0, EMBED: 0}
+    for file_id in stale_files().values_list("id", flat=True)[:settings.RECONCILE_BATCH_SIZE]:
+        stage = reconcile_file(str(file_id))["queued"]
+        if stage:
+            queued[stage] += 1
+    return {"status": "reconciled", "queued": queued}
@@ -0,0 +1,72 @@
+import hashlib
+import os
+from unittest import mock
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_user
+from upload.models import Blob, File
+from upload.services.blobs import blob_path
+from upload.services.storage import HashingFile
+
+
+class BlobStoreTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.data = os.urandom(5000)
+
+    def upload(self, data, name="paper.pdf"):
+        response = self.client.post("/api/files/", {"file": SimpleUploadedFile(name, data)}, format="multipart")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def stored_blobs(self):
+        root = os.path.join(default_storage.location, "blobs")
+        return sorted(name for _, _, names in os.walk(root) for name in names)
+
+    def test_duplicate_upload_is_metadata_only(self):
+        first = self.upload(self.data)
+        with mock.patch.object(default_storage, "save", side_effect=AssertionError("stored twice")):
+            second = self.upload(self.data, name="copy.pdf")
+
+        blob = Blob.objects.get() #type: ignore
+        self.assertEqual(blob.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(first["file_path"], second["file_path"])
+        self.assertEqual(first["file_path"], blob_path(blob.sha256))
+        self.assertEqual(second["file_hash"], hashlib.md5(self.data).hexdigest())
+        self.assertEqual(self.stored_blobs(), [blob.sha256])
+
+    def test_release_deletes_the_object_with_the_last_reference(self):
+        first = self.upload(self.data)
+        second = self.upload(self.data, name="copy.pdf")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/api/files/{first['id']}/").status_code, 204)
+        self.assertEqual(Blob.objects.get().ref_count, 1) #type: ignore
+        self.assertEqual(len(self.stored_blobs()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/api/files/{second['id']}/").status_code, 204)
+        self.assertFalse(Blob.objects.exists()) #type: ignore
+        self.assertEqual(self.stored_blobs(), [])
+
+    def test_upload_handlers_hash_as_the_body_arrives(self):
+        # Small files are kept in memory, larger ones spooled to disk; neither is hashed again
+        with mock.patch.object(HashingFile, "hexdigests", side_effect=AssertionError("hashed twice")):
+            small = self.upload(self.data)
+            with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024):
+                large = self.upload(self.data * 2, name="large.pdf")
+
+        self.assertEqual(small["file_hash"], hashlib.md5(self.data).hexdigest())
+        self.assertEqual(large["file_hash"], hashlib.md5(self.data * 2).hexdigest())
+
+    def test_failed_insert_releases_the_stored_blob(self):
+        with mock.patch.object(File, "save", side_effect=RuntimeError("insert failed")):
+            with self.assertRaises(RuntimeError), self.assertLogs("django.request", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+                self.upload(self.data)
+
+        self.assertFalse(Blob.objects.exists()) #type: ignore
+        self.assertEqual(self.stored_blobs(), [])
@@ -0,0 +1,143 @@
+import hashlib
+import os
+from datetime import timedelta
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core.tests.helpers import ServicesTestMixin, api_client, create_user
+from upload.models import File, UploadChunk, UploadSession, UploadSessionStatus
+from upload.services.chunked import chunk_storage, expire_sessions
+
+CHUNK_SIZE = 1000
+
+
+@override_settings(CHUNKED_UPLOAD_MIN_CHUNK_SIZE=1)
+class ChunkedUploadTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.data = os.urandom(3 * CHUNK_SIZE + 500)
+        self.parts = [self.data[start:start + CHUNK_SIZE] for start in range(0, len(self.data), CHUNK_SIZE)]
+
+    def start(self):
+        response = self.client.post("/api/files/uploads/", {
+            "file_name": "thesis.pdf", "file_size": len(self.data), "chunk_size": CHUNK_SIZE,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def send(self, session, index, data=None, md5=None):
+        payload = {"chunk": SimpleUploadedFile("part", self.parts[index] if data is None else data)}
+        if md5:
+            payload["md5"] = md5
+        return self.client.put(f"/api/files/uploads/{session['id']}/chunks/{index}/", payload, format="multipart")
+
+    def complete(self, session):
+        return self.client.post(f"/api/files/uploads/{session['id']}/complete/")
+
+    def test_resume_after_interruption(self):
+        session = self.start()
+        self.assertEqual(session["total_chunks"], 4)
+        for index in (3, 0):
+            self.assertEqual(self.send(session, index).status_code, 200)
+
+        # The client comes back and asks what is still missing
+        response = self.complete(session)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["missing_chunks"], [1, 2])
+        state = self.client.get(f"/api/files/uploads/{session['id']}/").json()
+        self.assertEqual(sorted(state["received_chunks"]), [0, 3])
+
+        for index in (2, 1):
+            self.assertEqual(self.send(session, index).status_code, 200)
+        response = self.complete(session)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], UploadSessionStatus.COMPLETED)
+        file = File.objects.get(id=response.json()["file"]) #type: ignore
+        self.assertEqual(file.file_size, len(self.data))
+        self.assertEqual(file.file_hash, hashlib.md5(self.data).hexdigest())
+        with file.file.open("rb") as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertFalse(chunk_storage().exists(session["id"]))
+
+    def test_resent_chunk_replaces_the_previous_one(self):
+        session = self.start()
+        self.send(session, 0, data=b"x" * CHUNK_SIZE)
+        for index in range(4):
+            self.send(session, index)
+
+        file = File.objects.get(id=self.complete(session).json()["file"]) #type: ignore
+        self.assertEqual(file.file_hash, hashlib.md5(self.data).hexdigest())
+
+    def test_chunks_are_read_from_the_name_they_were_saved_under(self):
+        session = self.start()
+        # A file left at the chunk path by an earlier, unrecorded write
+        chunk_storage().save(f"{session['id']}/000001.part", SimpleUploadedFile("part", b"y" * CHUNK_SIZE))
+        for index in range(4):
+            self.send(session, index)
+        self.send(session, 2)
+
+        name = UploadChunk.objects.get(session_id=session["id"], index=1).name #type: ignore
+        file = File.objects.get(id=self.complete(session).json()["file"]) #type: ignore
+
+        self.assertNotEqual(name, f"{session['id']}/000001.part")
+        self.assertEqual(file.file_hash, hashlib.md5(self.data).hexdigest())
+        self.assertFalse(chunk_storage().exists(session["id"]))
+
+    def test_rejects_corrupt_and_misplaced_chunks(self):
+        session = self.start()
+
+        mismatch = self.send(session, 0, md5=hashlib.md5(b"other").hexdigest())
+        wrong_size = self.send(session, 1, data=b"short")
+        out_of_range = self.send(session, 4, data=b"x" * CHUNK_SIZE)
+
+        self.assertEqual([mismatch.status_code, wrong_size.status_code, out_of_range.status_code], [400, 400, 400])
+        self.assertEqual(self.client.get(f"/api/files/uploads/{session['id']}/").json()["received_chunks"], [])
+
+    def test_failed_assembly_can_be_completed_again(self):
+        session = self.start()
+        for index in range(4):
+            self.send(session, index)
+
+        with mock.patch("upload.tasks.assemble_session", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError), self.assertLogs("django.request", "ERROR"):
+                self.complete(session)
+        state = self.client.get(f"/api/files/uploads/{session['id']}/").json()
+        self.assertEqual((state["status"], state["error_msg"]), (UploadSessionStatus.FAILED, "disk full"))
+
+        response = self.complete(session)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], UploadSessionStatus.COMPLETED)
+        self.assertEqual(response.json()["error_msg"], "")
+
+    def test_sessions_are_private(self):
+        session = self.start()
+        other = api_client(create_user("someone-else@example.com"))
+
+        self.assertEqual(other.get(f"/api/files/uploads/{session['id']}/").status_code, 404)
+
+    def test_abandoned_sessions_expire(self):
+        abandoned, recent = self.start(), self.start()
+        self.send(abandoned, 0)
+        UploadSession.objects.filter(id=abandoned["id"]).update(updated_at=timezone.now() - timedelta(days=2)) #type: ignore
+
+        self.assertEqual(expire_sessions(), 1)
+        self.assertTrue(UploadSession.objects.filter(id=recent["id"]).exists()) #type: ignore
+        self.assertFalse(chunk_storage().exists(abandoned["id"]))
+
+    def test_stalled_assemblies_expire(self):
+        session = self.start()
+        for index in range(4):
+            self.send(session, index)
+        with mock.patch("upload.tasks.assemble_upload.delay"):
+            self.complete(session)
+        self.assertEqual(expire_sessions(), 0)
+        UploadSession.objects.filter(id=session["id"]).update(updated_at=timezone.now() - timedelta(days=2)) #type: ignore
+
+        self.assertEqual(expire_sessions(), 1)
+        self.assertFalse(UploadSession.objects.filter(id=session["id"]).exists()) #type: ignore
+        self.assertFalse(chunk_storage().exists(session["id"]))
@@ -0,0 +1,83 @@
+import json
+from django.test import TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from rest_framework.renderers import JSONRenderer
+from upload.models import Project
+from upload.serializers import FileSerializer
+from upload.services.export import export_project
+
+
+class ProjectExportTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Atlas") #type: ignore
+        self.files = [
+            create_file(self.user, [f"Paper {number} abstract", f"Paper {number} methods"], name=f"paper-{number}.txt")
+            for number in range(3)
+        ]
+        self.project.files.add(*self.files)
+        elsewhere = Project.objects.create(user=self.user, name="Elsewhere") #type: ignore
+        elsewhere.files.add(create_file(self.user, ["Not exported"], name="other.txt"))
+
+    def export(self, **params):
+        response = self.client.get(f"/api/projects/{self.project.id}/export/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_project_then_its_files_as_ndjson(self):
+        response, rows = self.export()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="{self.project.slug}.ndjson"')
+        self.assertEqual([row["type"] for row in rows], ["project", "file", "file", "file"])
+        self.assertEqual(rows[0]["id"], str(self.project.id))
+        expected = FileSerializer(self.files, many=True, context={"request": response.wsgi_request}).data
+        self.assertEqual([{**row, "type": "file"} for row in json.loads(JSONRenderer().render(expected))], rows[1:])
+
+    def test_chunks_follow_in_reading_order_when_asked_for(self):
+        _, rows = self.export(include="chunks")
+
+        chunks = [row for row in rows if row["type"] == "chunk"]
+        self.assertEqual(len(chunks), 6)
+        for number, file in enumerate(self.files):
+            self.assertEqual(
+                [(row["page_number"], row["text"]) for row in chunks if row["file_id"] == str(file.id)],
+                [(1, f"Paper {number} abstract"), (2, f"Paper {number} methods")],
+            )
+
+    @override_settings(EXPORT_BUFFER_BYTES=200)
+    def test_output_is_sent_in_blocks_of_whole_lines(self):
+        blocks = list(export_project(self.project, include_chunks=True))
+
+        self.assertGreater(len(blocks), 3)
+        for block in blocks:
+            self.assertTrue(block.endswith(b"\n"))
+            for line in block.splitlines():
+                json.loads(line)
+
+    def test_queries_do_not_grow_with_the_project(self):
+        with self.assertNumQueries(0):
+            blocks = export_project(self.project, include_chunks=True)
+        with self.assertNumQueries(3):
+            self.assertEqual(sum(block.count(b"\n") for block in blocks), 10)
+
+        self.project.files.add(*(create_file(self.user, ["More"], name=f"more-{number}.txt") for number in range(20)))
+        with self.assertNumQueries(3):
+            self.assertEqual(sum(block.count(b"\n") for block in export_project(self.project, include_chunks=True)), 50)
+
+    def test_other_users_projects_are_not_exported(self):
+        other = api_client(create_user("someone-else@example.com"))
+
+        self.assertEqual(other.get(f"/api/projects/{self.project.id}/export/").status_code, 404)
+
+    async def test_asgi_streams_without_buffering(self):
+        self.async_client.cookies["access_token"] = self.client.cookies["access_token"].value
+        response = await self.async_client.get(f"/api/projects/{self.project.id}/export/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(hasattr(response.streaming_content, "__aiter__"))
+        rows = [json.loads(line) async for block in response.streaming_content for line in block.splitlines()]
+        self.assertEqual([row["type"] for row in rows], ["project", "file", "file", "file"])
@@ -0,0 +1,90 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from upload.models import File, FileStatus, Project
+from upload.services import membership
+from upload.services.membership import attach_files, detach_files
+
+
+class BulkMembershipTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Atlas") #type: ignore
+        self.files = [create_file(self.user, name=f"paper-{number}.txt") for number in range(5)]
+        self.ids = [str(file.id) for file in self.files]
+
+    def post(self, action, file_ids):
+        return self.client.post(f"/api/projects/{self.project.id}/{action}/", {"file_ids": file_ids}, format="json")
+
+    def attached(self):
+        return set(map(str, self.project.files.values_list("id", flat=True)))
+
+    def test_attach_counts_new_and_existing_links(self):
+        self.project.files.add(self.files[0])
+
+        response = self.post("bulk-attach-files", self.ids + self.ids[:2])
+
+        self.assertEqual(response.json(), {"attached": 4, "already_attached": 1})
+        self.assertEqual(self.attached(), set(self.ids))
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.documents_version, 1)
+
+    def test_attached_files_go_back_to_draft(self):
+        File.objects.filter(id=self.files[0].id).update(file_status=FileStatus.PROCESSED) #type: ignore
+
+        self.post("bulk-attach-files", self.ids[:1])
+
+        self.files[0].refresh_from_db()
+        self.assertEqual(self.files[0].file_status, FileStatus.DRAFT)
+
+    @override_settings(BULK_ATTACH_BATCH_SIZE=2)
+    def test_a_pending_file_in_any_batch_attaches_nothing(self):
+        File.objects.filter(id=self.files[4].id).update(file_status=FileStatus.PENDING) #type: ignore
+
+        response = self.post("bulk-attach-files", self.ids)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["file_ids"], [self.ids[4]])
+        self.assertEqual(self.attached(), set())
+
+    def test_files_of_other_users_are_not_found(self):
+        theirs = create_file(create_user("someone-else@example.com"))
+
+        response = self.post("bulk-attach-files", [*self.ids, str(theirs.id)])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["file_ids"], [str(theirs.id)])
+        self.assertEqual(self.attached(), set())
+
+    def test_detach_ignores_files_that_are_not_attached(self):
+        self.project.files.add(*self.files[:3])
+
+        response = self.post("bulk-detach-files", self.ids[1:])
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.attached(), {self.ids[0]})
+        self.assertEqual(detach_files(self.project, [file.id for file in self.files[1:]]), 0)
+
+    def test_queries_do_not_grow_with_the_number_of_files(self):
+        many = [create_file(self.user, name=f"bulk-{number}.txt") for number in range(40)]
+
+        # One validating SELECT, the status UPDATE, the M2M INSERT and the project touch, in a savepoint
+        for files in (self.files, many):
+            with self.subTest(files=len(files)), self.assertNumQueries(6):
+                self.assertEqual(attach_files(self.project, [file.id for file in files]), (len(files), 0))
+        with self.assertNumQueries(5):
+            self.assertEqual(detach_files(self.project, [file.id for file in many]), 40)
+
+    @override_settings(BULK_ATTACH_BATCH_SIZE=2)
+    def test_large_requests_are_sent_in_batches(self):
+        # The SELECT, UPDATE and INSERT run once per batch of ids
+        with self.assertNumQueries(3 * 3 + 3):
+            self.assertEqual(attach_files(self.project, [file.id for file in self.files]), (5, 0))
+
+    def test_changes_are_re_indexed_in_batches_after_commit(self):
+        with mock.patch.object(membership, "SYNC_BATCH", 2), self.captureOnCommitCallbacks() as callbacks:
+            attach_files(self.project, [file.id for file in self.files])
+
+        self.assertEqual(len(callbacks), 3)
@@ -0,0 +1,176 @@
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_user
+from jobs.models import Job
+from upload.models import DocumentChunk, File
+from upload.services.parsing import normalize_text, plan_page_shards, split_into_chunks
+from upload.tasks import parse_document
+from .documents import make_docx, make_pdf
+
+
+class TextTests(SimpleTestCase):
+    def test_normalize_text(self):
+        raw = "Gene­tic  infor-\nmation\n\n\n\n  spans   lines "
+
+        self.assertEqual(normalize_text(raw), "Genetic information\n\nspans lines")
+
+    def test_chunks_pack_paragraphs_and_split_long_ones_on_words(self):
+        text = "short one\n\nshort two\n\n" + " ".join(["word"] * 30)
+
+        chunks = split_into_chunks(text, 40)
+
+        self.assertEqual(chunks[0], "short one\n\nshort two")
+        self.assertTrue(all(len(chunk) <= 40 for chunk in chunks))
+        self.assertEqual(" ".join(chunks[1:]).split(), ["word"] * 30)
+
+    def test_page_shards_cover_every_page_once(self):
+        self.assertEqual(plan_page_shards(5, 2), [(0, 2), (2, 4), (4, 5)])
+        self.assertEqual(plan_page_shards(4, 25), [(0, 4)])
+
+
+@override_settings(EMBED_AFTER_PARSE=False, PARSE_PARALLEL_MIN_PAGES=0)
+class ParseDocumentTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+
+    def upload(self, name, data, content_type="application/octet-stream"):
+        response = self.client.post(
+            "/api/files/", {"file": SimpleUploadedFile(name, data, content_type=content_type)}, format="multipart",
+        )
+        return File.objects.get(id=response.json()["id"]) #type: ignore
+
+    def parse(self, file):
+        response = self.client.post(f"/api/files/{file.id}/parse/")
+        self.assertEqual(response.status_code, 202)
+        return Job.objects.get(id=response.json()["id"]) #type: ignore
+
+    def chunks(self, file):
+        return list(DocumentChunk.objects.filter(file=file).order_by("page_number", "position").values_list("page_number", "text")) #type: ignore
+
+    def test_pdf_pages(self):
+        file = self.upload("paper.pdf", make_pdf([["Abstract of the study"], ["Methods and results"]]))
+
+        job = self.parse(file)
+
+        self.assertEqual((job.status, job.progress), (Job.Status.DONE, 100))
+        self.assertEqual(self.chunks(file), [(1, "Abstract of the study"), (2, "Methods and results")])
+        file.refresh_from_db()
+        self.assertEqual(file.parsed_version, file.content_version)
+
+    def test_docx_page_breaks(self):
+        file = self.upload("notes.docx", make_docx([["Intro", "Background"], ["Conclusion"]]))
+
+        self.parse(file)
+
+        self.assertEqual(self.chunks(file), [(1, "Intro\n\nBackground"), (2, "Conclusion")])
+
+    def test_html_skips_scripts_and_styles(self):
+        html = b"<html><head><style>p{}</style></head><body><h1>Title</h1><p>Fish &amp; chips</p><script>x()</script></body></html>"
+        file = self.upload("page.html", html)
+
+        self.parse(file)
+
+        self.assertEqual(self.chunks(file), [(1, "Title\n\nFish & chips")])
+
+    @override_settings(PARSE_TEXT_PAGE_CHARS=1000, PARSE_CHUNK_CHARS=300)
+    def test_plain_text_is_read_in_pseudo_pages(self):
+        file = self.upload("log.txt", ("a line of text\n" * 200).encode(), content_type="text/plain")
+
+        self.parse(file)
+
+        chunks = self.chunks(file)
+        # 3000 characters cut on the last line break before each 1000
+        self.assertEqual({page for page, _ in chunks}, {1, 2, 3, 4})
+        self.assertTrue(all(len(text) <= 300 for _, text in chunks))
+        self.assertEqual(" ".join(text for _, text in chunks).split(), "a line of text".split() * 200)
+
+    def test_reparse_keeps_unchanged_chunks(self):
+        file = self.upload("paper.pdf", make_pdf([["Abstract"], ["Methods"]]))
+        self.parse(file)
+        ids = set(DocumentChunk.objects.filter(file=file).values_list("id", flat=True)) #type: ignore
+
+        job = self.parse(file)
+
+        self.assertEqual(job.metrics, {"unchanged": 2, "added": 0, "updated": 0, "removed": 0})
+        self.assertEqual(set(DocumentChunk.objects.filter(file=file).values_list("id", flat=True)), ids) #type: ignore
+
+    def test_unsupported_format_fails_the_job_not_the_file_status(self):
+        file = self.upload("figure.png", b"\x89PNG....")
+        job = Job.objects.create(doc=file, job_type=Job.Type.PARSE) #type: ignore
+
+        with self.assertRaises(ValueError):
+            parse_document(str(file.id), str(job.id))
+
+        job.refresh_from_db()
+        file.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.ERROR)
+        self.assertIn(".png", job.error_msg)
+        self.assertEqual((file.file_status, file.failed_version, file.parsed_version), ("uploaded", 1, 0))
+
+
+@override_settings(EMBED_AFTER_PARSE=False, PARSE_PARALLEL_MIN_PAGES=3, PARSE_SHARD_PAGES=2)
+class ShardedParseTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = api_client(create_user())
+        self.pages = [[f"Page {number} findings"] for number in range(1, 6)]
+
+    def upload(self, pages):
+        response = self.client.post(
+            "/api/files/", {"file": SimpleUploadedFile("atlas.pdf", make_pdf(pages))}, format="multipart",
+        )
+        return File.objects.get(id=response.json()["id"]) #type: ignore
+
+    def test_large_documents_are_parsed_in_page_range_shards(self):
+        file = self.upload(self.pages)
+
+        job = self.client.post(f"/api/files/{file.id}/parse/").json()
+
+        job = self.client.get(f"/api/jobs/{job['id']}/").json()
+        self.assertEqual((job["status"], float(job["progress"])), (Job.Status.DONE, 100))
+        self.assertEqual(
+            [(shard["index"], shard["start_page"], shard["end_page"], shard["status"]) for shard in job["shards"]],
+            [(0, 0, 2, "done"), (1, 2, 4, "done"), (2, 4, 5, "done")],
+        )
+        self.assertEqual(job["metrics"], {"unchanged": 0, "added": 5, "updated": 0, "removed": 0})
+        chunks = DocumentChunk.objects.filter(file=file).order_by("page_number") #type: ignore
+        self.assertEqual([chunk.text for chunk in chunks], [f"Page {number} findings" for number in range(1, 6)])
+
+    def test_small_documents_are_parsed_inline(self):
+        file = self.upload(self.pages[:2])
+
+        job = self.client.post(f"/api/files/{file.id}/parse/").json()
+
+        self.assertEqual(Job.objects.get(id=job["id"]).shards.count(), 0) #type: ignore
+        self.assertEqual(DocumentChunk.objects.filter(file=file).count(), 2) #type: ignore
+
+    def test_failed_shard_fails_the_job(self):
+        file = self.upload(self.pages)
+        job = Job.objects.create(doc=file, job_type=Job.Type.PARSE) #type: ignore
+
+        with mock.patch("upload.tasks.parse_page_range", side_effect=ValueError("unreadable page")):
+            with self.assertRaises(ValueError):
+                parse_document(str(file.id), str(job.id))
+
+        job.refresh_from_db()
+        file.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.ERROR)
+        self.assertIn("unreadable page", job.error_msg)
+        shard = job.shards.get(index=0)
+        self.assertEqual((shard.status, shard.error_msg), (Job.Status.ERROR, "unreadable page"))
+        self.assertEqual((file.failed_version, file.parsed_version), (1, 0))
+
+    def test_reparse_drops_pages_the_document_no_longer_has(self):
+        file = self.upload(self.pages)
+        self.client.post(f"/api/files/{file.id}/parse/")
+        self.client.put(
+            f"/api/files/{file.id}/content/", {"file": SimpleUploadedFile("atlas.pdf", make_pdf(self.pages[:3]))}, format="multipart",
+        )
+
+        job = self.client.post(f"/api/files/{file.id}/parse/").json()
+
+        self.assertEqual(Job.objects.get(id=job["id"]).metrics, {"unchanged": 3, "added": 0, "updated": 0, "removed": 2}) #type: ignore
+        self.assertEqual(list(DocumentChunk.objects.filter(file=file).values_list("page_number", flat=True).order_by("page_number")), [1, 2, 3]) #type: ignore
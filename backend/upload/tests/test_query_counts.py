@@ -0,0 +1,97 @@
+from unittest import mock
+from django.test import TestCase
+from core.tests.helpers import ServicesTestMixin, api_client, create_user
+from upload.models import File, Project
+from upload.pagination import CursorLinkPagination
+
+
+class QueryCountTests(ServicesTestMixin, TestCase):
+    """Every list endpoint runs the same queries however many rows it lists."""
+
+    def setUp(self):
+        super().setUp()
+        self.fixtures = {size: self.seed(size) for size in (2, 40)}
+
+    def seed(self, size):
+        user = create_user(f"researcher-{size}@example.com")
+        projects = Project.objects.bulk_create([ #type: ignore
+            Project(user=user, name=f"project {i}", slug=f"project-{size}-{i}") for i in range(size)
+        ])
+        projects[0].files.add(*File.objects.bulk_create([ #type: ignore
+            File(
+                user=user, file=f"files/{i}.txt", slug=f"file-{size}-{i}", file_type="text/plain", file_size=i,
+                file_name=f"{i}.txt", file_path=f"files/{i}.txt", file_extension=".txt", file_hash="", file_url="",
+            )
+            for i in range(size)
+        ]))
+        client = api_client(user)
+        # Authentication loads the user once, then serves it from the token cache
+        client.get("/api/jobs/")
+        return client, projects[0]
+
+    def assertConstantQueries(self, count, path, params=None):
+        for size, (client, project) in self.fixtures.items():
+            with self.subTest(rows=size):
+                with self.assertNumQueries(count):
+                    response = client.get(path.format(project=project.id), params or {})
+                self.assertEqual(response.status_code, 200)
+                self.assertGreaterEqual(len(response.json()), min(size, (params or {}).get("page_size", size)))
+
+    def test_projects(self):
+        self.assertConstantQueries(1, "/api/projects/")
+        self.assertConstantQueries(1, "/api/projects/", {"fields": "id,name,status"})
+
+    def test_files(self):
+        self.assertConstantQueries(1, "/api/files/")
+        self.assertConstantQueries(1, "/api/files/", {"fields": "id,file_name"})
+
+    def test_project_files(self):
+        self.assertConstantQueries(2, "/api/projects/{project}/files/")
+        self.assertConstantQueries(2, "/api/projects/{project}/files/", {"fields": "id,file_name,file_size"})
+        self.assertConstantQueries(2, "/api/projects/{project}/files/", {"page_size": 3})
+
+
+class PaginationTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Atlas") #type: ignore
+        self.project.files.add(*File.objects.bulk_create([ #type: ignore
+            File(
+                user=self.user, file=f"files/{i}.txt", slug=f"file-{i}", file_type="text/plain", file_size=i,
+                file_name=f"{i}.txt", file_path=f"files/{i}.txt", file_extension=".txt", file_hash="", file_url="",
+            )
+            for i in range(7)
+        ]))
+        self.url = f"/api/projects/{self.project.id}/files/"
+
+    def next_link(self, response):
+        for link in response.get("Link", "").split(","):
+            if 'rel="next"' in link:
+                return link.split(";")[0].strip(" <>")
+        return None
+
+    def test_lists_are_paginated_by_default(self):
+        with mock.patch.object(CursorLinkPagination, "page_size", 4):
+            response = self.client.get(self.url)
+            listed = self.client.get("/api/files/")
+
+        self.assertEqual((len(response.json()), len(listed.json())), (4, 4))
+        self.assertIsNotNone(self.next_link(response))
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(CursorLinkPagination, "max_page_size", 5):
+            response = self.client.get(self.url, {"page_size": 1000})
+
+        self.assertEqual(len(response.json()), 5)
+
+    def test_pages_are_followed_through_the_link_header(self):
+        names, url, params = [], self.url, {"page_size": 3, "fields": "file_name"}
+        while url:
+            response = self.client.get(url, params)
+            names += [row["file_name"] for row in response.json()]
+            url, params = self.next_link(response), None
+
+        self.assertEqual(sorted(names), sorted(f"{i}.txt" for i in range(7)))
+        self.assertEqual(len(names), 7)
@@ -0,0 +1,87 @@
+from unittest import mock
+import redis
+from django.test import TestCase
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from upload.models import Project
+from upload.services import response_cache
+
+
+class ResponseCacheTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Atlas") #type: ignore
+        # Authentication loads the user once, then serves it from the token cache
+        self.client.get("/api/jobs/")
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        first = self.client.get("/api/projects/")
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/projects/")
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second["Cache-Control"], "private, no-cache")
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.client.get(f"/api/projects/{self.project.id}/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/api/projects/{self.project.id}/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_writes_invalidate_every_cached_read(self):
+        urls = ["/api/projects/", f"/api/projects/{self.project.id}/", f"/api/projects/{self.project.id}/get_project_details/"]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+
+        self.client.patch(f"/api/projects/{self.project.id}/toggle-pin/")
+
+        responses = [self.client.get(url, headers={"If-None-Match": etag}) for url, etag in zip(urls, etags)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+        self.assertTrue(responses[0].json()[0]["is_pinned"])
+
+    def test_attaching_files_invalidates_reads(self):
+        etag = self.client.get(f"/api/projects/{self.project.id}/")["ETag"]
+
+        self.client.post(f"/api/projects/{self.project.id}/attach-file/", {"file_id": str(create_file(self.user).id)}, format="json")
+
+        self.assertEqual(self.client.get(f"/api/projects/{self.project.id}/", headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_failed_writes_keep_the_cache(self):
+        etag = self.client.get("/api/projects/")["ETag"]
+
+        response = self.client.post(f"/api/projects/{self.project.id}/attach-file/", {"file_id": "not-a-uuid"}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/projects/", headers={"If-None-Match": etag}).status_code, 304)
+
+    def test_entries_are_per_user_and_per_query(self):
+        other = api_client(create_user("someone-else@example.com"))
+        Project.objects.create(user=self.user, name="Second") #type: ignore
+
+        mine, theirs = self.client.get("/api/projects/"), other.get("/api/projects/")
+        projected = self.client.get("/api/projects/", {"fields": "id,name"})
+
+        self.assertEqual((len(mine.json()), len(theirs.json())), (2, 0))
+        self.assertEqual(set(projected.json()[0]), {"id", "name"})
+        self.assertEqual(len({mine["ETag"], theirs["ETag"], projected["ETag"]}), 3)
+
+    def test_a_flushed_cache_never_repeats_a_version(self):
+        etag = self.client.get("/api/projects/")["ETag"]
+
+        self.redis.flushall()
+
+        self.assertEqual(self.client.get("/api/projects/", headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_reads_still_work_without_redis(self):
+        with mock.patch.object(response_cache, "projects_version", side_effect=redis.ConnectionError("down")):
+            with self.assertLogs("upload", "WARNING"):
+                response = self.client.get("/api/projects/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
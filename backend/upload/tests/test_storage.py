@@ -0,0 +1,65 @@
+import hashlib
+import io
+import os
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from core.tests.helpers import ServicesTestMixin
+from upload.services.storage import HashingFile, upload_to_storage
+
+
+class CountingFile(io.BytesIO):
+    """BytesIO that counts the bytes read out of it."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@override_settings(FILE_UPLOAD_CHUNK_SIZE=1024)
+class HashingFileTests(ServicesTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = os.urandom(10_000)
+        self.storage = FileSystemStorage(location=self.root / "storage")
+
+    def test_hashes_while_the_storage_backend_reads(self):
+        source = CountingFile(self.data)
+        content = HashingFile(File(source, name="paper.pdf"))
+
+        name = self.storage.save("paper.pdf", content)
+
+        self.assertEqual(content.hexdigest(), hashlib.md5(self.data).hexdigest())
+        self.assertEqual(source.bytes_read, len(self.data))
+        with self.storage.open(name, "rb") as stored:
+            self.assertEqual(stored.read(), self.data)
+
+    def test_rewinds_are_not_hashed_twice(self):
+        content = HashingFile(ContentFile(self.data, name="paper.pdf"), ("sha256", "md5"))
+        content.read(4000)
+        content.seek(0)
+        content.read()
+
+        self.assertEqual(content.hexdigests(), {
+            "sha256": hashlib.sha256(self.data).hexdigest(),
+            "md5": hashlib.md5(self.data).hexdigest(),
+        })
+
+    def test_digest_covers_bytes_the_backend_did_not_read(self):
+        content = HashingFile(ContentFile(self.data, name="paper.pdf"))
+        content.read(100)
+
+        self.assertEqual(content.hexdigest(), hashlib.md5(self.data).hexdigest())
+
+    def test_upload_to_storage(self):
+        result = upload_to_storage(ContentFile(self.data, name="paper.pdf"), "user-1", storage=self.storage)
+
+        self.assertTrue(result["path"].startswith("uploads/user-1/paper"))
+        self.assertEqual(result["hash"], hashlib.md5(self.data).hexdigest())
+        self.assertEqual(self.storage.size(result["path"]), len(self.data))
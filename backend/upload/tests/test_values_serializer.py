@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core.tests.helpers import ServicesTestMixin, api_client, create_file, create_user
+from upload.models import File, Project
+from upload.serializers import FileSerializer
+from upload.serializers.project import ProjectSerializer
+from upload.serializers.values import ValuesSerializer, values_serializer
+
+
+class ValuesSerializerParityTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.files = [create_file(self.user, name=f"paper-{number}.txt") for number in range(2)]
+        File.objects.filter(id=self.files[0].id).update( #type: ignore
+            file_metadata={"pages": 12, "authors": ["Ada", "Grace"], "draft": True}, file_tags=["brca", "2026"],
+            created_at=datetime(2026, 3, 1, 9, 30, tzinfo=dt_timezone.utc),
+        )
+        File.objects.filter(id=self.files[1].id).update(file="") #type: ignore
+        Project.objects.create(user=self.user, name="Atlas", description=None) #type: ignore
+        Project.objects.create(user=self.user, name="Cohort", description="BRCA1 carriers", is_pinned=True) #type: ignore
+        self.request = Request(APIRequestFactory().get("/api/files/"))
+
+    def assertSameJSON(self, serializer_class, queryset, request=None, names=None):
+        drf = JSONRenderer().render(
+            serializer_class(queryset.all(), many=True, context={"request": request, "fields": names}).data
+        )
+        fast = values_serializer(serializer_class)
+        values = fast.dumps(queryset.values(*fast.columns(names)), names, request)
+        self.assertEqual(json.loads(values), json.loads(drf))
+
+    def test_files_render_like_file_serializer(self):
+        self.assertSameJSON(FileSerializer, File.objects.order_by("file_name"), self.request) #type: ignore
+
+    def test_file_urls_without_a_request_are_relative(self):
+        self.assertSameJSON(FileSerializer, File.objects.order_by("file_name")) #type: ignore
+
+    def test_projects_render_like_project_serializer(self):
+        self.assertSameJSON(ProjectSerializer, Project.objects.order_by("name"), self.request) #type: ignore
+
+    def test_projected_fields(self):
+        self.assertSameJSON(FileSerializer, File.objects.order_by("file_name"), self.request, ["id", "file", "created_at"]) #type: ignore
+
+    def test_write_only_fields_are_left_out(self):
+        self.assertNotIn("user_id", values_serializer(ProjectSerializer).fields)
+
+
+class UnsupportedSerializerTests(SimpleTestCase):
+    def test_fields_that_need_an_instance_are_rejected(self):
+        class Computed(serializers.ModelSerializer):
+            pages = serializers.SerializerMethodField()
+
+            class Meta:
+                model = File
+                fields = ["id", "pages"]
+
+        class Related(serializers.ModelSerializer):
+            email = serializers.CharField(source="user.email")
+
+            class Meta:
+                model = File
+                fields = ["id", "email"]
+
+        for serializer_class in (Computed, Related):
+            with self.subTest(serializer=serializer_class.__name__), self.assertRaises(ImproperlyConfigured):
+                ValuesSerializer(serializer_class)
+
+
+class ListEndpointTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        self.project = Project.objects.create(user=self.user, name="Atlas") #type: ignore
+        self.project.files.add(*(create_file(self.user, name=f"paper-{number}.txt") for number in range(3)))
+
+    def test_json_lists_match_file_serializer(self):
+        url = f"/api/projects/{self.project.id}/files/"
+        fast = self.client.get(url)
+        # Other renderers, like the browsable API, still go through FileSerializer
+        drf = FileSerializer(
+            self.project.files.order_by("-created_at"), many=True, context={"request": fast.wsgi_request},
+        ).data
+
+        self.assertEqual(fast["Content-Type"], "application/json")
+        self.assertEqual(
+            sorted(fast.json(), key=lambda row: row["id"]),
+            sorted(json.loads(JSONRenderer().render(drf)), key=lambda row: row["id"]),
+        )
@@ -0,0 +1,134 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from core.tests.helpers import ServicesTestMixin, api_client, create_user
+from jobs.models import Job
+from upload.models import ChunkEmbedding, File, FileStatus, Project
+from upload.services.versions import EMBED, PARSE, stale_files, stale_stages
+from upload.tasks import reconcile_files
+
+PARAGRAPHS = [
+    "BRCA1 carriers face higher cancer risk.",
+    "Screening starts earlier for carriers.",
+    "Counselling is offered to relatives.",
+]
+
+
+def document(paragraphs):
+    return SimpleUploadedFile("notes.txt", "\n\n".join(paragraphs).encode(), content_type="text/plain")
+
+
+@override_settings(EMBED_AFTER_PARSE=True, EMBEDDING_DIMENSIONS=32, PARSE_CHUNK_CHARS=50, PARSE_PARALLEL_MIN_PAGES=0)
+class FileVersionTests(ServicesTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = api_client(self.user)
+        response = self.client.post("/api/files/", {"file": document(PARAGRAPHS)}, format="multipart")
+        self.file = File.objects.get(id=response.json()["id"]) #type: ignore
+
+    def parse(self):
+        self.client.post(f"/api/files/{self.file.id}/parse/")
+        self.file.refresh_from_db()
+
+    def replace(self, paragraphs):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f"/api/files/{self.file.id}/content/", {"file": document(paragraphs)}, format="multipart")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.file.refresh_from_db()
+
+    def versions(self):
+        self.file.refresh_from_db()
+        return self.file.content_version, self.file.parsed_version, self.file.embedded_version
+
+    def embeddings(self):
+        return dict(ChunkEmbedding.objects.filter(chunk__file=self.file).values_list("chunk__text", "id")) #type: ignore
+
+    def test_metadata_edits_leave_chunks_and_embeddings_alone(self):
+        self.parse()
+        project = Project.objects.create(user=self.user, name="Oncology") #type: ignore
+        project.files.add(self.file)
+        embeddings, jobs = self.embeddings(), Job.objects.count() #type: ignore
+
+        self.client.post(f"/api/files/{self.file.id}/update-file-metadata/", {"file_tags": ["brca"]}, format="json")
+        project.refresh_from_db()
+        self.file.refresh_from_db()
+        self.assertEqual((self.file.metadata_version, project.documents_version), (2, 0))
+
+        # Cached answers cite file names, so a rename invalidates them
+        self.client.post(f"/api/files/{self.file.id}/update-file-metadata/", {"file_name": "brca.txt"}, format="json")
+        self.client.post(f"/api/files/{self.file.id}/update-file-metadata/", {"file_name": "brca.txt"}, format="json")
+
+        project.refresh_from_db()
+        self.file.refresh_from_db()
+        self.assertEqual((self.file.metadata_version, project.documents_version), (3, 1))
+        self.assertEqual(self.versions(), (1, 1, 1))
+        self.assertEqual(self.embeddings(), embeddings)
+        self.assertEqual(Job.objects.count(), jobs) #type: ignore
+
+    def test_new_content_only_redoes_changed_chunks(self):
+        self.parse()
+        embeddings = self.embeddings()
+        self.assertEqual(len(embeddings), 3)
+
+        self.replace([PARAGRAPHS[0], "Screening starts at age thirty.", PARAGRAPHS[2]])
+
+        self.assertEqual(self.versions(), (2, 2, 2))
+        after = self.embeddings()
+        self.assertEqual(after[PARAGRAPHS[0]], embeddings[PARAGRAPHS[0]])
+        self.assertEqual(after[PARAGRAPHS[2]], embeddings[PARAGRAPHS[2]])
+        self.assertNotIn(PARAGRAPHS[1], after)
+        self.assertIn("Screening starts at age thirty.", after)
+        self.assertEqual(Job.objects.filter(doc=self.file, job_type=Job.Type.PARSE).latest("created_at").metrics, #type: ignore
+                         {"unchanged": 2, "added": 0, "updated": 1, "removed": 0})
+
+    def test_identical_bytes_are_not_a_new_version(self):
+        self.parse()
+
+        self.replace(PARAGRAPHS)
+
+        self.assertEqual(self.versions(), (1, 1, 1))
+        self.assertEqual(Job.objects.filter(job_type=Job.Type.PARSE).count(), 1) #type: ignore
+
+    def test_never_parsed_files_are_left_to_the_user(self):
+        self.replace(PARAGRAPHS[:1])
+
+        self.assertEqual(self.versions(), (2, 0, 0))
+        self.assertEqual(stale_stages(self.file), [])
+        self.assertFalse(stale_files().exists())
+        self.assertFalse(Job.objects.exists()) #type: ignore
+
+    def test_content_that_failed_to_parse_is_not_retried(self):
+        self.parse()
+        broken = SimpleUploadedFile("figure.png", b"\x89PNG....")
+        File.objects.filter(id=self.file.id).update(file_extension=".png", file_type="image/png") #type: ignore
+        with self.assertRaises(ValueError), self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f"/api/files/{self.file.id}/content/", {"file": broken}, format="multipart")
+
+        self.file.refresh_from_db()
+        self.assertEqual((self.file.content_version, self.file.failed_version, self.file.parsed_version), (2, 2, 1))
+        self.assertEqual(stale_stages(self.file), [])
+        self.assertEqual(reconcile_files()["queued"], {PARSE: 0, EMBED: 0})
+        self.assertEqual(self.file.file_status, "uploaded")
+
+    def test_pipeline_never_touches_file_status(self):
+        File.objects.filter(id=self.file.id).update(file_status=FileStatus.DRAFT) #type: ignore
+        self.client.post(f"/api/files/{self.file.id}/update-file-status/", {"file_status": FileStatus.PROCESSED}, format="json")
+
+        self.parse()
+        self.replace(PARAGRAPHS[:2])
+
+        self.assertEqual(self.file.file_status, FileStatus.PROCESSED)
+        project = Project.objects.create(user=self.user, name="Oncology") #type: ignore
+        response = self.client.post(f"/api/projects/{project.id}/attach-file/", {"file_id": str(self.file.id)}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_sweep_re_embeds_files_whose_vectors_fell_behind(self):
+        self.parse()
+        ChunkEmbedding.objects.all().delete() #type: ignore
+        File.objects.filter(id=self.file.id).update(embedded_version=0) #type: ignore
+
+        self.assertEqual(reconcile_files()["queued"], {PARSE: 0, EMBED: 1})
+
+        self.assertEqual(self.versions(), (1, 1, 1))
+        self.assertEqual(len(self.embeddings()), 3)
+        self.assertEqual(reconcile_files()["queued"], {PARSE: 0, EMBED: 0})
@@ -1,19 +1,36 @@
 from rest_framework import viewsets, status
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
-from upload.models import File, FileStatus
+from upload.models import File, FileStatus, UploadSession, UploadSessionStatus
 from upload.serializers import FileSerializer
-from upload.services import upload_to_storage, generate_download_url, download_file_locally
+from upload.services import blob_reference, release_blob, generate_download_url, download_file_locally
 import os
 from django.conf import settings
-from rest_framework.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.decorators import action
-from upload.serializers.file import UpdateFileMetadataSerializer, UpdateFileStatusSerializer
+from upload.serializers.file import UpdateFileMetadataSerializer, UpdateFileStatusSerializer, ReplaceFileContentSerializer
+from upload.serializers.upload_session import UploadSessionSerializer, StartUploadSessionSerializer, UploadChunkSerializer
+from upload.services.chunked import OPEN_STATUSES, start_session, store_chunk, missing_chunks
+from upload.services.versions import record_metadata_change, replace_content
+from upload.tasks import assemble_upload, parse_document, reconcile_file
+from jobs.models import Job
+from jobs.tasks import enqueue_job
+from jobs.serializers import JobSerializer
+from upload.pagination import CursorLinkPagination
+from .mixins import FieldProjectionMixin
 
-class FileViewSet(viewsets.ModelViewSet):
+class FileViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = File.objects.all() #type: ignore
     serializer_class = FileSerializer
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    pagination_class = CursorLinkPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return self.project(queryset) if self.action == 'list' else queryset
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -26,26 +43,41 @@ class FileViewSet(viewsets.ModelViewSet):
         file_extension = os.path.splitext(file_name)[1].lower()
         file_size = uploaded_file.size
 
-        # Save to provider (local, S3, etc.)
-        upload_result = upload_to_storage(uploaded_file, user.id)
         file_type = getattr(uploaded_file, 'content_type', '') or os.path.splitext(file_name)[1].lower().lstrip('.')
 
-        # We are manually creating the instance, so we call save on the instance, not the serializer
-        instance = serializer.save(
-            user=user,
-            file_name=file_name,
-            file_size=file_size,
-            file_extension=file_extension,
-            file_path=upload_result['path'],
-            file_url=upload_result['url'],
-            file_status='uploaded',
-            file_type=file_type,
-            file_hash=upload_result['hash'],
-        )
+        # Save to provider (local, S3, etc.) unless a blob with the same bytes already exists;
+        # the write happens before the transaction and is released again if the insert fails
+        with blob_reference(uploaded_file) as blob, transaction.atomic():
+            # We are manually creating the instance, so we call save on the instance, not the serializer.
+            # Point the FileField at the blob so the content is not written a second time.
+            serializer.save(
+                user=user,
+                blob=blob,
+                file=blob.storage_path,
+                file_name=file_name,
+                file_size=file_size,
+                file_extension=file_extension,
+                file_path=blob.storage_path,
+                file_url=blob.url,
+                file_status='uploaded',
+                file_type=file_type,
+                file_hash=blob.md5,
+            )
         
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    def list(self, request, *args, **kwargs):
+        response = self.values_list_response(self.filter_queryset(self.get_queryset()), fields=self.requested_fields())
+        return response if response is not None else super().list(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        blob = instance.blob
+        with transaction.atomic():
+            instance.delete()
+            if blob is not None:
+                release_blob(blob)
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
@@ -61,6 +93,21 @@ class FileViewSet(viewsets.ModelViewSet):
             url = generate_download_url(instance)
         return Response({"download_url": url})
 
+    @action(detail=True, methods=['post'], url_path='parse')
+    def parse(self, request, pk=None):
+        """Queue text extraction for a file and return the tracking job"""
+        instance = self.get_object()
+        job = Job.objects.create(doc=instance, job_type=Job.Type.PARSE) #type: ignore
+        parse_document.delay(str(instance.id), str(job.id))
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='embed')
+    def embed(self, request, pk=None):
+        """Queue embedding of a parsed file's chunks and return the tracking job"""
+        instance = self.get_object()
+        job = enqueue_job(instance, Job.Type.EMBED)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['post'], url_path='update-file-metadata')
     def update_file_metadata(self, request, pk=None):
         """Update the metadata of a file"""
@@ -69,17 +116,10 @@ class FileViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update the instance with validated data
-        validated_data = serializer.validated_data
-        if 'file_name' in validated_data:
-            instance.file_name = validated_data['file_name']
-        if 'file_metadata' in validated_data:
-            instance.file_metadata = validated_data['file_metadata']
-        if 'file_tags' in validated_data:
-            instance.file_tags = validated_data['file_tags']
-        
-        instance.save()
-        
+        # Metadata never feeds chunks or embeddings, so no re-parse or re-index is needed
+        changed = instance.apply_metadata(serializer.validated_data)
+        record_metadata_change(instance, changed)
+
         # Return the updated file data
         response_serializer = FileSerializer(instance)
         return Response(response_serializer.data)
@@ -103,6 +143,71 @@ class FileViewSet(viewsets.ModelViewSet):
             return Response({"error": "Invalid status transition"}, status=status.HTTP_400_BAD_REQUEST)
         
         instance.file_status = new_status
-        instance.save()
+        instance.save(update_fields=['file_status', 'updated_at'])
         return Response(serializer.data)
 
+    @action(detail=True, methods=['put'], url_path='content')
+    def replace_content(self, request, pk=None):
+        """Replace the bytes of a file; only its stale chunks are re-parsed, re-embedded and re-indexed"""
+        instance = self.get_object()
+        serializer = ReplaceFileContentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if replace_content(instance, serializer.validated_data['file']):
+            file_id = str(instance.id)
+            transaction.on_commit(lambda: reconcile_file.delay(file_id))
+        return Response(FileSerializer(instance).data)
+
+    def get_upload_session(self, session_id):
+        try:
+            return UploadSession.objects.get(id=session_id, user=self.request.user) #type: ignore
+        except (UploadSession.DoesNotExist, DjangoValidationError): #type: ignore
+            raise NotFound("Upload session not found")
+
+    @action(detail=False, methods=['post'], url_path='uploads')
+    def start_upload(self, request):
+        """Start a resumable chunked upload session"""
+        serializer = StartUploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session = start_session(request.user, **serializer.validated_data)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path=r'uploads/(?P<session_id>[^/.]+)')
+    def upload_session(self, request, session_id=None):
+        """Get the state of an upload session, including the chunks received so far"""
+        session = self.get_upload_session(session_id)
+        return Response(UploadSessionSerializer(session).data)
+
+    @action(detail=False, methods=['put'], url_path=r'uploads/(?P<session_id>[^/.]+)/chunks/(?P<index>\d+)')
+    def upload_chunk(self, request, session_id=None, index=None):
+        """Upload (or re-upload) a single chunk; chunks may be sent in any order and in parallel"""
+        session = self.get_upload_session(session_id)
+        serializer = UploadChunkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        chunk = store_chunk(session, int(index), serializer.validated_data['chunk'], serializer.validated_data.get('md5'))
+        return Response({"index": chunk.index, "size": chunk.size, "md5": chunk.md5})
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<session_id>[^/.]+)/complete')
+    def complete_upload(self, request, session_id=None):
+        """Assemble the uploaded chunks into a File in the background (again, if assembling failed)"""
+        session = self.get_upload_session(session_id)
+        if session.status not in OPEN_STATUSES:
+            return Response(UploadSessionSerializer(session).data)
+
+        missing = missing_chunks(session)
+        if missing:
+            return Response({"error": "Upload is incomplete", "missing_chunks": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Retrying a failed assembly goes through here too; only one concurrent request wins
+        updated = UploadSession.objects.filter(id=session.id, status__in=OPEN_STATUSES).update( #type: ignore
+            status=UploadSessionStatus.ASSEMBLING,
+            error_msg='',
+            updated_at=timezone.now(),
+        )
+        if updated:
+            assemble_upload.delay(str(session.id))
+        session.refresh_from_db()
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_202_ACCEPTED)
+
@@ -0,0 +1,145 @@
+import logging
+from functools import wraps
+import redis
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from upload.serializers.mixins import readable_fields
+from upload.serializers.values import values_serializer
+from upload.services import response_cache
+
+logger = logging.getLogger(__name__)
+# Response headers stored alongside a cached body (pagination links)
+CACHED_HEADERS = ('Link',)
+
+
+class FieldProjectionMixin:
+    """``?fields=a,b`` renders only those serializer fields and loads only the columns they read.
+
+    JSON list responses can go through ``values_list_response`` instead of the serializer.
+
+    Applies to ``list``/``retrieve`` through ``get_serializer``; custom actions call
+    ``requested_fields``/``project`` with their own serializer class.
+    """
+    projected_actions = ('list', 'retrieve')
+
+    def requested_fields(self, serializer_class=None):
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        readable = readable_fields(serializer_class or self.get_serializer_class())
+        names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in readable]
+        if unknown:
+            raise ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}"]})
+        return names
+
+    def ordering_columns(self, queryset):
+        """Columns the queryset may be ordered on, which cursor pagination reads from every row."""
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        ordering = [name.lstrip('-') for name in getattr(self, 'ordering_fields', None) or []]
+        paginator_ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(paginator_ordering, str):
+            paginator_ordering = [paginator_ordering]
+        return {name for name in [*ordering, *(name.lstrip('-') for name in paginator_ordering)] if name in concrete}
+
+    def project(self, queryset, serializer_class=None, fields=None):
+        """Defer every column the rendered fields don't read; the pk and orderable columns stay loaded."""
+        readable = readable_fields(serializer_class or self.get_serializer_class())
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = {readable[name] for name in fields or readable if readable[name] in concrete}
+        columns |= self.ordering_columns(queryset)
+        return queryset.only(queryset.model._meta.pk.name, *columns)
+
+    def values_list_response(self, queryset, serializer_class=None, fields=None):
+        """A page of ``queryset`` rendered from ``values()`` rows by ``ValuesSerializer``, skipping model
+        instances and DRF serializers; None unless the client asked for JSON, so the browsable API keeps working.
+        """
+        if getattr(self.request.accepted_renderer, 'format', None) != 'json':
+            return None
+        serializer = values_serializer(serializer_class or self.get_serializer_class())
+        names = fields or list(serializer.fields)
+        queryset = queryset.values(*dict.fromkeys([*serializer.columns(names), *sorted(self.ordering_columns(queryset))]))
+        page = self.paginate_queryset(queryset)
+        response = HttpResponse(
+            serializer.dumps(queryset if page is None else page, names, self.request), content_type='application/json',
+        )
+        link = self.paginator.get_link_header() if page is not None else None
+        if link:
+            response['Link'] = link
+        return response
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.projected_actions:
+            context['fields'] = self.requested_fields()
+        return context
+
+
+def cache_headers(response, digest):
+    response['ETag'] = f'W/"{digest}"'
+    # Browsers keep the body but revalidate it on every poll
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_response(view_method):
+    """Serve a read from the per-user response cache, answering a matching If-None-Match with 304.
+
+    Used together with ``InvalidateOnWriteMixin``, which bumps the version the cache is keyed on.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        user_id = request.user.pk
+        try:
+            version = response_cache.projects_version(user_id)
+            digest = response_cache.response_digest(user_id, version, request, request.accepted_media_type)
+            # Weak comparison, as for any If-None-Match
+            if f'"{digest}"' in {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}:
+                return cache_headers(HttpResponseNotModified(), digest)
+            cached = response_cache.get_body(digest)
+        except redis.RedisError as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return view_method(self, request, *args, **kwargs)
+
+        if cached is not None:
+            content, content_type, headers = cached
+            response = HttpResponse(content, content_type=content_type)
+            for name, value in headers.items():
+                response[name] = value
+            return cache_headers(response, digest)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if isinstance(response, Response):
+            # Rendered here rather than by finalize_response so the bytes can be stored
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+        try:
+            response_cache.set_body(
+                digest, response.content, response['Content-Type'],
+                {name: response[name] for name in CACHED_HEADERS if name in response},
+            )
+        except redis.RedisError as e:
+            logger.warning("Response cache unavailable: %s", e)
+        return cache_headers(response, digest)
+    return wrapper
+
+
+class InvalidateOnWriteMixin:
+    """Any successful write through the viewset invalidates the user's ``cached_response`` reads."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            try:
+                response_cache.bump_projects_version(request.user.pk)
+            except redis.RedisError as e:
+                logger.warning("Could not invalidate cached project reads of user %s: %s", request.user.pk, e)
+        return response
+
@@ -3,29 +3,51 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
-from upload.models import Project, ProjectStatus, File, FileStatus
+from upload.models import Project, ProjectStatus
 from upload.serializers.file import FileSerializer
-from upload.serializers.project import ProjectSerializer, BulkProjectSerializer
+from upload.serializers.project import ProjectSerializer, BulkProjectSerializer, ProjectFileSerializer, BulkProjectFilesSerializer
+from upload.services.membership import attach_files, detach_files
+from upload.services.export import aexport_project, export_project
 from upload.filters import ProjectFilterSet
+from upload.pagination import CursorLinkPagination
+from .mixins import FieldProjectionMixin, InvalidateOnWriteMixin, cached_response
 import logging
 from django.conf import settings
-from typing import Dict, Any, List
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from typing import Dict, Any
 from django.utils.text import slugify
 import uuid
 
 logger = logging.getLogger(__name__)
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    """ViewSet for managing user Projects"""
+class ProjectViewSet(InvalidateOnWriteMixin, FieldProjectionMixin, viewsets.ModelViewSet):
+    """ViewSet for managing user Projects
+
+    List and detail reads are served from a per-user response cache with ETags; every
+    successful write here invalidates it.
+    """
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CursorLinkPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
     filterset_class = ProjectFilterSet
     ordering_fields = ['created_at', 'updated_at', 'name']
     search_fields = ['name', 'description']
 
     def get_queryset(self):
-        return Project.objects.filter(user=self.request.user, is_deleted=False) #type: ignore
+        queryset = Project.objects.filter(user=self.request.user, is_deleted=False) #type: ignore
+        return self.project(queryset) if self.action == 'list' else queryset
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        response = self.values_list_response(self.filter_queryset(self.get_queryset()), fields=self.requested_fields())
+        return response if response is not None else super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -129,98 +151,70 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def attach_file(self, request, pk=None):
         """Attach a file to a project"""
         project = self.get_object()
-        file_id = request.data.get('file_id')
-
-        if not file_id:
-            return Response({"error": "File ID is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            file = File.objects.get(id=file_id)
-        except File.DoesNotExist:
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        if file.file_status == FileStatus.PENDING :
-            return Response({"error": "File is pending"}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            file.file_status = FileStatus.DRAFT
-            file.save()
-        
-        project.files.add(file) #type: ignore
-        project.save()
+        serializer = ProjectFileSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        attach_files(project, [serializer.validated_data['file_id']])
         return Response(status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='detach-file')
     def detach_file(self, request, pk=None):
         """Detach a file from a project"""
         project = self.get_object()
-        file_id = request.data.get('file_id')
-        
-        if not file_id:
-            return Response({"error": "File ID is required"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            file = File.objects.get(id=file_id)
-        except File.DoesNotExist:
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        project.files.remove(file)
-        project.save()
+        serializer = ProjectFileSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        detach_files(project, [serializer.validated_data['file_id']])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'], url_path='bulk-attach-files')
     def bulk_attach_files(self, request, pk=None):
-        """Bulk attach files to a project"""
+        """Bulk attach files to a project; all or nothing if any file is missing or pending"""
         project = self.get_object()
-        file_ids = request.data.get('file_ids', [])
-        status = request.data.get('status')
+        serializer = BulkProjectFilesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        attached, already_attached = attach_files(project, serializer.validated_data['file_ids'])
+        return Response({"attached": attached, "already_attached": already_attached}, status=status.HTTP_200_OK)
 
-        if not file_ids:
-            return Response({"error": "File IDs are required"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        is_any_file_pending = False
-        for file_id in file_ids:
-            try:
-                file = File.objects.get(id=file_id) #type: ignore
-            except Exception as e:
-                return Response({"error": f"File not found: {e}"}, status=status.HTTP_404_NOT_FOUND)
-            
-            if file.file_status == FileStatus.PENDING:
-                is_any_file_pending = True
-        
-        if is_any_file_pending:
-            return Response({"error": "One or more files are pending"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        files = list(File.objects.filter(id__in=file_ids)) #type: ignore
-        for file in files:
-            file.file_status = FileStatus.DRAFT
-        File.objects.bulk_update(files, ['file_status'], batch_size=settings.BULK_UPDATE_OR_CREATE_BATCH_SIZE) #type: ignore
-        project.files.add(*files) #type: ignore
-        project.save()
-    
-        return Response(status=status.HTTP_200_OK)
-        
     @action(detail=True, methods=['post'], url_path='bulk-detach-files')
     def bulk_detach_files(self, request, pk=None):
         """Bulk detach files from a project"""
         project = self.get_object()
-        file_ids = request.data.get('file_ids', [])
-        if not file_ids:
-            return Response({"error": "File IDs are required"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        files = list(File.objects.filter(id__in=file_ids)) #type: ignore
-        project.files.remove(*files) #type: ignore
-        project.save()
+        serializer = BulkProjectFilesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        detach_files(project, serializer.validated_data['file_ids'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['get'], url_path='files')
     def files(self, request, pk=None):
-        """Get all files for a project"""
+        """Get a project's files, all of them or a page at a time (``?cursor=``, ``?page_size=``, ``?fields=``)"""
         project = self.get_object()
-        project_files = project.files.all()
-        serializer = FileSerializer(project_files, many=True)
-        return Response(serializer.data)
+        fields = self.requested_fields(FileSerializer)
+        response = self.values_list_response(project.files.all(), FileSerializer, fields)
+        if response is not None:
+            return response
+        queryset = self.project(project.files.all(), FileSerializer, fields)
+        page = self.paginate_queryset(queryset)
+        serializer = FileSerializer(queryset if page is None else page, many=True, context={'request': request, 'fields': fields})
+        return Response(serializer.data) if page is None else self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='export')
+    def export(self, request, pk=None):
+        """Stream the project and all its files as NDJSON, plus their extracted text with ``?include=chunks``"""
+        project = self.get_object()
+        include_chunks = 'chunks' in request.query_params.get('include', '').split(',')
+        blocks = export_project(project, include_chunks=include_chunks, request=request)
+        content = aexport_project(blocks) if isinstance(request._request, ASGIRequest) else blocks
+        response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{project.slug}.ndjson"'
+        # Stop nginx from buffering the whole export before passing it on
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
     @action(detail=True, methods=['get'])
+    @cached_response
     def get_project_details(self, request, pk=None):
         """Get the details of a project"""
         project = self.get_object()
@@ -237,11 +231,14 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if not projects:
             return Response({"error": "No projects found"}, status=status.HTTP_404_NOT_FOUND)
         
-        # Update all projects in memory
+        # Update all projects in memory; bulk_update skips auto_now, and the analytics export
+        # only picks up rows whose updated_at moved
+        now = timezone.now()
         for project in projects:
             project.is_deleted = True  # type: ignore
+            project.updated_at = now
 
-        Project.objects.bulk_update(projects, ['is_deleted'], batch_size=settings.BULK_UPDATE_OR_CREATE_BATCH_SIZE)  # type: ignore[arg-type]
+        Project.objects.bulk_update(projects, ['is_deleted', 'updated_at'], batch_size=settings.BULK_UPDATE_OR_CREATE_BATCH_SIZE)  # type: ignore[arg-type]
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['post'], url_path='bulk-update')
@@ -289,8 +286,14 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # As in bulk_delete: updated_at is not set by bulk_update itself
+        now = timezone.now()
+        for project in projects:
+            project.updated_at = now
+        fields_to_update.add('updated_at')
+
         try:
-            updated_count = Project.objects.bulk_update(  # type: ignore[attr-defined,arg-type]
+            Project.objects.bulk_update(  # type: ignore[attr-defined,arg-type]
                 projects,
                 list(fields_to_update),
                 batch_size=settings.BULK_UPDATE_OR_CREATE_BATCH_SIZE,